@@ -0,0 +1,71 @@
+"""
+Compare two benchmark result files written by `benchmarks/run.py`.
+
+Scenarios are matched by name; for each one the p50/p99 latency and events/sec deltas
+are printed. Exits with status 1 when any scenario regressed more than the threshold
+(higher latency or lower throughput), so it can gate a CI job.
+
+Usage:
+    python benchmarks/compare.py benchmarks/results/<base>.json benchmarks/results/<head>.json
+    python benchmarks/compare.py base.json head.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when higher is better
+METRICS = {
+    "p50_ms": False,
+    "p99_ms": False,
+    "events_per_sec": True,
+}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        data = json.load(f)
+    return {scenario["name"]: scenario for scenario in data["scenarios"]}
+
+
+def change_percent(base: float, head: float) -> float:
+    if base == 0:
+        return 0.0
+    return (head - base) / base * 100
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[str]:
+    regressions = []
+    print(f"{'scenario':<45} {'metric':<15} {'base':>12} {'head':>12} {'change':>9}")
+    for name in sorted(base.keys() & head.keys()):
+        for metric, higher_is_better in METRICS.items():
+            before, after = base[name][metric], head[name][metric]
+            change = change_percent(before, after)
+            regressed = (-change if higher_is_better else change) > threshold
+            flag = "  ⚠️ regression" if regressed else ""
+            print(f"{name:<45} {metric:<15} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%{flag}")
+            if regressed:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+
+    for name in sorted(base.keys() - head.keys()):
+        print(f"{name:<45} missing from head")
+    for name in sorted(head.keys() - base.keys()):
+        print(f"{name:<45} new in head")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Baseline results JSON")
+    parser.add_argument("head", help="Results JSON to check against the baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent (default: 10)")
+    args = parser.parse_args()
+
+    regressions = compare(load(args.base), load(args.head), args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold}%: " + ", ".join(regressions))
+        sys.exit(1)
+    print(f"\n✅ No regression over {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
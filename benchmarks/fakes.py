@@ -0,0 +1,687 @@
+"""
+In-memory stand-ins for Kafka (aiokafka producer/consumer) and MongoDB (Motor collections).
+
+They implement the subset of the client APIs used by the services, with configurable
+injected latency, so the real code paths can be benchmarked without docker-compose.
+"""
+import asyncio
+import bisect
+import itertools
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, Callable, Optional
+
+from aiokafka import TopicPartition
+from aiokafka.structs import ConsumerRecord
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+# ---------------------------------------------------------------------------
+# Kafka
+# ---------------------------------------------------------------------------
+
+class FakeBroker:
+    """Topics as lists of partitions holding ConsumerRecords, plus committed offsets."""
+
+    def __init__(self, partitions: int = 3):
+        self.partitions = partitions
+        self.topics: dict[str, list[list[ConsumerRecord]]] = {}
+        self.committed: dict[TopicPartition, int] = {}
+        self._round_robin = itertools.count()
+        self.new_records = asyncio.Event()
+
+    def partitions_for(self, topic: str) -> list[list[ConsumerRecord]]:
+        return self.topics.setdefault(topic, [[] for _ in range(self.partitions)])
+
+    def append(self, topic: str, value: bytes, key: Optional[bytes], partition: Optional[int], headers) -> tuple[int, int]:
+        partitions = self.partitions_for(topic)
+        if partition is None:
+            if key is not None:
+                partition = zlib.crc32(key) % self.partitions
+            else:
+                partition = next(self._round_robin) % self.partitions
+        records = partitions[partition]
+        offset = len(records)
+        records.append(ConsumerRecord(
+            topic=topic, partition=partition, offset=offset, timestamp=int(time.time() * 1000),
+            timestamp_type=0, key=key, value=value, checksum=None,
+            serialized_key_size=len(key) if key else -1, serialized_value_size=len(value),
+            headers=tuple(headers or ()),
+        ))
+        self.new_records.set()
+        return partition, offset
+
+    def total_records(self, topic: str) -> int:
+        return sum(len(records) for records in self.partitions_for(topic))
+
+    def committed_records(self, topic: str) -> int:
+        return sum(self.committed.get(TopicPartition(topic, p), 0) for p in range(self.partitions))
+
+
+class FakeKafkaProducer:
+    """Mimics AIOKafkaProducer: `send` queues and returns a future resolved after `latency_ms`."""
+
+    def __init__(self, broker: FakeBroker, latency_ms: float = 0.0, fail: Optional[Callable[[dict], bool]] = None, **kwargs):
+        self.broker = broker
+        self.latency = latency_ms / 1000
+        self.fail = fail
+        self.value_serializer = kwargs.get("value_serializer") or (lambda v: v)
+        self.key_serializer = kwargs.get("key_serializer") or (lambda k: k)
+        self._pending: set[asyncio.Future] = set()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        await self.flush()
+
+    async def flush(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def send(self, topic, value=None, key=None, partition=None, timestamp_ms=None, headers=None):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        raw_value = self.value_serializer(value)
+        raw_key = self.key_serializer(key) if key is not None else None
+
+        def deliver():
+            if future.done():
+                return
+            if self.fail is not None and self.fail(value):
+                future.set_exception(ConnectionError("fake broker unavailable"))
+                return
+            p, offset = self.broker.append(topic, raw_value, raw_key, partition, headers)
+            future.set_result(SimpleNamespace(topic=topic, partition=p, offset=offset))
+
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        loop.call_later(self.latency, deliver)
+        return future
+
+    async def send_and_wait(self, topic, value=None, key=None, partition=None, timestamp_ms=None, headers=None):
+        return await (await self.send(topic, value, key, partition, timestamp_ms, headers))
+
+    async def partitions_for(self, topic):
+        return set(range(self.broker.partitions))
+
+
+class FakeKafkaAdminClient:
+    """Mimics AIOKafkaAdminClient over a FakeBroker: lists the topics that exist on it."""
+
+    def __init__(self, broker: FakeBroker, **kwargs):
+        self.broker = broker
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def list_topics(self) -> list[str]:
+        return list(self.broker.topics)
+
+
+class FakeKafkaConsumer:
+    """
+    Mimics AIOKafkaConsumer over a FakeBroker for a single consumer owning every partition.
+
+    Records the time each record was handed out, so the harness can derive the latency
+    from fetch to offset commit.
+    """
+
+    def __init__(self, broker: FakeBroker, topic: str, fetch_latency_ms: float = 0.0, **kwargs):
+        self.broker = broker
+        self.topics = [topic]
+        self.fetch_latency = fetch_latency_ms / 1000
+        self._client = object()
+        self._positions: dict[TopicPartition, int] = {}
+        # Next offset handed to the application (prefetched records are not consumed yet)
+        self._consumed: dict[TopicPartition, int] = {}
+        self._paused: set[TopicPartition] = set()
+        self._stopped = False
+        self._buffer: list[ConsumerRecord] = []
+        self.fetched_at: dict[tuple[int, int], float] = {}
+        self.commit_latencies: list[float] = []
+        self.listener = None
+
+    async def start(self):
+        for topic in self.topics:
+            for p in range(self.broker.partitions):
+                tp = TopicPartition(topic, p)
+                self._positions[tp] = self._consumed[tp] = self.broker.committed.get(tp, 0)
+
+    def subscribe(self, topics=(), listener=None, **kwargs):
+        self.topics = list(topics) or self.topics
+        self.listener = listener
+
+    async def stop(self):
+        self._stopped = True
+        self.broker.new_records.set()
+
+    def assignment(self) -> set[TopicPartition]:
+        return set(self._positions)
+
+    def pause(self, *partitions):
+        self._paused.update(partitions)
+
+    def resume(self, *partitions):
+        self._paused.difference_update(partitions)
+
+    def paused(self):
+        return set(self._paused)
+
+    def _take(self, max_records: int) -> dict[TopicPartition, list[ConsumerRecord]]:
+        result: dict[TopicPartition, list[ConsumerRecord]] = {}
+        for tp, position in self._positions.items():
+            if tp in self._paused or max_records <= 0:
+                continue
+            records = self.broker.partitions_for(tp.topic)[tp.partition][position:position + max_records]
+            if records:
+                result[tp] = records
+                self._positions[tp] = position + len(records)
+                max_records -= len(records)
+        return result
+
+    def highwater(self, tp: TopicPartition) -> int:
+        return len(self.broker.partitions_for(tp.topic)[tp.partition])
+
+    def _consume(self, *records: ConsumerRecord) -> None:
+        """Hand records to the application: they become committable and their latency clock starts."""
+        now = time.perf_counter()
+        for record in records:
+            self.fetched_at[(record.partition, record.offset)] = now
+        last = records[-1]
+        self._consumed[TopicPartition(last.topic, last.partition)] = last.offset + 1
+
+    async def getmany(self, *partitions, timeout_ms: int = 0, max_records: Optional[int] = None):
+        # Like aiokafka, records already prefetched are returned without a fetch round trip
+        if not any(record for record in self._buffer if self._tp(record) not in self._paused):
+            fetched = await self._fetch(timeout_ms, max_records=500)
+            for partition_records in fetched.values():
+                self._buffer.extend(partition_records)
+
+        limit = max_records or 500
+        records: dict[TopicPartition, list[ConsumerRecord]] = {}
+        remaining = []
+        for record in self._buffer:
+            tp = self._tp(record)
+            if limit <= 0 or tp in self._paused:
+                remaining.append(record)
+                continue
+            records.setdefault(tp, []).append(record)
+            limit -= 1
+        self._buffer = remaining
+
+        for partition_records in records.values():
+            self._consume(*partition_records)
+        return records
+
+    @staticmethod
+    def _tp(record: ConsumerRecord) -> TopicPartition:
+        return TopicPartition(record.topic, record.partition)
+
+    async def _fetch(self, timeout_ms: int, max_records: Optional[int]):
+        if self.fetch_latency:
+            await asyncio.sleep(self.fetch_latency)
+        records = self._take(max_records or 500)
+        if not records and not self._stopped:
+            self.broker.new_records.clear()
+            try:
+                await asyncio.wait_for(self.broker.new_records.wait(), timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            records = self._take(max_records or 500)
+        return records
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ConsumerRecord:
+        # Like aiokafka, iteration is served from a prefetched buffer
+        while not self._buffer:
+            if self._stopped:
+                raise StopAsyncIteration
+            records = await self._fetch(timeout_ms=50, max_records=500)
+            for partition_records in records.values():
+                self._buffer.extend(partition_records)
+        record = self._buffer.pop(0)
+        self._consume(record)
+        return record
+
+    async def commit(self, offsets: Optional[dict] = None):
+        if offsets is None:
+            offsets = dict(self._consumed)
+        now = time.perf_counter()
+        for tp, offset in offsets.items():
+            offset = getattr(offset, "offset", offset)
+            previous = self.broker.committed.get(tp, 0)
+            for committed in range(previous, offset):
+                fetched = self.fetched_at.pop((tp.partition, committed), None)
+                if fetched is not None:
+                    self.commit_latencies.append(now - fetched)
+            self.broker.committed[tp] = max(previous, offset)
+
+    async def committed(self, tp):
+        return self.broker.committed.get(tp)
+
+    def seek(self, tp: TopicPartition, offset: int):
+        self._buffer = [record for record in self._buffer if self._tp(record) != tp]
+        self._positions[tp] = self._consumed[tp] = offset
+
+    async def seek_to_committed(self, *partitions):
+        self._buffer.clear()
+        for tp in partitions or self._positions:
+            self._positions[tp] = self._consumed[tp] = self.broker.committed.get(tp, 0)
+
+
+# ---------------------------------------------------------------------------
+# MongoDB
+# ---------------------------------------------------------------------------
+
+def _get_path(document: dict, path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            # Path into an array of documents: the field of each element, like MongoDB
+            value = [element.get(part) for element in value if isinstance(element, dict)]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if isinstance(value, list) and operator != "$exists":
+        # An array matches when one of its values does ($ne / $nin: when none of them does)
+        if operator in ("$ne", "$nin"):
+            return all(_compare(element, operator, operand) for element in value)
+        return any(_compare(element, operator, operand) for element in value)
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$exists":
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    raise NotImplementedError(f"Operator {operator} not supported by the fake collection")
+
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            value = _get_path(document, key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        else:
+            value = _get_path(document, key)
+            if value != condition and not (isinstance(value, list) and condition in value):
+                return False
+    return True
+
+
+def _apply_update(document: dict, update: dict) -> bool:
+    changed = False
+    for key, value in update.get("$set", {}).items():
+        if document.get(key) != value:
+            document[key] = value
+            changed = True
+    for key, value in update.get("$inc", {}).items():
+        document[key] = document.get(key, 0) + value
+        changed = True
+    for key, value in update.get("$push", {}).items():
+        document.setdefault(key, []).append(value)
+        changed = True
+    for key, value in update.get("$min", {}).items():
+        if key not in document or value < document[key]:
+            document[key] = value
+            changed = True
+    for key, value in update.get("$max", {}).items():
+        if key not in document or value > document[key]:
+            document[key] = value
+            changed = True
+    return changed
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return dict(document)
+    included = [key for key, flag in projection.items() if flag]
+    if included:
+        result = {key: document[key] for key in included if key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+def _keyset_bound(query: dict) -> Optional[tuple[str, tuple]]:
+    """Recognize the (timestamp, event_id) keyset filter of cursor pagination: returns (operator, key)."""
+    branches = query.get("$or")
+    if not isinstance(branches, list) or len(branches) != 2:
+        return None
+    first, second = branches
+    condition = first.get("timestamp")
+    if not isinstance(condition, dict) or len(condition) != 1:
+        return None
+    operator, timestamp = next(iter(condition.items()))
+    event_id = second.get("event_id")
+    if operator in ("$lt", "$gt") and second.get("timestamp") == timestamp and isinstance(event_id, dict) and operator in event_id:
+        return operator, (timestamp, event_id[operator])
+    return None
+
+
+class FakeCursor:
+    """
+    Lazy cursor. Queries by user sorted on (timestamp, event_id) walk a sorted per-user
+    index like Mongo's (user_id, timestamp, event_id) index: a keyset bound is a seek,
+    a skip walks the skipped entries.
+
+    Iterated with a `batch_size`, documents are returned a batch per round trip (find,
+    then getMore) and only the batches fetched before `close()` are paid for.
+    """
+
+    def __init__(self, collection: "FakeCollection", query: dict, projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._batch_size = 0
+        self._closed = False
+
+    def sort(self, key, direction=None):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, count: int):
+        self._batch_size = count
+        return self
+
+    async def close(self):
+        self._closed = True
+
+    def _walk_index(self, user_id: str, direction: int) -> tuple[list[dict], int]:
+        documents, keys = self._collection._user_index(user_id)
+        bound = _keyset_bound(self._query)
+        if direction == -1:
+            position = len(documents) - 1
+            if bound is not None and bound[0] == "$lt":
+                position = bisect.bisect_left(keys, bound[1]) - 1
+            positions = range(position, -1, -1)
+        else:
+            position = 0
+            if bound is not None and bound[0] == "$gt":
+                position = bisect.bisect_right(keys, bound[1])
+            positions = range(position, len(documents))
+
+        result, examined, skipped = [], 0, 0
+        for index in positions:
+            document = documents[index]
+            examined += 1
+            if not matches(document, self._query):
+                continue
+            if skipped < self._skip:
+                skipped += 1
+                continue
+            result.append(document)
+            if self._limit and len(result) >= self._limit:
+                break
+        return result, examined
+
+    def _scan(self) -> tuple[list[dict], int]:
+        candidates = self._collection._candidates(self._query)
+        documents = [document for document in candidates if matches(document, self._query)]
+        for field, order in reversed(self._sort):
+            documents.sort(key=lambda d: (_get_path(d, field) is not None, _get_path(d, field)), reverse=order == -1)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return documents, len(candidates)
+
+    async def to_list(self, length: Optional[int] = None):
+        user_id = self._query.get("user_id")
+        fields = [field for field, _ in self._sort]
+        directions = {order for _, order in self._sort}
+        if isinstance(user_id, str) and fields == ["timestamp", "event_id"] and len(directions) == 1:
+            documents, examined = self._walk_index(user_id, directions.pop())
+        else:
+            documents, examined = self._scan()
+        await self._collection._delay(scanned=examined)
+        self._collection.documents_read += len(documents)
+        return [_project(document, self._projection) for document in documents]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        if not self._batch_size:
+            for document in await self.to_list():
+                yield document
+            return
+
+        documents, _ = self._scan()
+        for start in range(0, len(documents), self._batch_size):
+            if self._closed:
+                return
+            batch = documents[start:start + self._batch_size]
+            await self._collection._delay(scanned=len(batch))
+            self._collection.documents_read += len(batch)
+            for document in batch:
+                yield _project(document, self._projection)
+
+
+class FakeCollection:
+    """
+    Motor-like collection kept in memory, with a unique index on `unique_key`.
+
+    Every operation costs `latency_ms` plus `scan_us` per document examined, a rough
+    model of an indexed Mongo query over the network.
+    """
+
+    def __init__(self, name: str, latency_ms: float = 0.0, scan_us: float = 0.0, unique_key: Optional[str] = "event_id"):
+        self.name = name
+        self.latency = latency_ms / 1000
+        self.scan = scan_us / 1_000_000
+        self.unique_key = unique_key
+        self.documents: list[dict] = []
+        self._by_id: dict[Any, dict] = {}
+        self._by_key: dict[Any, dict] = {}
+        self._by_user: dict[Any, list[dict]] = {}
+        self._user_sorted: dict[Any, tuple[list[dict], list[tuple]]] = {}
+        self._ids = itertools.count(1)
+        self.operations: dict[str, int] = {}
+        # Documents returned by find cursors
+        self.documents_read = 0
+
+    async def _delay(self, scanned: int = 0):
+        delay = self.latency + self.scan * scanned
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _count(self, operation: str):
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+
+    def _candidates(self, query: dict) -> list[dict]:
+        if "_id" in query and not isinstance(query["_id"], dict):
+            document = self._by_id.get(query["_id"])
+            return [document] if document else []
+        user_id = query.get("user_id")
+        if isinstance(user_id, str):
+            return self._by_user.get(user_id, [])
+        key = query.get(self.unique_key) if self.unique_key else None
+        if isinstance(key, str):
+            document = self._by_key.get(key)
+            return [document] if document else []
+        return self.documents
+
+    def _insert(self, document: dict) -> None:
+        document = dict(document)
+        document.setdefault("_id", next(self._ids))
+        if document["_id"] in self._by_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error: _id: {document['_id']}")
+        if self.unique_key:
+            key = document.get(self.unique_key)
+            if key in self._by_key:
+                raise DuplicateKeyError(f"E11000 duplicate key error: {self.unique_key}: {key}")
+            self._by_key[key] = document
+        self._by_id[document["_id"]] = document
+        self.documents.append(document)
+        if "user_id" in document:
+            self._by_user.setdefault(document["user_id"], []).append(document)
+            self._user_sorted.pop(document["user_id"], None)
+
+    def _delete(self, document: dict) -> None:
+        self.documents.remove(document)
+        self._by_id.pop(document["_id"], None)
+        if self.unique_key:
+            self._by_key.pop(document.get(self.unique_key), None)
+        if "user_id" in document:
+            self._by_user[document["user_id"]].remove(document)
+            self._user_sorted.pop(document["user_id"], None)
+
+    def _user_index(self, user_id: str) -> tuple[list[dict], list[tuple]]:
+        """The user's documents sorted by (timestamp, event_id) ascending, with their keys."""
+        index = self._user_sorted.get(user_id)
+        if index is None:
+            documents = sorted(self._by_user.get(user_id, []), key=lambda d: (d.get("timestamp"), d.get("event_id")))
+            index = self._user_sorted[user_id] = (documents, [(d.get("timestamp"), d.get("event_id")) for d in documents])
+        return index
+
+    def load(self, documents: list[dict]) -> None:
+        """Bulk load without latency, for scenario setup."""
+        for document in documents:
+            self._insert(document)
+
+    async def create_index(self, *args, **kwargs):
+        return "fake_index"
+
+    async def insert_one(self, document: dict):
+        self._count("insert")
+        await self._delay(1)
+        self._insert(document)
+        return SimpleNamespace(inserted_id=document.get("_id"))
+
+    async def insert_many(self, documents: list[dict], ordered: bool = True):
+        self._count("insert")
+        await self._delay(len(documents))
+        errors = []
+        for index, document in enumerate(documents):
+            try:
+                self._insert(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+        return SimpleNamespace(inserted_ids=[document.get("_id") for document in documents])
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        self._count("find")
+        query = query or {}
+        return FakeCursor(self, query, projection)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        self._count("find")
+        await self._delay(1)
+        query = query or {}
+        for document in self._candidates(query):
+            if matches(document, query):
+                return _project(document, projection)
+        return None
+
+    async def count_documents(self, query: dict, **kwargs):
+        self._count("find")
+        candidates = self._candidates(query)
+        await self._delay(len(candidates))
+        return sum(1 for document in candidates if matches(document, query))
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False, **kwargs):
+        self._count("update")
+        await self._delay(1)
+        for document in self._candidates(query):
+            if matches(document, query):
+                changed = _apply_update(document, update)
+                return SimpleNamespace(matched_count=1, modified_count=int(changed), upserted_id=None)
+        if upsert:
+            document = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+            document.update(update.get("$setOnInsert", {}))
+            _apply_update(document, update)
+            self._insert(document)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document.get("_id"))
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query: dict, update: dict, **kwargs):
+        self._count("update")
+        candidates = [document for document in self._candidates(query) if matches(document, query)]
+        await self._delay(len(candidates))
+        modified = sum(1 for document in candidates if _apply_update(document, update))
+        return SimpleNamespace(matched_count=len(candidates), modified_count=modified)
+
+    async def delete_many(self, query: dict, **kwargs):
+        self._count("delete")
+        candidates = [document for document in self._candidates(query) if matches(document, query)]
+        await self._delay(len(candidates))
+        for document in candidates:
+            self._delete(document)
+        return SimpleNamespace(deleted_count=len(candidates))
+
+    async def find_one_and_delete(self, query: dict, projection: Optional[dict] = None, **kwargs):
+        self._count("delete")
+        await self._delay(1)
+        for document in self._candidates(query):
+            if matches(document, query):
+                self._delete(document)
+                return _project(document, projection)
+        return None
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs):
+        self._count("update")
+        await self._delay(len(requests))
+        for request in requests:
+            # pymongo UpdateOne / InsertOne keep their arguments in private attributes
+            if hasattr(request, "_doc") and hasattr(request, "_filter"):
+                query, update, upsert = request._filter, request._doc, request._upsert
+                found = next((d for d in self._candidates(query) if matches(d, query)), None)
+                if found is not None:
+                    _apply_update(found, update)
+                elif upsert:
+                    document = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+                    document.update(update.get("$setOnInsert", {}))
+                    _apply_update(document, update)
+                    self._insert(document)
+            elif hasattr(request, "_doc"):
+                self._insert(request._doc)
+        return SimpleNamespace(acknowledged=True)
+
+    def aggregate(self, pipeline: list):
+        raise NotImplementedError("Aggregations are not supported by the fake collection")
@@ -0,0 +1,467 @@
+"""
+End-to-end benchmark suite for the notification system, without docker-compose.
+
+Kafka and MongoDB are replaced by the in-memory stand-ins of `benchmarks/fakes.py`
+(with injected latency), everything else is the real service code: the producer API is
+driven over ASGI, the consumer runs `consume_events` and the read endpoint is called
+through the notification-service app.
+
+Scenarios:
+    producer  - POST /api/v1/events (sync and async delivery) and POST /api/v1/events/batch
+    consumer  - ingestion rate of consume_events for each consumer mode
+    read      - GET /notifications/{user_id} latency at several user history sizes
+    storage   - read latency and storage size of the document and bucket layouts
+
+Each scenario reports p50/p95/p99 latency (ms) and events/sec; results are written as
+JSON (with the git commit) so runs can be compared with `benchmarks/compare.py`.
+
+Usage (from the repository root, requires httpx):
+    python benchmarks/run.py
+    python benchmarks/run.py --scenarios consumer --events 20000 --mongo-latency-ms 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bson
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SERVICES = REPO_ROOT / "notification-system" / "services"
+sys.path[:0] = [
+    str(SERVICES / "notification-producer-api" / "src"),
+    str(SERVICES / "notification-service" / "src"),
+]
+
+import httpx  # noqa: E402
+
+from fakes import FakeBroker, FakeCollection, FakeKafkaAdminClient, FakeKafkaConsumer, FakeKafkaProducer  # noqa: E402
+
+
+EVENT_TYPES = ["notification.created", "notification.sent", "notification.failed", "user.registered", "user.updated"]
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, params: dict, latencies: list[float], events: int, elapsed: float) -> dict:
+    result = {
+        "name": name,
+        "params": params,
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "events_per_sec": round(events / elapsed, 1) if elapsed else 0.0,
+    }
+    print(
+        f"{name:<45} p50={result['p50_ms']:>9.3f}ms p95={result['p95_ms']:>9.3f}ms "
+        f"p99={result['p99_ms']:>9.3f}ms {result['events_per_sec']:>11.1f} events/s"
+    )
+    return result
+
+
+def make_event_request(users: int) -> dict:
+    return {
+        "event_type": random.choice(EVENT_TYPES),
+        "user_id": f"user-{random.randrange(users)}",
+        "payload": {"title": "Benchmark notification", "priority": "high"},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Producer
+# ---------------------------------------------------------------------------
+
+async def run_producer(args) -> list[dict]:
+    import notification_producer_api.infrastructure.kafka_producer as kafka_producer
+    from notification_producer_api.config import settings
+    from notification_producer_api.main import app
+
+    results = []
+    variants = [("sync", None), ("async", None), ("sync", args.batch_size)]
+
+    for delivery_mode, batch_size in variants:
+        broker = FakeBroker(args.partitions)
+        settings.kafka_delivery_mode = delivery_mode
+        kafka_producer.AIOKafkaProducer = lambda **kwargs: FakeKafkaProducer(broker, args.kafka_latency_ms, **kwargs)
+        await kafka_producer.init_kafka_producer()
+
+        requests = args.requests if batch_size is None else max(1, args.requests // batch_size)
+        latencies: list[float] = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            async def one_request():
+                if batch_size is None:
+                    url, body = "/api/v1/events", make_event_request(args.users)
+                else:
+                    url, body = "/api/v1/events/batch", [make_event_request(args.users) for _ in range(batch_size)]
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(url, json=body)
+                    latencies.append(time.perf_counter() - start)
+                if response.status_code != 202:
+                    raise RuntimeError(f"{url} returned {response.status_code}: {response.text}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one_request() for _ in range(requests)))
+            elapsed = time.perf_counter() - start
+
+        await kafka_producer.close_kafka_producer()
+
+        name = f"producer.{'batch' if batch_size else 'single'}.{delivery_mode}"
+        params = {"delivery_mode": delivery_mode, "batch_size": batch_size or 1, "concurrency": args.concurrency}
+        results.append(summarize(name, params, latencies, requests * (batch_size or 1), elapsed))
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Consumer
+# ---------------------------------------------------------------------------
+
+def fill_topic(broker: FakeBroker, topic: str, events: int, users: int, poison_rate: float = 0.0) -> None:
+    from notification_service.infrastructure.codec import CODEC_HEADER, SCHEMA_VERSION_HEADER, get_codec
+
+    codec = get_codec("json")
+    # Same records as the producer API writes: validated payloads, schema version in a header
+    headers = [(CODEC_HEADER, codec.name.encode("utf-8")), (SCHEMA_VERSION_HEADER, b"1")]
+    now = datetime.utcnow()
+    for index in range(events):
+        user_id = f"user-{random.randrange(users)}"
+        event = {
+            "event_id": str(uuid.uuid4()),
+            "event_type": random.choice(EVENT_TYPES),
+            "user_id": user_id,
+            "payload": {"title": "Benchmark notification", "index": index},
+            "schema_version": 1,
+            "timestamp": (now + timedelta(microseconds=index)).isoformat(),
+        }
+        if random.random() < poison_rate:
+            # Fails validation in the consumer: routed to the dead letter topic
+            event["event_id"] = None
+        broker.append(topic, codec.encode(event), user_id.encode("utf-8"), None, headers)
+
+
+def use_fake_database(args) -> FakeCollection:
+    from notification_service.infrastructure import database
+
+    collection = FakeCollection("notifications", args.mongo_latency_ms, args.mongo_scan_us)
+    database._collection = collection
+    database._counters_collection = FakeCollection("notification_counters", args.mongo_latency_ms, unique_key=None)
+    return collection
+
+
+async def run_consumer(args) -> list[dict]:
+    from notification_service.config import settings
+    from notification_service.infrastructure import kafka_consumer, retry_topics
+
+    results = []
+    for mode in args.consumer_modes:
+        broker = FakeBroker(args.partitions)
+        fill_topic(broker, settings.kafka_topic, args.events, args.users, args.poison_rate)
+        use_fake_database(args)
+        retry_topics.AIOKafkaProducer = lambda **kwargs: FakeKafkaProducer(broker, args.kafka_latency_ms, **kwargs)
+        retry_topics.AIOKafkaAdminClient = lambda **kwargs: FakeKafkaAdminClient(broker, **kwargs)
+        # Created up front, like the kafka-init service of docker-compose
+        for topic in retry_topics.failure_router.topics:
+            broker.partitions_for(topic)
+
+        consumers: list[FakeKafkaConsumer] = []
+
+        def make_consumer(*topics, **kwargs):
+            consumer = FakeKafkaConsumer(broker, settings.kafka_topic, args.kafka_latency_ms, **kwargs)
+            consumers.append(consumer)
+            return consumer
+
+        settings.kafka_consumer_mode = mode
+        kafka_consumer.AIOKafkaConsumer = make_consumer
+        kafka_consumer._should_stop = False
+
+        start = time.perf_counter()
+        task = asyncio.create_task(kafka_consumer.consume_events())
+        while broker.committed_records(settings.kafka_topic) < args.events:
+            if task.done():
+                raise RuntimeError(f"consume_events stopped early in mode '{mode}'")
+            await asyncio.sleep(0.005)
+        elapsed = time.perf_counter() - start
+
+        kafka_consumer._should_stop = True
+        for consumer in consumers:
+            await consumer.stop()
+        await asyncio.wait_for(task, timeout=10)
+
+        params = {"mode": mode, "events": args.events, "users": args.users, "partitions": args.partitions}
+        if args.poison_rate:
+            params["poison_rate"] = args.poison_rate
+            params["dead_lettered"] = broker.total_records(retry_topics.failure_router.dead_letter_topic)
+        main_consumer = next(consumer for consumer in consumers if settings.kafka_topic in consumer.topics)
+        results.append(summarize(f"consumer.{mode}", params, main_consumer.commit_latencies, args.events, elapsed))
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Read endpoint
+# ---------------------------------------------------------------------------
+
+def make_history(size: int) -> list[dict]:
+    """`size` notifications of one user, one per second, newest first."""
+    now = datetime.utcnow()
+    return [
+        {
+            "event_id": f"evt-{index:08d}",
+            "event_type": random.choice(EVENT_TYPES),
+            "user_id": "bench-user",
+            "timestamp": now - timedelta(seconds=index),
+            "payload": {"title": "Benchmark notification", "index": index},
+            "read": index % 2 == 0,
+            "read_at": None,
+            "created_at": now,
+        }
+        for index in range(size)
+    ]
+
+
+async def run_read(args) -> list[dict]:
+    from notification_service.main import app
+    from notification_service.services.notification_service import notification_service
+    from notification_service.services.pagination import encode_cursor
+
+    limit = 50
+    results = []
+    cache = notification_service.cache
+    # Measure the database path: the cache would serve every repeated request
+    notification_service.cache = None
+
+    try:
+        for size in args.history_sizes:
+            collection = use_fake_database(args)
+            history = make_history(size)
+            collection.load(history)
+
+            deep_skip = max(0, size - limit)
+            deep_cursor = encode_cursor(history[deep_skip - 1]) if deep_skip else None
+            variants = {
+                "first_page": {"limit": limit},
+                "deep_page.skip": {"limit": limit, "skip": deep_skip},
+            }
+            if deep_cursor:
+                variants["deep_page.cursor"] = {"limit": limit, "cursor": deep_cursor}
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                for variant, params in variants.items():
+                    latencies = []
+                    start = time.perf_counter()
+                    for _ in range(args.read_requests):
+                        request_start = time.perf_counter()
+                        response = await client.get("/notifications/bench-user", params=params)
+                        latencies.append(time.perf_counter() - request_start)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"read returned {response.status_code}: {response.text}")
+                    elapsed = time.perf_counter() - start
+                    results.append(summarize(
+                        f"read.{variant}.history_{size}",
+                        {"history_size": size, **{k: v for k, v in params.items() if k != "cursor"}},
+                        latencies,
+                        args.read_requests * limit,
+                        elapsed,
+                    ))
+    finally:
+        notification_service.cache = cache
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Storage layouts
+# ---------------------------------------------------------------------------
+
+async def run_storage(args) -> list[dict]:
+    """
+    First page and deep cursor page of the read endpoint with the notifications stored one
+    per document and packed in buckets, with the storage each layout needs: documents, BSON
+    data size and index entries (_id, plus event_id and (user_id, timestamp, event_id) for
+    documents, (user_id, window), (user_id, newest) and one multikey entry per notification
+    for buckets).
+    """
+    from notification_service.config import settings
+    from notification_service.infrastructure import database
+    from notification_service.infrastructure.bucket_store import BucketPacker, BucketStore
+    from notification_service.infrastructure.notification_store import DocumentStore
+    from notification_service.main import app
+    from notification_service.services.notification_service import notification_service
+    from notification_service.services.pagination import encode_cursor
+
+    limit = 50
+    results = []
+    cache, store = notification_service.cache, notification_service.store
+    notification_service.cache = None
+    bucket_store = BucketStore(
+        window_seconds=settings.storage_bucket_window_seconds,
+        max_notifications=settings.storage_bucket_max_notifications,
+        max_bytes=settings.storage_bucket_max_bytes,
+    )
+
+    try:
+        for size in args.history_sizes:
+            history = make_history(size)
+            documents = use_fake_database(args)
+            documents.load(history)
+
+            packer = BucketPacker(bucket_store)
+            buckets = [b for b in map(packer.add, sorted(history, key=lambda d: d["timestamp"])) if b is not None]
+            buckets.append(packer.flush())
+            # The unique index is on the embedded event_ids: not modelled by the fake
+            database._buckets_collection = FakeCollection(
+                "notification_buckets", args.mongo_latency_ms, args.mongo_scan_us, unique_key=None
+            )
+            database._buckets_collection.load(buckets)
+
+            layouts = {
+                "document": (DocumentStore(), documents, {
+                    "documents": size,
+                    "data_bytes": sum(len(bson.encode(d)) for d in history),
+                    "index_entries": 3 * size,
+                }),
+                "bucket": (bucket_store, database._buckets_collection, {
+                    "documents": len(buckets),
+                    "data_bytes": sum(len(bson.encode(b)) for b in buckets),
+                    "index_entries": 3 * len(buckets) + size,
+                }),
+            }
+            deep_skip = max(0, size - limit)
+            variants = {"first_page": {"limit": limit}}
+            if deep_skip:
+                variants["deep_page.cursor"] = {"limit": limit, "cursor": encode_cursor(history[deep_skip - 1])}
+
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                for layout, (layout_store, collection, storage) in layouts.items():
+                    notification_service.store = layout_store
+                    for variant, params in variants.items():
+                        collection.documents_read = 0
+                        latencies = []
+                        start = time.perf_counter()
+                        for _ in range(args.read_requests):
+                            request_start = time.perf_counter()
+                            response = await client.get("/notifications/bench-user", params=params)
+                            latencies.append(time.perf_counter() - request_start)
+                            if response.status_code != 200 or len(response.json()["notifications"]) != limit:
+                                raise RuntimeError(f"read returned {response.status_code}: {response.text[:200]}")
+                        elapsed = time.perf_counter() - start
+                        results.append(summarize(
+                            f"storage.{layout}.{variant}.history_{size}",
+                            {
+                                "history_size": size,
+                                "limit": limit,
+                                **storage,
+                                "documents_read_per_request": collection.documents_read / args.read_requests,
+                                # Approximation from the average document size
+                                "bytes_read_per_request": round(
+                                    collection.documents_read / args.read_requests * storage["data_bytes"] / storage["documents"]
+                                ),
+                            },
+                            latencies,
+                            args.read_requests * limit,
+                            elapsed,
+                        ))
+    finally:
+        notification_service.cache, notification_service.store = cache, store
+
+    return results
+
+
+# ---------------------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="producer,consumer,read", help="Comma separated scenarios to run")
+    parser.add_argument("--output", type=Path, help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="WARNING", help="Root log level while benchmarking")
+    parser.add_argument(
+        "--log-async", action=argparse.BooleanOptionalAction, default=True,
+        help="Log through the services' background queue (--no-log-async writes synchronously)",
+    )
+
+    parser.add_argument("--kafka-latency-ms", type=float, default=2.0, help="Broker ack / fetch latency")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="Round trip latency of every Mongo operation")
+    parser.add_argument("--mongo-scan-us", type=float, default=2.0, help="Extra latency per document examined")
+    parser.add_argument("--partitions", type=int, default=3)
+    parser.add_argument("--users", type=int, default=1000)
+
+    parser.add_argument("--requests", type=int, default=2000, help="Producer: number of events to publish")
+    parser.add_argument("--concurrency", type=int, default=50, help="Producer: concurrent HTTP requests")
+    parser.add_argument("--batch-size", type=int, default=100, help="Producer: events per batch request")
+
+    parser.add_argument("--events", type=int, default=5000, help="Consumer: events in the topic")
+    parser.add_argument("--consumer-modes", default="single,batch,concurrent")
+    parser.add_argument("--poison-rate", type=float, default=0.0, help="Consumer: share of invalid events in the topic")
+
+    parser.add_argument("--history-sizes", default="100,1000,10000", help="Read, storage: notifications stored for the user")
+    parser.add_argument("--read-requests", type=int, default=200, help="Read, storage: requests per variant")
+
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    args.consumer_modes = [m.strip() for m in args.consumer_modes.split(",") if m.strip()]
+    args.history_sizes = [int(s) for s in args.history_sizes.split(",") if s.strip()]
+    return args
+
+
+async def main():
+    args = parse_args()
+    random.seed(args.seed)
+    # The services install the root log handler from their settings when first imported
+    os.environ["LOG_LEVEL"] = args.log_level
+    os.environ["LOG_ASYNC"] = str(args.log_async).lower()
+    # Measure the consumer with its failure routing, as deployed by docker-compose
+    os.environ["KAFKA_FAILURE_ROUTING_ENABLED"] = "true"
+
+    runners = {"producer": run_producer, "consumer": run_consumer, "read": run_read, "storage": run_storage}
+    unknown = set(args.scenarios) - set(runners)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    scenarios = []
+    for name in args.scenarios:
+        scenarios.extend(await runners[name](args))
+
+    commit = git_commit()
+    output = args.output or REPO_ROOT / "benchmarks" / "results" / f"{commit[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "commit": commit,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "parameters": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()},
+        "scenarios": scenarios,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
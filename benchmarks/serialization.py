@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: serialization cost of a GET /notifications/{user_id} response.
+
+Compares the previous read path (pop `_id` in a Python loop, stdlib JSONResponse, which
+needs jsonable_encoder to cope with the datetime fields) with the current one (`_id`
+excluded by the Mongo projection, OrjsonResponse).
+
+Usage (from the repository root):
+    PYTHONPATH=notification-system/services/notification-service/src python benchmarks/serialization.py
+"""
+import argparse
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from notification_service.api.responses import OrjsonResponse
+
+
+def make_page(size: int, with_id: bool) -> list[dict]:
+    now = datetime.utcnow()
+    page = []
+    for index in range(size):
+        document = {
+            "event_id": str(uuid.uuid4()),
+            "event_type": "notification.created",
+            "user_id": "user-123",
+            "timestamp": now - timedelta(seconds=index),
+            "payload": {"title": f"Notification {index}", "priority": "high", "tags": ["a", "b", "c"]},
+            "read": index % 3 == 0,
+            "created_at": now,
+        }
+        if with_id:
+            document["_id"] = ObjectId()
+        page.append(document)
+    return page
+
+
+def before(notifications: list[dict]) -> bytes:
+    for notification in notifications:
+        notification.pop("_id", None)
+    content = {"user_id": "user-123", "count": len(notifications), "notifications": notifications}
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def after(notifications: list[dict]) -> bytes:
+    content = {"user_id": "user-123", "count": len(notifications), "notifications": notifications}
+    return OrjsonResponse(content=content).body
+
+
+def measure(function, with_id: bool, page_size: int, number: int) -> float:
+    """Return the mean serialization time in µs; pages are built beforehand and not timed."""
+    pages = iter([make_page(page_size, with_id) for _ in range(number)])
+    elapsed = timeit.timeit(lambda: function(next(pages)), number=number)
+    return elapsed / number * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    before_us = measure(before, True, args.page_size, args.number)
+    after_us = measure(after, False, args.page_size, args.number)
+    print(f"before (pop _id + jsonable_encoder + JSONResponse): {before_us:.1f} µs/request (page_size={args.page_size})")
+    print(f"after (projection + OrjsonResponse): {after_us:.1f} µs/request (page_size={args.page_size})")
+    print(f"speedup: {before_us / after_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,325 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Body, Header, HTTPException, status
 from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 from datetime import datetime
+from typing import Optional
+import hashlib
+import json
+import math
 import uuid
 
-from notification_producer_api.infrastructure.kafka_producer import publish_event
-from notification_producer_api.domain.events import EventRequest, EventType
-from notification_producer_api.config import logger
+from notification_producer_api.infrastructure.kafka_producer import (
+    get_delivery_stats,
+    get_spool_stats,
+    publish_event,
+    publish_events,
+    spool_backlog,
+    spool_enabled,
+    spool_event,
+)
+from notification_producer_api.infrastructure.spool import SpoolFullError
+from notification_producer_api.infrastructure.idempotency import InMemoryIdempotencyStore, IdempotencyStore
+from notification_producer_api.infrastructure.metrics import EVENTS_TOTAL, IDEMPOTENT_REPLAYS
+from notification_producer_api.infrastructure.rate_limiter import AdmissionController, TokenBucketLimiter
+from notification_producer_api.domain.events import EventRequest, EventType, payload_schemas
+from notification_producer_api.config import HOT_PATH, logger, settings
 
 
 router = APIRouter(prefix="/api/v1")
 
-@router.post("/events")
-async def create_event(request: EventRequest):
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+idempotency_store: Optional[IdempotencyStore] = InMemoryIdempotencyStore(
+    max_entries=settings.idempotency_max_entries,
+    ttl_seconds=settings.idempotency_ttl_seconds,
+) if settings.idempotency_enabled else None
+
+admission: Optional[AdmissionController] = AdmissionController(
+    global_limiter=TokenBucketLimiter(settings.rate_limit_global_per_second, settings.rate_limit_global_burst),
+    event_type_limiter=TokenBucketLimiter(
+        settings.rate_limit_event_type_per_second,
+        settings.rate_limit_event_type_burst,
+        max_keys=len(EventType),
+    ),
+    user_limiter=TokenBucketLimiter(
+        settings.rate_limit_user_per_second,
+        settings.rate_limit_user_burst,
+        max_keys=settings.rate_limit_max_users,
+        idle_seconds=settings.rate_limit_idle_seconds,
+    ),
+) if settings.rate_limit_enabled else None
+
 
-    event = {
+def build_event(request: EventRequest) -> dict:
+    return {
         "event_id": str(uuid.uuid4()),
         "event_type": request.event_type,
         "user_id": request.user_id,
         "payload": request.payload,
+        "schema_version": request.payload_schema_version,
         "timestamp": datetime.utcnow().isoformat(),
     }
 
+
+def admit(request: EventRequest) -> Optional[int]:
+    """Admission control for one event: None when admitted, else the Retry-After in seconds."""
+    if admission is None:
+        return None
+    wait = admission.admit(request.user_id, request.event_type.value)
+    if wait is None:
+        return None
+    EVENTS_TOTAL.labels(request.event_type.value, "rate_limited").inc()
+    return max(1, math.ceil(min(wait, 3600)))
+
+
+def spool_full_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Kafka is unavailable and the local spool is full, retry later",
+        headers={"Retry-After": str(settings.spool_retry_after_seconds)},
+    )
+
+
+async def publish_or_spool(event: dict) -> bool:
+    """
+    Publish an event, falling back to the disk spool when Kafka is unavailable.
+
+    While spooled events wait for replay, new events are spooled behind them so the
+    order is kept. Returns True when the event was spooled; raises SpoolFullError.
+    """
+    if spool_backlog():
+        await spool_event(settings.kafka_topic, event)
+        return True
     try:
-        await publish_event(topic="notifications", event=event)
+        await publish_event(topic=settings.kafka_topic, event=event)
+        return False
+    except Exception as e:
+        if not spool_enabled():
+            raise
+        logger.warning("⚠️ Could not publish event %s, spooling it: %s", event["event_id"], e, extra=HOT_PATH)
+        await spool_event(settings.kafka_topic, event)
+        return True
 
-        return JSONResponse(
-            status_code=status.HTTP_202_ACCEPTED,
-            content={
-                "event_id": event["event_id"],
-                "event_type": event["event_type"],
-                "timestamp": event["timestamp"],
-                "status": "success",
-            },
+
+def request_fingerprint(request: EventRequest) -> str:
+    """Hash of the request body, to detect an Idempotency-Key reused for a different event."""
+    body = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+@router.post("/events")
+async def create_event(
+    request: EventRequest,
+    idempotency_key: Optional[str] = Header(None, description="Chave para reenviar a requisição sem duplicar o evento"),
+):
+    """
+    Publish one event.
+
+    With an Idempotency-Key header, a retry of an already published request gets the
+    original 202 response back (same event_id) and nothing is published again.
+    """
+    if idempotency_key is not None and idempotency_store is not None:
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must have between 1 and {IDEMPOTENCY_KEY_MAX_LENGTH} characters",
+            )
+
+        fingerprint = request_fingerprint(request)
+        record = await idempotency_store.claim(idempotency_key, fingerprint)
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request body",
+                )
+            if record.pending:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still being processed",
+                )
+            IDEMPOTENT_REPLAYS.inc()
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content=record.response,
+                headers={"Idempotent-Replayed": "true"},
+            )
+    else:
+        idempotency_key = None
+
+    retry_after = admit(request)
+    if retry_after is not None:
+        if idempotency_key is not None:
+            await idempotency_store.release(idempotency_key)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(retry_after)},
         )
+
+    event = build_event(request)
+
+    try:
+        spooled = await publish_or_spool(event)
+    except SpoolFullError as e:
+        if idempotency_key is not None:
+            await idempotency_store.release(idempotency_key)
+        logger.error(f"❌ Kafka unavailable and spool full, rejecting event: {str(e)}")
+        raise spool_full_exception()
     except Exception as e:
+        if idempotency_key is not None:
+            await idempotency_store.release(idempotency_key)
         logger.error(f"Unexpected error publishing event: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to publish event: {str(e)}",
         )
 
+    if spooled:
+        event_status = "spooled"
+    else:
+        event_status = "queued" if settings.kafka_delivery_mode == "async" else "success"
+    content = {
+        "event_id": event["event_id"],
+        "event_type": event["event_type"],
+        "timestamp": event["timestamp"],
+        "status": event_status,
+    }
+    if idempotency_key is not None:
+        await idempotency_store.complete(idempotency_key, content)
+
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=content)
+
+
+@router.post("/events/batch")
+async def create_events_batch(items: list[dict] = Body(..., description="Lista de eventos no formato de EventRequest")):
+    """
+    Publish a burst of events in a single request.
+
+    Each item is validated and published independently: invalid or undeliverable items
+    are reported as rejected without failing the rest of the batch.
+    """
+    if not items:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Batch must contain at least one event")
+    if len(items) > settings.events_batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size {len(items)} exceeds the limit of {settings.events_batch_max_size} events",
+        )
+
+    results: list[dict] = [{} for _ in items]
+    events: list[dict] = []
+    positions: list[int] = []
+    retry_after: Optional[int] = None
+
+    for index, item in enumerate(items):
+        try:
+            request = EventRequest.model_validate(item)
+        except ValidationError as e:
+            reason = "; ".join(f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors())
+            results[index] = {"index": index, "status": "rejected", "reason": reason}
+            # The item's event_type is untrusted here, keep it out of the label values
+            EVENTS_TOTAL.labels("invalid", "rejected").inc()
+            continue
+        wait = admit(request)
+        if wait is not None:
+            retry_after = max(retry_after or 0, wait)
+            results[index] = {"index": index, "status": "rejected", "reason": "Rate limit exceeded"}
+            continue
+        events.append(build_event(request))
+        positions.append(index)
+
+    spool_full = False
+    if events:
+        if spool_backlog():
+            # Keep the order behind the events already waiting in the spool: spool them all
+            outcomes: list[Optional[Exception]] = [RuntimeError("Spool backlog pending replay")] * len(events)
+        else:
+            try:
+                outcomes = await publish_events(topic=settings.kafka_topic, events=events)
+            except Exception as e:
+                if not spool_enabled():
+                    logger.error(f"Unexpected error publishing batch: {str(e)}", exc_info=True)
+                    raise HTTPException(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        detail=f"Failed to publish batch: {str(e)}",
+                    )
+                outcomes = [e] * len(events)
+
+        for index, event, error in zip(positions, events, outcomes):
+            accepted = {
+                "index": index,
+                "status": "accepted",
+                "event_id": event["event_id"],
+                "event_type": event["event_type"],
+                "timestamp": event["timestamp"],
+            }
+            if error is None:
+                results[index] = accepted
+            elif spool_enabled() and not spool_full:
+                try:
+                    await spool_event(settings.kafka_topic, event)
+                    results[index] = {**accepted, "spooled": True}
+                except SpoolFullError:
+                    spool_full = True
+                    results[index] = {"index": index, "status": "rejected", "reason": "Kafka is unavailable and the local spool is full"}
+            elif spool_full:
+                results[index] = {"index": index, "status": "rejected", "reason": "Kafka is unavailable and the local spool is full"}
+            else:
+                results[index] = {"index": index, "status": "rejected", "reason": f"Failed to publish event: {str(error)}"}
+
+    accepted = sum(1 for result in results if result["status"] == "accepted")
+    if spool_full:
+        retry_after = max(retry_after or 0, settings.spool_retry_after_seconds)
+
+    return JSONResponse(
+        # Nothing accepted because of the rate limit: the whole batch is over the limit
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS if accepted == 0 and retry_after is not None and not events else status.HTTP_202_ACCEPTED,
+        content={
+            "total": len(items),
+            "accepted": accepted,
+            "rejected": len(items) - accepted,
+            "results": results,
+        },
+        headers={"Retry-After": str(retry_after)} if retry_after is not None else None,
+    )
+
+
+@router.get("/events/deliveries")
+async def delivery_stats():
+    return get_delivery_stats()
+
+
+@router.get("/events/admission")
+async def admission_stats():
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.stats()}
+
+
+@router.get("/events/spool")
+async def spool_stats():
+    return get_spool_stats()
+
+
+@router.get("/events/idempotency")
+async def idempotency_stats():
+    if idempotency_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **idempotency_store.stats()}
+
+
 @router.get("/events/types")
 async def list_event_types():
     return {
         "event_types": [event_type.value for event_type in EventType],
+        "schema_versions": {event_type.value: payload_schemas.latest_version(event_type.value) for event_type in EventType},
         "description": "Supported event types for notification system",
     }
 
+
+@router.get("/events/schemas")
+async def list_payload_schemas():
+    """JSON Schema of the payload of each event type, per version."""
+    return payload_schemas.json_schemas()
@@ -1,9 +1,76 @@
 import logging
+from typing import Literal, Optional
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from notification_producer_api.logging_setup import HOT_PATH, configure_logging
+
+
 class Settings(BaseSettings):
     kafka_bootstrap_servers: list[str] = ["kafka:9092"]
+    kafka_topic: str = "notifications"
+    # "sync" waits for the broker ack on every request, "async" returns once the record is queued
+    kafka_delivery_mode: Literal["sync", "async"] = "sync"
+    # Wire format of the record values ("json", "orjson" or "msgpack") and batch compression
+    kafka_codec: Literal["json", "orjson", "msgpack"] = "json"
+    kafka_compression_type: Optional[Literal["gzip", "snappy", "lz4", "zstd"]] = None
+    # Record key: "user_id" keeps each user's events in one partition (ordered), "none" spreads them round-robin
+    kafka_partition_key: Literal["user_id", "none"] = "user_id"
+    # "default" hashes the key (murmur2), "hot_key" also spreads users above the rate threshold over a few partitions
+    kafka_partitioner: Literal["default", "hot_key"] = "default"
+    kafka_hot_key_threshold_per_second: float = 100.0
+    kafka_hot_key_spread: int = 4
+    kafka_hot_key_window_seconds: float = 1.0
+    kafka_hot_key_max_tracked: int = 100_000
+
+    # Batch ingestion settings
+    events_batch_max_size: int = 500
+
+    # Idempotency-Key support: how long and how many keys are remembered
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: float = 24 * 60 * 60
+    idempotency_max_entries: int = 100_000
+
+    # Admission control: token buckets per user, per event type and global (429 + Retry-After when exhausted)
+    rate_limit_enabled: bool = False
+    rate_limit_global_per_second: float = 5000.0
+    rate_limit_global_burst: int = 10_000
+    rate_limit_event_type_per_second: float = 2000.0
+    rate_limit_event_type_burst: int = 4000
+    rate_limit_user_per_second: float = 50.0
+    rate_limit_user_burst: int = 100
+    # Bounds of the per-user bucket table: idle buckets are evicted, then the least recently used
+    rate_limit_max_users: int = 100_000
+    rate_limit_idle_seconds: float = 60.0
+
+    # Local disk spool for events that cannot be published while Kafka is unavailable
+    spool_enabled: bool = False
+    spool_directory: str = "./spool"
+    spool_segment_max_bytes: int = 16 * 1024 * 1024
+    spool_max_bytes: int = 1024 * 1024 * 1024
+    # "always" fsyncs every append, "interval" at most every spool_fsync_interval_seconds, "never" leaves it to the OS
+    spool_fsync: Literal["always", "interval", "never"] = "interval"
+    spool_fsync_interval_seconds: float = 1.0
+    # Replay to Kafka once it recovers: events per second and per chunk
+    spool_replay_rate: int = 1000
+    spool_replay_batch_size: int = 100
+    # Retry-After sent with the 503 returned while the spool is full
+    spool_retry_after_seconds: int = 5
+
+    # Logging settings
+    log_level: str = "INFO"
+    # Write logs from a background thread fed by a bounded queue, so the event loop never blocks
+    # on stdout; when the queue is full records are dropped (counted in log_records_dropped),
+    # except errors, written directly by the caller
+    log_async: bool = True
+    log_queue_size: int = 10_000
+    # Hot-path messages (logged for every event with extra=HOT_PATH): share of them kept, then at
+    # most N per second for each message (None disables the limit); errors are always logged
+    log_hot_path_sample_rate: float = 1.0
+    log_hot_path_max_per_second: Optional[float] = 20.0
+    # Skip collecting the caller, thread and process details of every record (the log format uses
+    # none of them). Changes process-wide logging state, so uvicorn and library records are affected too
+    log_skip_record_context: bool = False
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -17,9 +84,13 @@ settings = Settings()
 
 class Logger:
     def __init__(self):
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        configure_logging(
+            level=settings.log_level,
+            log_async=settings.log_async,
+            queue_size=settings.log_queue_size,
+            hot_path_sample_rate=settings.log_hot_path_sample_rate,
+            hot_path_max_per_second=settings.log_hot_path_max_per_second,
+            skip_record_context=settings.log_skip_record_context,
         )
         self.logger = logging.getLogger("notification-producer-api")
 
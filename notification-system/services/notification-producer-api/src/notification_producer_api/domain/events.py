@@ -1,7 +1,16 @@
 from datetime import datetime
 from enum import Enum
 from typing import Any, Optional
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+
+from notification_producer_api.domain.schemas import (
+    NotificationCreatedV1,
+    NotificationFailedV1,
+    NotificationSentV1,
+    PayloadSchemaRegistry,
+    UserRegisteredV1,
+    UserUpdatedV1,
+)
 
 
 class EventType(str, Enum):
@@ -13,9 +22,36 @@ class EventType(str, Enum):
     USER_UPDATED = "user.updated"
 
 
+# Payload schemas of each event type, by version (validators are compiled here, at import)
+payload_schemas = PayloadSchemaRegistry({
+    EventType.NOTIFICATION_CREATED.value: {1: NotificationCreatedV1},
+    EventType.NOTIFICATION_SENT.value: {1: NotificationSentV1},
+    EventType.NOTIFICATION_FAILED.value: {1: NotificationFailedV1},
+    EventType.USER_REGISTERED.value: {1: UserRegisteredV1},
+    EventType.USER_UPDATED.value: {1: UserUpdatedV1},
+})
+
+
 class EventRequest(BaseModel):
     event_type: EventType = Field(..., description="Tipo do evento")
     user_id: str = Field(..., description="ID do usuário relacionado ao evento")
+    schema_version: Optional[int] = Field(None, description="Versão do schema do payload (padrão: a mais recente do tipo)")
     payload: dict = Field(..., description="Dados do evento")
 
+    @field_validator("payload")
+    @classmethod
+    def validate_payload(cls, payload: dict, info: ValidationInfo) -> dict:
+        event_type = info.data.get("event_type")
+        if event_type is None:
+            # The event_type error is already reported
+            return payload
+        version = info.data.get("schema_version")
+        if version is None:
+            version = payload_schemas.latest_version(event_type.value)
+        return payload_schemas.validate(event_type.value, version, payload)
 
+    @property
+    def payload_schema_version(self) -> int:
+        if self.schema_version is None:
+            return payload_schemas.latest_version(self.event_type.value)
+        return self.schema_version
@@ -0,0 +1,85 @@
+from typing import Literal
+
+from pydantic import ConfigDict, Field, TypeAdapter, ValidationError, with_config
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+
+Title = Annotated[str, Field(min_length=1, max_length=200)]
+Text = Annotated[str, Field(max_length=4000)]
+Priority = Literal["low", "normal", "high"]
+
+
+# Payload schemas: known fields are type-checked, other fields are kept as they are so
+# producers can add data without a new version. A change to a known field needs a new version.
+
+@with_config(ConfigDict(extra="allow"))
+class NotificationCreatedV1(TypedDict):
+    title: NotRequired[Title]
+    notification_title: NotRequired[Title]
+    body: NotRequired[Text]
+    priority: NotRequired[Priority]
+
+
+@with_config(ConfigDict(extra="allow"))
+class NotificationSentV1(TypedDict):
+    notification_id: NotRequired[str]
+    title: NotRequired[Title]
+    channel: NotRequired[Literal["email", "sms", "push", "in_app"]]
+
+
+@with_config(ConfigDict(extra="allow"))
+class NotificationFailedV1(TypedDict):
+    notification_id: NotRequired[str]
+    title: NotRequired[Title]
+    reason: NotRequired[Text]
+
+
+@with_config(ConfigDict(extra="allow"))
+class UserRegisteredV1(TypedDict):
+    title: NotRequired[Title]
+    name: NotRequired[Annotated[str, Field(max_length=200)]]
+    email: NotRequired[Annotated[str, Field(max_length=320, pattern=r"^[^@\s]+@[^@\s]+$")]]
+
+
+@with_config(ConfigDict(extra="allow"))
+class UserUpdatedV1(TypedDict):
+    title: NotRequired[Title]
+    changed_fields: NotRequired[list[str]]
+
+
+class PayloadSchemaRegistry:
+    """
+    Payload schema of each event type, per version, compiled once into a validator.
+
+    Events are validated against the latest version of their type unless the request
+    asks for an older one; the version travels with the event (body and record header).
+    """
+
+    def __init__(self, schemas: dict[str, dict[int, type]]):
+        self._validators: dict[tuple[str, int], TypeAdapter] = {
+            (event_type, version): TypeAdapter(schema)
+            for event_type, versions in schemas.items()
+            for version, schema in versions.items()
+        }
+        self._latest: dict[str, int] = {event_type: max(versions) for event_type, versions in schemas.items()}
+
+    def latest_version(self, event_type: str) -> int:
+        return self._latest[event_type]
+
+    def validate(self, event_type: str, version: int, payload: dict) -> dict:
+        """Validated payload (types coerced, extra fields kept); raises ValueError listing every problem found."""
+        validator = self._validators.get((event_type, version))
+        if validator is None:
+            raise ValueError(f"Unknown schema version {version} for event type '{event_type}'")
+        try:
+            return validator.validate_python(payload)
+        except ValidationError as e:
+            raise ValueError(
+                "; ".join(f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors())
+            ) from None
+
+    def json_schemas(self) -> dict[str, dict[int, dict]]:
+        schemas: dict[str, dict[int, dict]] = {}
+        for (event_type, version), validator in sorted(self._validators.items()):
+            schemas.setdefault(event_type, {})[version] = validator.json_schema()
+        return schemas
@@ -0,0 +1,95 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+# Kafka record header carrying the name of the codec used to encode the value
+CODEC_HEADER = "codec"
+# Kafka record header carrying the version of the payload schema the event was validated against
+SCHEMA_VERSION_HEADER = "schema-version"
+
+
+class Codec(ABC):
+    """Encodes event dicts to bytes for the wire and back."""
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, value: dict) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> dict:
+        ...
+
+
+class JsonCodec(Codec):
+    name = "json"
+
+    def encode(self, value: dict) -> bytes:
+        return json.dumps(value).encode("utf-8")
+
+    def decode(self, data: bytes) -> dict:
+        return json.loads(data.decode("utf-8"))
+
+
+class OrjsonCodec(Codec):
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError as e:
+            raise RuntimeError("orjson codec requires the 'orjson' package to be installed") from e
+        self._orjson = orjson
+
+    def encode(self, value: dict) -> bytes:
+        return self._orjson.dumps(value)
+
+    def decode(self, data: bytes) -> dict:
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError as e:
+            raise RuntimeError("msgpack codec requires the 'msgpack' package to be installed") from e
+        self._msgpack = msgpack
+
+    def encode(self, value: dict) -> bytes:
+        return self._msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> dict:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+_CODEC_CLASSES: dict[str, type[Codec]] = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+_codecs: dict[str, Codec] = {}
+
+
+def get_codec(name: str) -> Codec:
+    """Return the (cached) codec instance registered under `name`."""
+    codec = _codecs.get(name)
+    if codec is None:
+        codec_class = _CODEC_CLASSES.get(name)
+        if codec_class is None:
+            raise ValueError(f"Unknown codec '{name}'. Supported codecs: {', '.join(_CODEC_CLASSES)}")
+        codec = _codecs[name] = codec_class()
+    return codec
+
+
+def codec_from_headers(headers: Optional[list[tuple[str, bytes]]], default: str) -> Codec:
+    """Pick the codec named in the record headers, falling back to `default` for unmarked records."""
+    for key, value in headers or ():
+        if key == CODEC_HEADER:
+            return get_codec(value.decode("utf-8"))
+    return get_codec(default)
@@ -0,0 +1,95 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class IdempotencyRecord:
+    """What the store remembers for an Idempotency-Key: the request fingerprint and, once published, the response."""
+
+    def __init__(self, fingerprint: str, response: Optional[dict] = None):
+        self.fingerprint = fingerprint
+        self.response = response
+
+    @property
+    def pending(self) -> bool:
+        return self.response is None
+
+
+class IdempotencyStore(ABC):
+    """
+    Storage of Idempotency-Key records.
+
+    Methods are async so a shared, out-of-process backend (e.g. Redis with SET NX + EX)
+    can implement the same interface and let several replicas share the keys.
+    """
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        """
+        Atomically reserve `key` for a new request.
+
+        Returns None when the key was free (the caller now owns it and must `complete` or
+        `release` it), otherwise the existing record.
+        """
+
+    @abstractmethod
+    async def complete(self, key: str, response: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """Forget a claimed key whose request failed, so the client can retry it."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """In-process store bounded in entries; keys are kept in claim order, so the oldest expire (or are evicted) first."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, record)
+        self._entries: OrderedDict[str, tuple[float, IdempotencyRecord]] = OrderedDict()
+
+        self.hits = 0
+        self.evictions = 0
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[IdempotencyRecord]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= now:
+            self.hits += 1
+            return entry[1]
+
+        self._entries[key] = (now + self.ttl_seconds, IdempotencyRecord(fingerprint))
+        self._entries.move_to_end(key)
+        self._evict(now)
+        return None
+
+    async def complete(self, key: str, response: dict) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1].response = response
+
+    async def release(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self, now: float) -> None:
+        while self._entries:
+            key, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at >= now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+            self.evictions += 1
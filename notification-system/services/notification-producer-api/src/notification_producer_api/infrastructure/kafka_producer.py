@@ -1,26 +1,71 @@
-import json
 import asyncio
+import time
 from typing import Optional
 from aiokafka import AIOKafkaProducer
-from notification_producer_api.config import settings, logger
+from notification_producer_api.config import HOT_PATH, settings, logger
+from notification_producer_api.infrastructure.codec import CODEC_HEADER, SCHEMA_VERSION_HEADER, get_codec
+from notification_producer_api.infrastructure.metrics import (
+    PUBLISH_EVENT_SECONDS,
+    PUBLISH_EVENTS_SECONDS,
+    RECORDS_IN_FLIGHT,
+    SPOOL_BYTES,
+    count_event,
+)
+from notification_producer_api.infrastructure.partitioner import build_partitioner
+from notification_producer_api.infrastructure.spool import DiskSpool
 
 
 
 _producer: Optional[AIOKafkaProducer] = None
+_record_headers: list[tuple[str, bytes]] = []
+# Record headers with the payload schema version, per version
+_versioned_headers: dict[int, list[tuple[str, bytes]]] = {}
+
+# Delivery tracking for the "async" delivery mode
+_pending_deliveries: set[asyncio.Future] = set()
+_delivered_count = 0
+_failed_count = 0
+
+# Disk spool for events that failed to publish, replayed in background
+_spool: Optional[DiskSpool] = None
+_replay_task: Optional[asyncio.Task] = None
+# Spool writes of events whose async delivery failed
+_spool_tasks: set[asyncio.Task] = set()
 
 
 async def init_kafka_producer() -> AIOKafkaProducer:
-    global _producer
+    global _producer, _record_headers
 
 
     max_retries = 3
     retry_delay = 5
 
+    codec = get_codec(settings.kafka_codec)
+    _record_headers = [(CODEC_HEADER, codec.name.encode("utf-8"))]
+    _versioned_headers.clear()
+
     for attempt in range(max_retries):
         try:
-            _producer = AIOKafkaProducer(bootstrap_servers=settings.kafka_bootstrap_servers, value_serializer=lambda v: json.dumps(v).encode("utf-8"))
+            _producer = AIOKafkaProducer(
+                bootstrap_servers=settings.kafka_bootstrap_servers,
+                value_serializer=codec.encode,
+                compression_type=settings.kafka_compression_type,
+                partitioner=build_partitioner(
+                    settings.kafka_partitioner,
+                    hot_key_threshold_per_second=settings.kafka_hot_key_threshold_per_second,
+                    hot_key_spread=settings.kafka_hot_key_spread,
+                    hot_key_window_seconds=settings.kafka_hot_key_window_seconds,
+                    hot_key_max_tracked=settings.kafka_hot_key_max_tracked,
+                ),
+            )
             await _producer.start()
-            logger.info(f"✅ Kafka Producer conectado em {settings.kafka_bootstrap_servers}")
+            logger.info(
+                f"✅ Kafka Producer conectado em {settings.kafka_bootstrap_servers} "
+                f"(codec={codec.name}, compression={settings.kafka_compression_type}, "
+                f"key={settings.kafka_partition_key}, partitioner={settings.kafka_partitioner})"
+            )
+            if settings.spool_enabled:
+                _start_spool()
             return _producer
         except Exception as e:
             if attempt < max_retries - 1:
@@ -36,28 +81,279 @@ async def init_kafka_producer() -> AIOKafkaProducer:
 
 async def close_kafka_producer() -> None:
     global _producer
+    # The replay stops first: its current chunk is not checkpointed and is replayed on the next start
+    await _stop_replay()
+    if _producer:
+        # Flush records still sitting in the producer buffer before disconnecting
+        await _producer.flush()
+        if _pending_deliveries:
+            logger.info(f"⏳ Waiting for {len(_pending_deliveries)} pending deliveries...")
+            await asyncio.gather(*_pending_deliveries, return_exceptions=True)
+    # Deliveries that failed while flushing are spooled before the spool is closed
+    if _spool_tasks:
+        await asyncio.gather(*_spool_tasks, return_exceptions=True)
+    _close_spool()
     if _producer:
         await _producer.stop()
         _producer = None
         logger.info("❌ Kafka Producer disconnected")
 
 
+def _on_delivery(topic: str, event: dict, future: asyncio.Future) -> None:
+    global _delivered_count, _failed_count
+    _pending_deliveries.discard(future)
+    RECORDS_IN_FLIGHT.dec()
+
+    if future.cancelled():
+        _failed_count += 1
+        count_event(event, "failed")
+        logger.error(f"❌ Delivery cancelled for event {event.get('event_id')} on '{topic}'")
+        return
+
+    error = future.exception()
+    if error is not None:
+        _failed_count += 1
+        logger.error(f"❌ Error delivering event {event.get('event_id')} to '{topic}': {str(error)}")
+        if _spool is not None:
+            # The request was already answered: keep the event for replay instead of losing it
+            task = asyncio.ensure_future(_spool_after_failed_delivery(topic, event))
+            _spool_tasks.add(task)
+            task.add_done_callback(_spool_tasks.discard)
+        else:
+            count_event(event, "failed")
+    else:
+        _delivered_count += 1
+        count_event(event, "delivered")
+
+
+def _track_delivery(topic: str, event: dict, future: asyncio.Future) -> None:
+    _pending_deliveries.add(future)
+    RECORDS_IN_FLIGHT.inc()
+    future.add_done_callback(lambda f: _on_delivery(topic, event, f))
+
+
+def get_delivery_stats() -> dict:
+    return {
+        "delivery_mode": settings.kafka_delivery_mode,
+        "in_flight": len(_pending_deliveries),
+        "delivered": _delivered_count,
+        "failed": _failed_count,
+    }
+
+
+def _start_spool() -> None:
+    global _spool, _replay_task
+    _spool = DiskSpool(
+        directory=settings.spool_directory,
+        segment_max_bytes=settings.spool_segment_max_bytes,
+        max_bytes=settings.spool_max_bytes,
+        fsync=settings.spool_fsync,
+        fsync_interval_seconds=settings.spool_fsync_interval_seconds,
+    )
+    _spool.open()
+    SPOOL_BYTES.set_function(lambda: _spool.stats()["bytes"] if _spool is not None else 0)
+    _replay_task = asyncio.create_task(_replay_spool())
+    logger.info(f"✅ Spool enabled at {settings.spool_directory} (fsync={settings.spool_fsync})")
+
+
+async def _stop_replay() -> None:
+    global _replay_task
+    if _replay_task is not None:
+        _replay_task.cancel()
+        try:
+            await _replay_task
+        except asyncio.CancelledError:
+            pass
+        _replay_task = None
+
+
+def _close_spool() -> None:
+    global _spool
+    if _spool is not None:
+        _spool.close()
+        _spool = None
+
+
+def spool_enabled() -> bool:
+    return _spool is not None
+
+
+def spool_backlog() -> bool:
+    """Whether spooled events are waiting for replay: new events must queue behind them to keep the order."""
+    return _spool is not None and _spool.has_backlog()
+
+
+async def spool_event(topic: str, event: dict) -> None:
+    """Write an event to the disk spool; raises SpoolFullError when the spool is full."""
+    await _spool.append(topic, event)
+    count_event(event, "spooled")
+
+
+async def _spool_after_failed_delivery(topic: str, event: dict) -> None:
+    try:
+        await spool_event(topic, event)
+    except Exception as e:
+        count_event(event, "failed")
+        logger.error(f"❌ Could not spool event {event.get('event_id')} after failed delivery: {str(e)}")
+
+
+async def _replay_spool() -> None:
+    """
+    Replay spooled events to Kafka in order, at most `spool_replay_rate` events per second.
+
+    A chunk is only checkpointed once every record in it was acknowledged; on failure the
+    whole chunk is retried after a backoff (duplicates are absorbed by the consumer's
+    event_id index).
+    """
+    backoff = 1.0
+    while True:
+        if not _spool.has_backlog():
+            try:
+                await asyncio.wait_for(_spool.records_available.wait(), settings.spool_fsync_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            _spool.sync_if_due()
+            continue
+
+        records, position = await _spool.read(settings.spool_replay_batch_size)
+        if not records:
+            await _spool.commit(position, 0)
+            continue
+
+        started = time.perf_counter()
+        try:
+            futures = [await _send(topic, event) for topic, event in records]
+            await asyncio.gather(*futures)
+        except Exception as e:
+            logger.warning(f"⚠️ Spool replay failed, retrying in {backoff:.0f}s: {str(e)}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+
+        backoff = 1.0
+        await _spool.commit(position, len(records))
+        for _, event in records:
+            count_event(event, "replayed")
+        if not _spool.has_backlog():
+            logger.info(f"✅ Spool drained ({_spool.replayed} events replayed)")
+
+        # Rate limit: a chunk of N events takes at least N / rate seconds
+        remaining = len(records) / settings.spool_replay_rate - (time.perf_counter() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+
+def get_spool_stats() -> dict:
+    if _spool is None:
+        return {"enabled": False}
+    return {"enabled": True, **_spool.stats()}
+
+
+def _record_key(event: dict) -> Optional[bytes]:
+    if settings.kafka_partition_key == "user_id" and event.get("user_id"):
+        return str(event["user_id"]).encode("utf-8")
+    return None
+
+
+def _record_headers_for(event: dict) -> list[tuple[str, bytes]]:
+    version = event.get("schema_version")
+    if version is None:
+        # Spooled by a previous version of the service
+        return _record_headers
+    headers = _versioned_headers.get(version)
+    if headers is None:
+        headers = _versioned_headers[version] = _record_headers + [(SCHEMA_VERSION_HEADER, str(version).encode("utf-8"))]
+    return headers
+
+
+async def _send(topic: str, event: dict) -> asyncio.Future:
+    """Queue a record in the producer buffer and return its delivery future."""
+    return await _producer.send(topic=topic, value=event, key=_record_key(event), headers=_record_headers_for(event))
+
+
 async def publish_event(topic: str, event: dict) -> None:
     if _producer is None:
         raise RuntimeError("Kafka producer not initialized")
 
+    if settings.kafka_delivery_mode == "async":
+        # Only wait for the record to be queued; the ack is tracked in background
+        try:
+            with PUBLISH_EVENT_SECONDS.time():
+                future = await _send(topic, event)
+        except Exception as e:
+            count_event(event, "failed")
+            logger.error(f"❌ Error queueing event: {str(e)}", exc_info=True)
+            raise
+        _track_delivery(topic, event, future)
+        return
+
     try:
-        # Use named parameters and capture the RecordMetadata
-        record_metadata = await _producer.send_and_wait(
-            topic=topic,
-            value=event  # value_serializer will serialize automatically
-        )
+        # Wait for the broker ack and capture the RecordMetadata
+        with PUBLISH_EVENT_SECONDS.time(), RECORDS_IN_FLIGHT.track_inprogress():
+            record_metadata = await (await _send(topic, event))
+        count_event(event, "delivered")
 
         logger.info(
-            f"✅ Event published to '{topic}' "
-            f"[partition={record_metadata.partition}, offset={record_metadata.offset}]: "
-            f"{event.get('event_type', 'unknown')}"
+            "✅ Event published to '%s' [partition=%d, offset=%d]: %s",
+            topic,
+            record_metadata.partition,
+            record_metadata.offset,
+            event.get("event_type", "unknown"),
+            extra=HOT_PATH,
         )
     except Exception as e:
+        count_event(event, "failed")
         logger.error(f"❌ Error publishing event: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+
+async def publish_events(topic: str, events: list[dict]) -> list[Optional[Exception]]:
+    """
+    Publish several events at once, letting the producer pack them into Kafka batches.
+
+    Every record is queued with `send` before any acknowledgement is awaited, so the
+    whole list costs roughly one broker round trip instead of one per event.
+
+    Returns a list aligned with `events`: None for a delivered event, or the exception
+    that prevented its delivery. In "async" delivery mode None only means the record was
+    queued; its delivery is tracked in background like `publish_event`.
+    """
+    if _producer is None:
+        raise RuntimeError("Kafka producer not initialized")
+
+    results: list[Optional[Exception]] = [None] * len(events)
+    pending: dict[int, asyncio.Future] = {}
+    start = time.perf_counter()
+
+    for index, event in enumerate(events):
+        try:
+            pending[index] = await _send(topic, event)
+        except Exception as e:
+            # The record could not even be queued (e.g. too large, serialization error)
+            results[index] = e
+            count_event(event, "failed")
+
+    if settings.kafka_delivery_mode == "async":
+        for index, future in pending.items():
+            _track_delivery(topic, events[index], future)
+        PUBLISH_EVENTS_SECONDS.observe(time.perf_counter() - start)
+        return results
+
+    RECORDS_IN_FLIGHT.inc(len(pending))
+    try:
+        delivered = await asyncio.gather(*pending.values(), return_exceptions=True)
+    finally:
+        RECORDS_IN_FLIGHT.dec(len(pending))
+    PUBLISH_EVENTS_SECONDS.observe(time.perf_counter() - start)
+
+    for index, outcome in zip(pending.keys(), delivered):
+        if isinstance(outcome, Exception):
+            results[index] = outcome
+        count_event(events[index], "failed" if isinstance(outcome, Exception) else "delivered")
+
+    failed = sum(1 for result in results if result is not None)
+    logger.info("✅ Batch published to '%s': %d delivered, %d failed", topic, len(events) - failed, failed, extra=HOT_PATH)
+    if failed:
+        logger.error(f"❌ {failed} event(s) from batch failed to publish to '{topic}'")
+
+    return results
\ No newline at end of file
@@ -0,0 +1,134 @@
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    GC_COLLECTOR,
+    PLATFORM_COLLECTOR,
+    PROCESS_COLLECTOR,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.responses import Response
+
+from notification_producer_api.logging_setup import dropped_records
+
+
+# Service-owned registry (with the default process/GC collectors) rather than the global one
+REGISTRY = CollectorRegistry()
+for collector in (PROCESS_COLLECTOR, PLATFORM_COLLECTOR, GC_COLLECTOR):
+    REGISTRY.register(collector)
+
+# Records dropped by the logging queue when full (see log_async); errors are never dropped
+LOG_RECORDS_DROPPED = Gauge(
+    "log_records_dropped",
+    "Log records below ERROR dropped because the logging queue was full",
+    registry=REGISTRY,
+)
+LOG_RECORDS_DROPPED.set_function(dropped_records)
+
+# Latency buckets (seconds) sized for broker round trips: sub-millisecond queueing up to multi-second timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP handler latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+PUBLISH_SECONDS = Histogram(
+    "producer_publish_seconds",
+    "Time to publish events to Kafka (queueing only in async delivery mode)",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+# Children bound once: labels() lookups stay out of the hot path
+PUBLISH_EVENT_SECONDS = PUBLISH_SECONDS.labels("publish_event")
+PUBLISH_EVENTS_SECONDS = PUBLISH_SECONDS.labels("publish_events")
+
+EVENTS_TOTAL = Counter(
+    "producer_events_total",
+    "Events handled by the producer by type and outcome",
+    ["event_type", "outcome"],
+    registry=REGISTRY,
+)
+
+IDEMPOTENT_REPLAYS = Counter(
+    "producer_idempotent_replays_total",
+    "Requests answered from the Idempotency-Key store without publishing again",
+    registry=REGISTRY,
+)
+
+HOT_KEY_RECORDS = Counter(
+    "producer_hot_key_records_total",
+    "Records of hot keys spread over several partitions by the hot_key partitioner",
+    registry=REGISTRY,
+)
+
+SPOOL_BYTES = Gauge(
+    "producer_spool_bytes",
+    "Bytes held in the local disk spool",
+    registry=REGISTRY,
+)
+
+RECORDS_IN_FLIGHT = Gauge(
+    "producer_records_in_flight",
+    "Records queued in the producer buffer and not yet acknowledged by the broker",
+    registry=REGISTRY,
+)
+
+
+def count_event(event: dict, outcome: str) -> None:
+    event_type = event.get("event_type", "unknown")
+    EVENTS_TOTAL.labels(getattr(event_type, "value", event_type), outcome).inc()
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the route template (e.g. /api/v1/events) rather than the
+    raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status_code: int) -> None:
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            # Time to the response start, so long-lived streams do not skew the histogram
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe(500)
@@ -0,0 +1,73 @@
+import itertools
+import time
+from typing import Literal, Optional
+
+from aiokafka.partitioner import DefaultPartitioner, murmur2
+
+from notification_producer_api.infrastructure.metrics import HOT_KEY_RECORDS
+
+
+class HotKeyPartitioner:
+    """
+    Hashes keys like the default partitioner, but spreads hot keys over a few partitions.
+
+    A key sending more than `threshold_per_second` records in the current window is
+    treated as hot: its records rotate over `spread` consecutive partitions starting at
+    its usual one, so a single noisy user cannot saturate one partition and its consumer.
+    Per-key ordering is then only kept within each of those partitions.
+    """
+
+    def __init__(self, threshold_per_second: float, spread: int, window_seconds: float, max_tracked_keys: int):
+        self.threshold = threshold_per_second * window_seconds
+        self.spread = spread
+        self.window_seconds = window_seconds
+        self.max_tracked_keys = max_tracked_keys
+
+        self._window_start = time.monotonic()
+        self._counts: dict[bytes, int] = {}
+        self._rotation = itertools.count()
+
+    def __call__(self, key: Optional[bytes], all_partitions: list[int], available: list[int]) -> int:
+        if key is None:
+            return DefaultPartitioner()(key, all_partitions, available)
+
+        base = (murmur2(key) & 0x7FFFFFFF) % len(all_partitions)
+        if self._count(key) <= self.threshold:
+            return all_partitions[base]
+
+        HOT_KEY_RECORDS.inc()
+        spread = min(self.spread, len(all_partitions))
+        return all_partitions[(base + next(self._rotation) % spread) % len(all_partitions)]
+
+    def _count(self, key: bytes) -> int:
+        now = time.monotonic()
+        if now - self._window_start >= self.window_seconds:
+            self._counts.clear()
+            self._window_start = now
+
+        count = self._counts.get(key, 0) + 1
+        # Bounded memory: past the cap, new keys are not tracked (they are not hot yet anyway)
+        if count > 1 or len(self._counts) < self.max_tracked_keys:
+            self._counts[key] = count
+        return count
+
+    def hot_keys(self) -> list[str]:
+        return [key.decode("utf-8", "replace") for key, count in self._counts.items() if count > self.threshold]
+
+
+def build_partitioner(
+    strategy: Literal["default", "hot_key"],
+    hot_key_threshold_per_second: float,
+    hot_key_spread: int,
+    hot_key_window_seconds: float,
+    hot_key_max_tracked: int,
+):
+    """Partitioner callable for AIOKafkaProducer(partitioner=...)."""
+    if strategy == "hot_key":
+        return HotKeyPartitioner(
+            threshold_per_second=hot_key_threshold_per_second,
+            spread=hot_key_spread,
+            window_seconds=hot_key_window_seconds,
+            max_tracked_keys=hot_key_max_tracked,
+        )
+    return DefaultPartitioner()
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by an arbitrary key, all sharing the same rate and burst.
+
+    Buckets idle for `idle_seconds` are evicted (a bucket idle long enough to refill is
+    the same as a new one), and at most `max_keys` buckets are kept, least recently used
+    first out. Each check is a dict lookup and a few float operations.
+    """
+
+    def __init__(self, rate_per_second: float, burst: float, max_keys: int = 1, idle_seconds: float = 60.0):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        # key -> [tokens, last refill time]
+        self._buckets: OrderedDict[Hashable, list[float]] = OrderedDict()
+
+    def wait_time(self, key: Hashable, now: float, cost: float = 1) -> float:
+        """Seconds until `cost` tokens are available for `key`: 0 when they are available now."""
+        bucket = self._bucket(key, now)
+        if bucket[0] >= cost:
+            return 0.0
+        if cost > self.burst:
+            return float("inf")
+        return (cost - bucket[0]) / self.rate
+
+    def consume(self, key: Hashable, now: float, cost: float = 1) -> None:
+        self._bucket(key, now)[0] -= cost
+
+    def _bucket(self, key: Hashable, now: float) -> list[float]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            self._evict(now)
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _evict(self, now: float) -> None:
+        while len(self._buckets) > 1:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - updated < self.idle_seconds:
+                break
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """
+    Admits an event only when its user, its event type and the global budget all have
+    tokens left; tokens are taken from all three or from none.
+    """
+
+    def __init__(self, global_limiter: TokenBucketLimiter, event_type_limiter: TokenBucketLimiter, user_limiter: TokenBucketLimiter):
+        self.global_limiter = global_limiter
+        self.event_type_limiter = event_type_limiter
+        self.user_limiter = user_limiter
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, user_id: str, event_type: str, cost: float = 1) -> Optional[float]:
+        """Take tokens for an event; returns None when admitted, else the seconds to wait before retrying."""
+        now = time.monotonic()
+        checks = (
+            (self.global_limiter, None),
+            (self.event_type_limiter, event_type),
+            (self.user_limiter, user_id),
+        )
+
+        wait = max(limiter.wait_time(key, now, cost) for limiter, key in checks)
+        if wait > 0:
+            self.rejected += 1
+            return wait
+
+        for limiter, key in checks:
+            limiter.consume(key, now, cost)
+        self.admitted += 1
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "tracked_users": len(self.user_limiter),
+        }
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+from typing import Literal
+
+from notification_producer_api.config import logger
+
+
+class SpoolFullError(Exception):
+    """The spool reached its size limit: the caller must back off."""
+
+
+# Record header: payload length and crc32 of the payload
+_HEADER = struct.Struct("<II")
+_SEGMENT_PREFIX = "spool-"
+_SEGMENT_SUFFIX = ".log"
+_CHECKPOINT = "replay.checkpoint"
+
+# Replay position: (segment sequence, byte offset in the segment)
+Position = tuple[int, int]
+
+
+class DiskSpool:
+    """
+    Append-only local log of events that could not be published to Kafka.
+
+    Records are appended to size-rotated segment files and read back in order by the
+    replay task, which checkpoints its position and deletes fully replayed segments.
+    `fsync` controls durability: "always" syncs every append, "interval" at most every
+    `fsync_interval_seconds`, "never" leaves it to the OS.
+
+    File I/O runs in a worker thread, serialized by a lock so appends keep their order.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int,
+        max_bytes: int,
+        fsync: Literal["always", "interval", "never"],
+        fsync_interval_seconds: float,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.fsync_interval_seconds = fsync_interval_seconds
+
+        self._lock = asyncio.Lock()
+        self._segments: list[int] = []
+        self._writer = None
+        self._write_position: Position = (0, 0)
+        self._read_position: Position = (0, 0)
+        self._size = 0
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self.records_available = asyncio.Event()
+
+        self.appended = 0
+        self.replayed = 0
+
+    # -- lifecycle -------------------------------------------------------------------
+
+    def open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+        if not self._segments:
+            self._segments = [0]
+
+        # A crash may have left a partially written record at the end of the last segment
+        last = self._segments[-1]
+        end = self._valid_length(last)
+        with open(self._segment_path(last), "ab") as f:
+            f.truncate(end)
+
+        self._writer = open(self._segment_path(last), "ab")
+        self._write_position = (last, end)
+        self._size = sum(os.path.getsize(self._segment_path(seq)) for seq in self._segments)
+        self._read_position = self._load_checkpoint()
+        if self.has_backlog():
+            self.records_available.set()
+            logger.warning(f"⚠️ Spool left by a previous run ({self._size} bytes), resuming replay")
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+            if self.fsync != "never":
+                os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+
+    # -- writing ---------------------------------------------------------------------
+
+    async def append(self, topic: str, event: dict) -> None:
+        """Durably queue an event for replay; raises SpoolFullError when the size limit is reached."""
+        data = json.dumps({"topic": topic, "event": event}, separators=(",", ":")).encode("utf-8")
+        async with self._lock:
+            await asyncio.to_thread(self._append, data)
+        self.records_available.set()
+
+    def _append(self, data: bytes) -> None:
+        record_size = _HEADER.size + len(data)
+        if self._size + record_size > self.max_bytes:
+            raise SpoolFullError(f"Spool is full ({self._size} of {self.max_bytes} bytes)")
+
+        segment, offset = self._write_position
+        if offset > 0 and offset + record_size > self.segment_max_bytes:
+            self._rotate()
+            segment, offset = self._write_position
+
+        self._writer.write(_HEADER.pack(len(data), zlib.crc32(data)))
+        self._writer.write(data)
+        # Always hand the bytes to the OS so the replay reader sees them; fsync is the policy
+        self._writer.flush()
+        self._unsynced = True
+        if self.fsync == "always":
+            self._sync()
+        elif self.fsync == "interval":
+            self.sync_if_due()
+
+        self._write_position = (segment, offset + record_size)
+        self._size += record_size
+        self.appended += 1
+
+    def _rotate(self) -> None:
+        self._writer.flush()
+        if self.fsync != "never":
+            os.fsync(self._writer.fileno())
+        self._writer.close()
+        segment = self._write_position[0] + 1
+        self._segments.append(segment)
+        self._writer = open(self._segment_path(segment), "ab")
+        self._write_position = (segment, 0)
+
+    def _sync(self) -> None:
+        os.fsync(self._writer.fileno())
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+
+    def sync_if_due(self) -> None:
+        """fsync pending writes under the "interval" policy; also called by the replay task when idle."""
+        if self.fsync == "interval" and self._unsynced and time.monotonic() - self._last_fsync >= self.fsync_interval_seconds:
+            self._sync()
+
+    # -- replay ----------------------------------------------------------------------
+
+    def has_backlog(self) -> bool:
+        return self._read_position != self._write_position
+
+    async def read(self, max_records: int) -> tuple[list[tuple[str, dict]], Position]:
+        """Read up to `max_records` from the replay position; returns the records and the position after them."""
+        async with self._lock:
+            return await asyncio.to_thread(self._read, max_records)
+
+    def _read(self, max_records: int) -> tuple[list[tuple[str, dict]], Position]:
+        records: list[tuple[str, dict]] = []
+        segment, offset = self._read_position
+
+        while len(records) < max_records and (segment, offset) != self._write_position:
+            with open(self._segment_path(segment), "rb") as f:
+                f.seek(offset)
+                while len(records) < max_records:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        break
+                    length, crc = _HEADER.unpack(header)
+                    data = f.read(length)
+                    if len(data) < length or zlib.crc32(data) != crc:
+                        logger.error(f"❌ Corrupted spool record in segment {segment} at offset {offset}, skipping the rest of the segment")
+                        offset = os.path.getsize(self._segment_path(segment))
+                        break
+                    offset += _HEADER.size + length
+                    record = json.loads(data)
+                    records.append((record["topic"], record["event"]))
+
+            if len(records) < max_records and segment != self._write_position[0]:
+                # End of a sealed segment: continue with the next one
+                segment, offset = self._segments[self._segments.index(segment) + 1], 0
+            elif len(records) < max_records:
+                break
+
+        return records, (segment, offset)
+
+    async def commit(self, position: Position, count: int) -> None:
+        """Record that everything before `position` was replayed and drop fully replayed segments."""
+        async with self._lock:
+            await asyncio.to_thread(self._commit, position)
+        self.replayed += count
+        if not self.has_backlog():
+            self.records_available.clear()
+
+    def _commit(self, position: Position) -> None:
+        self._read_position = position
+        self._save_checkpoint(position)
+        for segment in [seq for seq in self._segments if seq < position[0]]:
+            path = self._segment_path(segment)
+            self._size -= os.path.getsize(path)
+            os.remove(path)
+            self._segments.remove(segment)
+
+    # -- helpers ---------------------------------------------------------------------
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{segment:012d}{_SEGMENT_SUFFIX}")
+
+    def _valid_length(self, segment: int) -> int:
+        """Length of the segment prefix made of complete, valid records."""
+        end = 0
+        with open(self._segment_path(segment), "ab+") as f:
+            f.seek(0)
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return end
+                length, crc = _HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length or zlib.crc32(data) != crc:
+                    return end
+                end += _HEADER.size + length
+
+    def _load_checkpoint(self) -> Position:
+        try:
+            with open(os.path.join(self.directory, _CHECKPOINT)) as f:
+                segment, offset = (int(value) for value in f.read().split())
+        except (FileNotFoundError, ValueError):
+            return (self._segments[0], 0)
+        # The checkpointed segment may be gone (fully replayed) or the file reset
+        if segment not in self._segments:
+            return (self._segments[0], 0)
+        return (segment, offset)
+
+    def _save_checkpoint(self, position: Position) -> None:
+        path = os.path.join(self.directory, _CHECKPOINT)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{position[0]} {position[1]}")
+            f.flush()
+            if self.fsync != "never":
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "segments": len(self._segments),
+            "backlog": self.has_backlog(),
+            "appended": self.appended,
+            "replayed": self.replayed,
+        }
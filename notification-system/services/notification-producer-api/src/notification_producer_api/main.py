@@ -4,6 +4,7 @@ from starlette import status
 from contextlib import asynccontextmanager
 from notification_producer_api.infrastructure.kafka_producer import init_kafka_producer, close_kafka_producer
 from notification_producer_api.api.routes import router as api_router
+from notification_producer_api.infrastructure.metrics import PrometheusMiddleware, metrics_response
 
 
 
@@ -22,6 +23,7 @@ app = FastAPI(
 )
 
 
+app.add_middleware(PrometheusMiddleware)
 app.include_router(api_router)
 
 
@@ -33,6 +35,11 @@ def health_check():
         media_type="application/json"
     )
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+
 @app.get("/")
 def root():
     return {"message": "Notification Producer API is running"}
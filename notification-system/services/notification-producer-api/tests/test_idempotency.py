@@ -0,0 +1,65 @@
+import asyncio
+
+from notification_producer_api.infrastructure import idempotency
+from notification_producer_api.infrastructure.idempotency import InMemoryIdempotencyStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_a_claimed_key_returns_its_record_until_released(monkeypatch):
+    monkeypatch.setattr(idempotency.time, "monotonic", Clock())
+    store = InMemoryIdempotencyStore(max_entries=10, ttl_seconds=60)
+
+    async def run():
+        assert await store.claim("key-1", "fingerprint-a") is None
+        pending = await store.claim("key-1", "fingerprint-a")
+        assert pending.pending and pending.fingerprint == "fingerprint-a"
+
+        await store.complete("key-1", {"event_id": "evt-1"})
+        done = await store.claim("key-1", "fingerprint-b")
+        assert not done.pending and done.response == {"event_id": "evt-1"}
+        # The caller compares fingerprints: a reused key with another body keeps the first one
+        assert done.fingerprint == "fingerprint-a"
+
+        await store.release("key-1")
+        assert await store.claim("key-1", "fingerprint-b") is None
+
+    asyncio.run(run())
+    assert store.stats()["hits"] == 2
+
+
+def test_keys_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(idempotency.time, "monotonic", clock)
+    store = InMemoryIdempotencyStore(max_entries=10, ttl_seconds=60)
+
+    async def run():
+        await store.claim("key-1", "fingerprint")
+        clock.now += 59
+        assert await store.claim("key-1", "fingerprint") is not None
+        clock.now += 2
+        assert await store.claim("key-1", "fingerprint") is None
+
+    asyncio.run(run())
+
+
+def test_the_oldest_claims_are_evicted_first(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(idempotency.time, "monotonic", clock)
+    store = InMemoryIdempotencyStore(max_entries=2, ttl_seconds=60)
+
+    async def run():
+        for key in ("key-1", "key-2", "key-3"):
+            await store.claim(key, "fingerprint")
+            clock.now += 1
+        assert await store.claim("key-3", "fingerprint") is not None
+        assert await store.claim("key-1", "fingerprint") is None
+
+    asyncio.run(run())
+    assert store.stats()["evictions"] == 2
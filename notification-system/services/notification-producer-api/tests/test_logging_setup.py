@@ -0,0 +1,56 @@
+import logging
+import queue
+
+from notification_producer_api import logging_setup
+from notification_producer_api.logging_setup import HotPathFilter, NonBlockingQueueHandler
+
+
+def record(message: str = "✅ Event published: %s", level: int = logging.INFO, hot_path: bool = True) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 1, message, ("evt-1",), None)
+    if hot_path:
+        record.hot_path = True
+    return record
+
+
+def test_hot_path_records_are_sampled_deterministically():
+    hot_path = HotPathFilter(sample_rate=0.25, max_per_second=None)
+    kept = [hot_path.filter(record()) for _ in range(100)]
+
+    assert sum(kept) == 25
+    assert kept[:8] == [False, False, False, True, False, False, False, True]
+    assert hot_path.suppressed == 75
+
+
+def test_hot_path_records_are_rate_limited_per_template(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(logging_setup.time, "monotonic", lambda: now[0])
+    hot_path = HotPathFilter(sample_rate=1.0, max_per_second=3)
+
+    assert sum(hot_path.filter(record()) for _ in range(10)) == 3
+    # Another template has its own budget
+    assert sum(hot_path.filter(record("⚠️ Event rejected: %s")) for _ in range(10)) == 3
+    now[0] += 1.0
+    assert sum(hot_path.filter(record()) for _ in range(10)) == 3
+
+
+def test_errors_and_regular_records_always_pass():
+    hot_path = HotPathFilter(sample_rate=0.0, max_per_second=0)
+
+    assert hot_path.filter(record(level=logging.ERROR))
+    assert hot_path.filter(record(hot_path=False))
+    assert not hot_path.filter(record())
+
+
+def test_a_full_queue_drops_records_but_never_errors():
+    written = []
+    fallback = logging.Handler()
+    fallback.emit = written.append
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2), fallback=fallback)
+    for level in (logging.INFO, logging.INFO, logging.INFO, logging.ERROR, logging.WARNING):
+        handler.emit(record(level=level, hot_path=False))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 2
+    assert [r.levelno for r in written] == [logging.ERROR]
+    # Formatting is left to the logging thread
+    assert handler.queue.get_nowait().args == ("evt-1",)
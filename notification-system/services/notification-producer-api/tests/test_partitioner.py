@@ -0,0 +1,53 @@
+from aiokafka.partitioner import murmur2
+
+from notification_producer_api.infrastructure import partitioner
+from notification_producer_api.infrastructure.partitioner import HotKeyPartitioner
+
+PARTITIONS = list(range(12))
+
+
+def default_partition(key: bytes) -> int:
+    return (murmur2(key) & 0x7FFFFFFF) % len(PARTITIONS)
+
+
+def make_partitioner(threshold: float = 5, spread: int = 3, max_tracked_keys: int = 100) -> HotKeyPartitioner:
+    return HotKeyPartitioner(threshold_per_second=threshold, spread=spread, window_seconds=1.0, max_tracked_keys=max_tracked_keys)
+
+
+def test_keys_below_the_threshold_use_the_default_partition():
+    hot_key = make_partitioner()
+    for index in range(50):
+        key = f"user-{index}".encode()
+        assert hot_key(key, PARTITIONS, PARTITIONS) == default_partition(key)
+
+
+def test_a_hot_key_is_spread_over_consecutive_partitions():
+    hot_key = make_partitioner(threshold=5, spread=3)
+    key = b"user-noisy"
+    base = default_partition(key)
+
+    chosen = [hot_key(key, PARTITIONS, PARTITIONS) for _ in range(30)]
+    assert chosen[:5] == [base] * 5
+    assert set(chosen[5:]) == {(base + offset) % len(PARTITIONS) for offset in range(3)}
+    assert hot_key.hot_keys() == ["user-noisy"]
+
+
+def test_a_new_window_cools_the_key_down(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(partitioner.time, "monotonic", lambda: now[0])
+    hot_key = make_partitioner(threshold=2)
+    key = b"user-noisy"
+    for _ in range(5):
+        hot_key(key, PARTITIONS, PARTITIONS)
+    assert hot_key.hot_keys() == ["user-noisy"]
+
+    now[0] += 1.0
+    assert hot_key(key, PARTITIONS, PARTITIONS) == default_partition(key)
+    assert hot_key.hot_keys() == []
+
+
+def test_tracked_keys_are_bounded():
+    hot_key = make_partitioner(max_tracked_keys=10)
+    for index in range(100):
+        hot_key(f"user-{index}".encode(), PARTITIONS, PARTITIONS)
+    assert len(hot_key._counts) == 10
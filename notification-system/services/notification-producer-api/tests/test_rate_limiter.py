@@ -0,0 +1,49 @@
+import math
+
+from notification_producer_api.infrastructure import rate_limiter
+from notification_producer_api.infrastructure.rate_limiter import AdmissionController, TokenBucketLimiter
+
+
+def test_the_burst_is_available_then_tokens_refill_at_the_rate():
+    limiter = TokenBucketLimiter(rate_per_second=10, burst=5)
+    for _ in range(5):
+        assert limiter.wait_time("user-1", now=0.0) == 0
+        limiter.consume("user-1", now=0.0)
+
+    assert math.isclose(limiter.wait_time("user-1", now=0.0), 0.1)
+    assert limiter.wait_time("user-1", now=0.1) == 0
+    # Never more than the burst, however long the key was idle
+    assert limiter.wait_time("user-1", now=100.0, cost=5) == 0
+    assert limiter.wait_time("user-1", now=100.0, cost=6) == math.inf
+
+
+def test_keys_have_separate_buckets_and_idle_ones_are_evicted():
+    limiter = TokenBucketLimiter(rate_per_second=1, burst=1, max_keys=2, idle_seconds=60)
+    limiter.consume("user-1", now=0.0)
+    assert limiter.wait_time("user-2", now=0.0) == 0
+    limiter.consume("user-2", now=0.0)
+    limiter.consume("user-3", now=1.0)
+    assert len(limiter) == 2
+
+    limiter.wait_time("user-4", now=100.0)
+    assert len(limiter) == 1
+
+
+def test_an_event_takes_tokens_from_every_limiter_or_from_none(monkeypatch):
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: 0.0)
+    admission = AdmissionController(
+        global_limiter=TokenBucketLimiter(rate_per_second=100, burst=100),
+        event_type_limiter=TokenBucketLimiter(rate_per_second=100, burst=100, max_keys=10),
+        user_limiter=TokenBucketLimiter(rate_per_second=1, burst=2, max_keys=10),
+    )
+
+    assert admission.admit("user-1", "notification.created") is None
+    assert admission.admit("user-1", "notification.created") is None
+    wait = admission.admit("user-1", "notification.created")
+    assert math.isclose(wait, 1.0)
+
+    # The rejected event took no global or event type token
+    assert admission.global_limiter.wait_time(None, now=0.0, cost=98) == 0
+    assert admission.global_limiter.wait_time(None, now=0.0, cost=99) > 0
+    assert admission.admit("user-2", "notification.created") is None
+    assert admission.stats() == {"admitted": 3, "rejected": 1, "tracked_users": 2}
@@ -0,0 +1,127 @@
+import asyncio
+import os
+
+import pytest
+
+from fakes import FakeBroker, FakeKafkaProducer
+from notification_producer_api.config import settings
+from notification_producer_api.infrastructure import kafka_producer
+from notification_producer_api.infrastructure.spool import DiskSpool, SpoolFullError
+
+
+def open_spool(directory, segment_max_bytes: int = 1 << 20, max_bytes: int = 1 << 30) -> DiskSpool:
+    spool = DiskSpool(
+        directory=str(directory),
+        segment_max_bytes=segment_max_bytes,
+        max_bytes=max_bytes,
+        fsync="never",
+        fsync_interval_seconds=1.0,
+    )
+    spool.open()
+    return spool
+
+
+def event(index: int) -> dict:
+    return {"event_id": f"evt-{index}", "event_type": "notification.created", "user_id": "user-1", "payload": {}}
+
+
+def test_records_are_replayed_in_order_across_segments(tmp_path):
+    spool = open_spool(tmp_path, segment_max_bytes=300)
+
+    async def run():
+        for index in range(20):
+            await spool.append("notifications", event(index))
+        replayed = []
+        while spool.has_backlog():
+            records, position = await spool.read(7)
+            replayed.extend(e["event_id"] for _, e in records)
+            await spool.commit(position, len(records))
+        return replayed
+
+    assert asyncio.run(run()) == [f"evt-{index}" for index in range(20)]
+    # Fully replayed segments are deleted, the one being written is kept
+    assert spool.stats()["segments"] == 1
+    spool.close()
+
+
+def test_a_torn_tail_is_truncated_on_open(tmp_path):
+    spool = open_spool(tmp_path)
+
+    async def append(spool, indexes):
+        for index in indexes:
+            await spool.append("notifications", event(index))
+
+    asyncio.run(append(spool, range(3)))
+    spool.close()
+
+    # A crash in the middle of an append leaves part of a record at the end of the segment
+    [segment] = [name for name in os.listdir(tmp_path) if name.endswith(".log")]
+    path = tmp_path / segment
+    intact = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x12\x34")
+
+    spool = open_spool(tmp_path)
+    assert path.stat().st_size == intact
+    asyncio.run(append(spool, [3]))
+    records, _ = asyncio.run(spool.read(10))
+    assert [e["event_id"] for _, e in records] == ["evt-0", "evt-1", "evt-2", "evt-3"]
+    spool.close()
+
+
+def test_replay_resumes_from_the_checkpoint_after_a_restart(tmp_path):
+    spool = open_spool(tmp_path)
+
+    async def first_run():
+        for index in range(5):
+            await spool.append("notifications", event(index))
+        records, position = await spool.read(2)
+        await spool.commit(position, len(records))
+
+    asyncio.run(first_run())
+    spool.close()
+
+    spool = open_spool(tmp_path)
+    assert spool.records_available.is_set()
+    records, _ = asyncio.run(spool.read(10))
+    assert [e["event_id"] for _, e in records] == ["evt-2", "evt-3", "evt-4"]
+    spool.close()
+
+
+def test_appends_past_the_size_limit_are_refused(tmp_path):
+    spool = open_spool(tmp_path, max_bytes=200)
+
+    async def run():
+        await spool.append("notifications", event(0))
+        with pytest.raises(SpoolFullError):
+            for index in range(1, 10):
+                await spool.append("notifications", event(index))
+
+    asyncio.run(run())
+    assert spool.stats()["bytes"] <= 200
+    spool.close()
+
+
+def test_failed_async_deliveries_are_spooled_on_shutdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "kafka_delivery_mode", "async")
+    monkeypatch.setattr(settings, "spool_enabled", True)
+    monkeypatch.setattr(settings, "spool_directory", str(tmp_path))
+    monkeypatch.setattr(settings, "spool_fsync", "never")
+    broker = FakeBroker()
+    # Every delivery fails 20ms after being sent, that is while the producer is closing
+    monkeypatch.setattr(
+        kafka_producer, "AIOKafkaProducer",
+        lambda **kwargs: FakeKafkaProducer(broker, latency_ms=20, fail=lambda value: True, **kwargs),
+    )
+
+    async def run():
+        await kafka_producer.init_kafka_producer()
+        for index in range(10):
+            await kafka_producer.publish_event("notifications", event(index))
+        await kafka_producer.close_kafka_producer()
+
+    asyncio.run(run())
+    spool = open_spool(tmp_path)
+    records, _ = asyncio.run(spool.read(100))
+    assert sorted(e["event_id"] for _, e in records) == sorted(f"evt-{index}" for index in range(10))
+    spool.close()
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette import status
-from notification_service.config import Logger
-from notification_service.services.notification_service import notification_service
+from notification_service.api.responses import OrjsonResponse
+from notification_service.api.sse import notification_stream
+from notification_service.config import HOT_PATH, Logger, settings
+from notification_service.domain.models import BulkMarkAsReadRequest
+from notification_service.services.notification_service import notification_service, notification_cache, notification_hub, recent_ids
+from notification_service.services.pagination import decode_cursor
 
 
 class LoggerAPI(Logger):
@@ -19,19 +24,61 @@ router = APIRouter()
 async def get_notifications(
     user_id: str,
     limit: int = Query(default=10, ge=1, le=50, description="Number of notifications to return"),
-    skip: int = Query(default=0, ge=0, description="Number of notifications to skip - pagination")):
+    skip: int = Query(default=0, ge=0, description="Number of notifications to skip - pagination"),
+    cursor: Optional[str] = Query(default=None, description="Opaque cursor from a previous next_cursor - keyset pagination, ignores skip"),
+    fields: Optional[str] = Query(default=None, description="Comma separated fields to return, e.g. event_id,event_type,read")):
     try:
-        notifications = await notification_service.get_user_notifications(user_id, limit, skip)
-        logger.info(f"✅ Notifications fetched successfully for user: {user_id}")
-        return JSONResponse(
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        notifications = await notification_service.get_user_notifications(user_id, limit, skip, cursor, field_list)
+        logger.info("✅ Notifications fetched successfully for user: %s", user_id, extra=HOT_PATH)
+        return OrjsonResponse(
             status_code=status.HTTP_200_OK,
-            content={"user_id": user_id, "count": len(notifications), "notifications": notifications}
+            content={
+                "user_id": user_id,
+                "count": len(notifications),
+                "notifications": notifications,
+                "next_cursor": notification_service.next_cursor(notifications, limit),
+            }
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error fetching notifications for user: {user_id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/notifications/{user_id}/unread-count")
+async def get_unread_count(user_id: str):
+    try:
+        unread = await notification_service.get_unread_count(user_id)
+        return JSONResponse(
+            status_code=status.HTTP_200_OK,
+            content={"user_id": user_id, "unread": unread}
+        )
+    except Exception as e:
+        logger.error(f"❌ Error fetching unread count for user: {user_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/notifications/{user_id}/stream")
+async def stream_notifications(
+    user_id: str,
+    last_event_id: Optional[str] = Header(default=None, description="Id of the last event received, to resume the stream")
+):
+    if last_event_id is not None:
+        try:
+            decode_cursor(last_event_id)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    logger.info("📡 Notification stream opened for user: %s", user_id, extra=HOT_PATH)
+    return StreamingResponse(
+        notification_stream(user_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.patch("/notifications/{event_id}/read")
 async def mark_notification_as_read(
     event_id: str,
@@ -43,8 +90,48 @@ async def mark_notification_as_read(
     if not success:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found")
 
-    logger.info(f"✅ Notification marked as read: {event_id}")
+    logger.info("✅ Notification marked as read: %s", event_id, extra=HOT_PATH)
     return JSONResponse(
         status_code=status.HTTP_200_OK,
         content={"status": "marked as read", "event_id": event_id}
-    )
\ No newline at end of file
+    )
+
+
+@router.patch("/notifications/{user_id}/read-bulk")
+async def mark_notifications_as_read(user_id: str, request: BulkMarkAsReadRequest):
+    try:
+        modified = await notification_service.mark_many_as_read(user_id, request.event_ids, request.before)
+    except Exception as e:
+        logger.error(f"❌ Error marking notifications as read for user: {user_id}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"status": "marked as read", "user_id": user_id, "modified_count": modified}
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    if notification_cache is None:
+        return JSONResponse(status_code=status.HTTP_200_OK, content={"enabled": False})
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"enabled": True, **notification_cache.stats()}
+    )
+
+
+@router.get("/dedup/stats")
+async def get_dedup_stats():
+    # The filter belongs to the consumer: with the consumer in another process it stays empty here
+    if recent_ids is None or not settings.consumer_enabled:
+        return JSONResponse(status_code=status.HTTP_200_OK, content={"enabled": False})
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"enabled": True, **recent_ids.stats()}
+    )
+
+
+@router.get("/stream/stats")
+async def get_stream_stats():
+    return JSONResponse(status_code=status.HTTP_200_OK, content=notification_hub.stats())
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import orjson
+
+from notification_service.api.responses import ORJSON_OPTIONS
+from notification_service.config import settings
+from notification_service.services.notification_service import notification_hub, notification_service
+from notification_service.services.pagination import encode_cursor
+
+# Cursor of a polled stream for a user without notifications yet
+STREAM_START = datetime(1970, 1, 1)
+
+
+def format_event(notification: dict) -> str:
+    # The SSE id is the (timestamp, event_id) cursor, so Last-Event-ID resumes with an index seek
+    data = orjson.dumps(notification, option=ORJSON_OPTIONS).decode("utf-8")
+    return f"id: {encode_cursor(notification)}\nevent: notification\ndata: {data}\n\n"
+
+
+async def notification_stream(user_id: str, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """
+    Server-Sent Events stream of a user's new notifications.
+
+    Live notifications come from the hub, fed by the consumer of this process. When the
+    consumer runs in another process (`consumer_enabled` false) the stream polls MongoDB
+    instead.
+    """
+    stream = _live_stream if settings.consumer_enabled else _polled_stream
+    async for event in stream(user_id, last_event_id):
+        yield event
+
+
+async def _live_stream(user_id: str, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """
+    Subscribes to the hub before replaying what was missed since `last_event_id`, so no
+    notification falls in between; live notifications already replayed are skipped.
+    """
+    subscription = notification_hub.subscribe(user_id)
+    try:
+        yield ": connected\n\n"
+
+        replayed: set[str] = set()
+        if last_event_id is not None:
+            missed = await notification_service.get_notifications_after(user_id, last_event_id, settings.sse_resume_limit)
+            for notification in missed:
+                replayed.add(notification["event_id"])
+                yield format_event(notification)
+
+        while not subscription.closed:
+            notification = await notification_hub.next(subscription, settings.sse_heartbeat_seconds)
+            if notification is None:
+                if subscription.closed:
+                    break
+                yield ": heartbeat\n\n"
+                continue
+            if notification["event_id"] in replayed:
+                replayed.discard(notification["event_id"])
+                continue
+            yield format_event(notification)
+    finally:
+        notification_hub.unsubscribe(subscription)
+
+
+async def _polled_stream(user_id: str, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """
+    Polls the notifications after the last one sent, every `sse_poll_seconds`, starting
+    from `last_event_id` or from the user's newest notification. Like a Last-Event-ID
+    resume, a notification stored with a timestamp older than the last one sent is missed.
+    """
+    cursor = last_event_id
+    if cursor is None:
+        newest = await notification_service.get_user_notifications(user_id, limit=1)
+        cursor = encode_cursor(newest[0] if newest else {"timestamp": STREAM_START, "event_id": ""})
+    yield ": connected\n\n"
+
+    idle = 0.0
+    while True:
+        notifications = await notification_service.get_notifications_after(user_id, cursor, settings.sse_resume_limit)
+        for notification in notifications:
+            yield format_event(notification)
+        if notifications:
+            cursor = encode_cursor(notifications[-1])
+            idle = 0.0
+        elif idle >= settings.sse_heartbeat_seconds:
+            yield ": heartbeat\n\n"
+            idle = 0.0
+        # A full page means more are waiting: fetch them right away
+        if len(notifications) < settings.sse_resume_limit:
+            await asyncio.sleep(settings.sse_poll_seconds)
+            idle += settings.sse_poll_seconds
@@ -1,17 +1,138 @@
 import logging
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from notification_service.logging_setup import HOT_PATH, configure_logging
+
 
 class Settings(BaseSettings):
     # MongoDB settings
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_database: str = "notifications_db"
     mongodb_collection: str = "notifications"
+    mongodb_counters_collection: str = "notification_counters"
+    mongodb_archive_collection: str = "notifications_archive"
+    mongodb_buckets_collection: str = "notification_buckets"
+
+    # Storage layout: "document" stores one document per notification, "bucket" one document per
+    # user and time window holding an array of notifications (fewer, larger documents and index
+    # entries). Move existing data with python -m notification_service.jobs.migrate_to_buckets
+    storage_layout: Literal["document", "bucket"] = "document"
+    storage_bucket_window_seconds: int = 86_400
+    # A bucket is full once it holds N notifications or N bytes (BSON), whichever comes first
+    storage_bucket_max_notifications: int = 200
+    storage_bucket_max_bytes: int = 256 * 1024
+    # Notifications copied per second by the migration job, to spare the primary
+    bucket_migration_docs_per_second: float = 5000.0
     
     # Kafka settings
     kafka_topic: str = "notifications"
     kafka_bootstrap_servers: list[str] = ["localhost:9092"]
     kafka_group_id: str = "notification-service-group"
+    # Codec used for records without a codec header (legacy producers)
+    kafka_default_codec: Literal["json", "orjson", "msgpack"] = "json"
+
+    # Consumer pipeline settings
+    # "single" processes one message at a time, "batch" uses getmany + insert_many and
+    # "concurrent" dispatches messages to workers sharded by user_id
+    kafka_consumer_mode: Literal["single", "batch", "concurrent"] = "single"
+    kafka_batch_max_size: int = 500
+    kafka_batch_max_wait_ms: int = 200
+    kafka_consumer_workers: int = 8
+    kafka_worker_queue_size: int = 100
+    # Most queued messages a worker stores with one insert_many ("concurrent" mode)
+    kafka_worker_batch_size: int = 100
+    # Payload schema versions validated by the producer API: the payload of their events is
+    # not validated again when notifications are built (an empty list validates every event)
+    kafka_trusted_schema_versions: list[int] = [1]
+
+    # Failed messages are sent to a retry topic per delay (<topic>.retry.<n>, reprocessed once
+    # the delay has elapsed), then to the dead letter topic; invalid messages go straight to it.
+    # Disabled, a failing message stops the consumer. The topics must exist beforehand (see the
+    # kafka-init service of docker-compose): the consumer does not start when one is missing
+    kafka_failure_routing_enabled: bool = False
+    kafka_retry_delays_seconds: list[float] = [5.0, 60.0, 600.0]
+    # Defaults to <topic>.dlq
+    kafka_dead_letter_topic: Optional[str] = None
+
+    # Consumer process settings
+    # Run the consumer inside the API process; disable it when ingestion runs in the standalone
+    # worker (python -m notification_service.worker). Without it the API process sees no inserts:
+    # the read cache is disabled and SSE streams poll MongoDB every sse_poll_seconds
+    consumer_enabled: bool = True
+    # Worker processes started by the standalone worker, all members of kafka_group_id
+    consumer_processes: int = 1
+    # Time given to the consumer to finish the messages in hand and commit when stopping
+    consumer_shutdown_timeout_seconds: float = 30.0
+    # Delay before the standalone worker restarts a process that exited unexpectedly
+    consumer_restart_delay_seconds: float = 5.0
+    # First port of the worker processes' /metrics endpoints (process i listens on port + i); None disables them
+    consumer_metrics_port: Optional[int] = None
+
+    # Most event_ids accepted by one bulk mark-as-read request (PATCH /notifications/{user_id}/read-bulk)
+    bulk_mark_read_max_ids: int = 1000
+
+    # Read cache settings (GET /notifications/{user_id})
+    cache_enabled: bool = True
+    cache_max_entries: int = 10_000
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl_seconds: float = 5.0
+
+    # Server-Sent Events stream settings (GET /notifications/{user_id}/stream)
+    sse_queue_size: int = 100
+    # What to do with a subscriber whose queue is full: drop the notification or disconnect it
+    sse_slow_client_policy: Literal["drop", "disconnect"] = "drop"
+    sse_heartbeat_seconds: float = 15.0
+    sse_resume_limit: int = 500
+    # Interval between MongoDB polls of each open stream when the consumer runs in another process
+    sse_poll_seconds: float = 2.0
+
+    # Recent event_id filter checked before writing, to skip replayed messages without a Mongo round trip
+    # "lru" is an exact set, "bloom" a two-generation Bloom filter (fixed memory, false positives)
+    dedup_filter: Literal["none", "lru", "bloom"] = "lru"
+    # LRU size, or ids per Bloom generation
+    dedup_max_entries: int = 100_000
+    dedup_bloom_error_rate: float = 0.001
+    dedup_bloom_rotate_seconds: float = 3600.0
+    # On a Bloom hit: "verify" checks Mongo before dropping the event, "skip" trusts the filter
+    dedup_false_positive_policy: Literal["verify", "skip"] = "verify"
+
+    # Burst coalescing: events of these types are merged per user into one digest notification
+    # per window (e.g. ["notification.sent", "user.updated"]; empty disables it)
+    coalesce_event_types: list[str] = []
+    coalesce_window_seconds: float = 10.0
+    # A window is written early once it absorbed this many events
+    coalesce_max_events: int = 500
+    coalesce_max_payloads: int = 10
+
+    # Retention: TTL indexes expire read notifications N days after being read and unread
+    # ones M days after creation (None keeps them forever)
+    retention_read_days: Optional[int] = None
+    retention_unread_days: Optional[int] = None
+    # Archival job (python -m notification_service.jobs.archive_notifications): when enabled the
+    # TTL indexes only delete after an extra grace period, leaving the job time to archive first
+    retention_archive_enabled: bool = False
+    retention_archive_grace_days: int = 7
+    retention_archive_target: Literal["collection", "ndjson"] = "collection"
+    retention_archive_directory: str = "./archive"
+    retention_archive_batch_size: int = 1000
+    # Throttle so archival does not compete with live ingestion
+    retention_archive_docs_per_second: float = 2000.0
+
+    # Logging settings
+    log_level: str = "INFO"
+    # Write logs from a background thread fed by a bounded queue, so the event loop never blocks
+    # on stdout; when the queue is full records are dropped (counted in log_records_dropped),
+    # except errors, written directly by the caller
+    log_async: bool = True
+    log_queue_size: int = 10_000
+    # Hot-path messages (logged for every event with extra=HOT_PATH): share of them kept, then at
+    # most N per second for each message (None disables the limit); errors are always logged
+    log_hot_path_sample_rate: float = 1.0
+    log_hot_path_max_per_second: Optional[float] = 20.0
+    # Skip collecting the caller, thread and process details of every record (the log format uses
+    # none of them). Changes process-wide logging state, so uvicorn and library records are affected too
+    log_skip_record_context: bool = False
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -26,9 +147,13 @@ settings = Settings()
 
 class Logger:
     def __init__(self, name: str = "notification-service"):
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        configure_logging(
+            level=settings.log_level,
+            log_async=settings.log_async,
+            queue_size=settings.log_queue_size,
+            hot_path_sample_rate=settings.log_hot_path_sample_rate,
+            hot_path_max_per_second=settings.log_hot_path_max_per_second,
+            skip_record_context=settings.log_skip_record_context,
         )
         self.logger = logging.getLogger(name)
 
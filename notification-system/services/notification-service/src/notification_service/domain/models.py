@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from notification_service.config import settings
+
 
 class Notification(BaseModel):
     event_id: str = Field(..., description="The ID of the event that triggered the notification")
@@ -9,7 +11,9 @@ class Notification(BaseModel):
     user_id: str = Field(..., description="The ID of the user that triggered the notification")
     timestamp: datetime = Field(..., description="The timestamp of the notification")
     payload: dict = Field(..., description="The payload of the notification")
+    schema_version: Optional[int] = Field(default=None, description="Version of the payload schema (None for unversioned events)")
     read: bool = Field(default=False, description="Whether the notification has been read")
+    read_at: Optional[datetime] = Field(default=None, description="When the notification was marked as read (retention)")
     created_at: datetime = Field(default_factory=datetime.utcnow, description="The timestamp of the notification creation")
 
     class Config:
@@ -25,3 +29,17 @@ class Notification(BaseModel):
             }
         }
 
+
+class BulkMarkAsReadRequest(BaseModel):
+    event_ids: Optional[List[str]] = Field(
+        default=None, max_length=settings.bulk_mark_read_max_ids, description="Only mark these notifications as read"
+    )
+    before: Optional[datetime] = Field(default=None, description="Only mark notifications older than this timestamp as read")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "event_ids": ["ab-123-uuid", "cd-456-uuid"],
+                "before": "2021-01-01T00:00:00Z"
+            }
+        }
@@ -0,0 +1,341 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from notification_service.domain.models import Notification
+from notification_service.infrastructure.database import get_buckets_collection
+from notification_service.infrastructure.metrics import MONGO_FIND_SECONDS, MONGO_INSERT_SECONDS, MONGO_UPDATE_SECONDS
+from notification_service.infrastructure.notification_store import NotificationStore, check_fields, digest_update
+from notification_service.services.pagination import decode_cursor
+
+
+EPOCH = datetime(1970, 1, 1)
+# Buckets fetched per round trip while paginating: a page usually fits in the newest one or two
+BUCKETS_PER_BATCH = 2
+# Attempts of the optimistic read-modify-write of a digest
+DIGEST_UPDATE_ATTEMPTS = 5
+
+
+def utc_naive(timestamp: datetime) -> datetime:
+    """Timestamps are compared as naive UTC, the way MongoDB returns them."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def bucket_window(timestamp: datetime, window_seconds: int) -> datetime:
+    """Start of the time window holding `timestamp`."""
+    seconds = int((utc_naive(timestamp) - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % window_seconds)
+
+
+def to_element(notification: dict) -> dict:
+    """A notification as stored in a bucket: the user_id is the bucket's, _id is dropped."""
+    element = {key: value for key, value in notification.items() if key not in ("_id", "user_id")}
+    element["timestamp"] = utc_naive(element["timestamp"])
+    return element
+
+
+def _sort_key(element: dict) -> tuple:
+    return element["timestamp"], element["event_id"]
+
+
+class BucketStore(NotificationStore):
+    """
+    Bucket pattern: one document per user and time window holding an array of notifications,
+    capped at `max_notifications` or `max_bytes` (a full window continues in a new bucket):
+
+        {user_id, window, count, bytes, oldest, newest, notifications: [{event_id, ...}]}
+
+    A page is usually served by one or two buckets instead of one document per notification,
+    and the indexes hold one entry per bucket, except the unique multikey index on
+    `notifications.event_id` that keeps event_ids unique across buckets. That index does not
+    look inside a single document, so a notification is only pushed into a bucket that does
+    not hold its event_id yet; otherwise the upsert creates a bucket and hits the index.
+    """
+
+    def __init__(self, window_seconds: int, max_notifications: int, max_bytes: int):
+        self.window_seconds = window_seconds
+        self.max_notifications = max_notifications
+        self.max_bytes = max_bytes
+
+    def collection(self):
+        """Get the buckets collection, ensuring the database has been initialized."""
+        return get_buckets_collection()
+
+    def _push(self, user_id: str, element: dict) -> tuple[dict, dict]:
+        """Filter and update (upserted) adding `element` to a bucket of its window with room left, or to a new bucket."""
+        size = len(bson.encode(element))
+        return (
+            {
+                "user_id": user_id,
+                "window": bucket_window(element["timestamp"], self.window_seconds),
+                "count": {"$lt": self.max_notifications},
+                "bytes": {"$lte": self.max_bytes - size},
+                "notifications.event_id": {"$ne": element["event_id"]},
+            },
+            {
+                "$push": {"notifications": element},
+                "$inc": {"count": 1, "bytes": size},
+                "$min": {"oldest": element["timestamp"]},
+                "$max": {"newest": element["timestamp"]},
+            },
+        )
+
+    async def insert(self, notification: Notification) -> None:
+        query, update = self._push(notification.user_id, to_element(notification.model_dump()))
+        with MONGO_INSERT_SECONDS.time():
+            await self.collection().update_one(query, update, upsert=True)
+
+    async def insert_many(self, notifications: List[Notification]) -> None:
+        requests = [UpdateOne(*self._push(n.user_id, to_element(n.model_dump())), upsert=True) for n in notifications]
+        with MONGO_INSERT_SECONDS.time():
+            await self.collection().bulk_write(requests, ordered=False)
+
+    async def upsert_digest(self, digest_id: str, notifications: List[Notification], max_payloads: int) -> Optional[dict]:
+        """
+        Read-modify-write of the digest element, retried when the element changed in between
+        (the records of a user are consumed by a single process, so conflicts are rare).
+        """
+        latest, event_ids, payloads = digest_update(notifications, max_payloads)
+        collection = self.collection()
+
+        for _ in range(DIGEST_UPDATE_ATTEMPTS):
+            with MONGO_FIND_SECONDS.time():
+                bucket = await collection.find_one({"notifications.event_id": digest_id}, {"notifications.$": 1, "bytes": 1})
+
+            if bucket is None:
+                digest = {
+                    **to_element(latest.model_dump()),
+                    "event_id": digest_id,
+                    "digest": True,
+                    "event_ids": list(dict.fromkeys(event_ids)),
+                    "payloads": payloads,
+                    "created_at": datetime.utcnow(),
+                }
+                digest["count"] = len(digest["event_ids"])
+                query, update = self._push(latest.user_id, digest)
+                try:
+                    with MONGO_UPDATE_SECONDS.time():
+                        await collection.update_one(query, update, upsert=True)
+                    return None
+                except DuplicateKeyError:
+                    # Created concurrently: merge into it
+                    continue
+
+            before = bucket["notifications"][0]
+            known = set(before.get("event_ids", []))
+            merged_ids = [*before.get("event_ids", []), *(event_id for event_id in dict.fromkeys(event_ids) if event_id not in known)]
+            digest = {
+                **before,
+                "event_type": latest.event_type,
+                "digest": True,
+                "read": False,
+                "read_at": None,
+                "timestamp": max(before["timestamp"], utc_naive(latest.timestamp)),
+                "payload": latest.payload,
+                "event_ids": merged_ids,
+                "payloads": [*before.get("payloads", []), *(p for p in payloads if p["event_id"] not in known)][-max_payloads:],
+                "count": len(merged_ids),
+            }
+            growth = len(bson.encode(digest)) - len(bson.encode(before))
+            with MONGO_UPDATE_SECONDS.time():
+                result = await collection.update_one(
+                    {
+                        "_id": bucket["_id"],
+                        "notifications": {"$elemMatch": {
+                            "event_id": digest_id, "count": before.get("count"), "read": before.get("read"),
+                        }},
+                    },
+                    {"$set": {"notifications.$": digest}, "$inc": {"bytes": growth}, "$max": {"newest": digest["timestamp"]}},
+                )
+            if result.modified_count:
+                return {"read": before.get("read")}
+
+        raise RuntimeError(f"Digest {digest_id} kept changing while being updated")
+
+    async def stored_event_ids(self, event_ids: List[str]) -> set[str]:
+        wanted = set(event_ids)
+        with MONGO_FIND_SECONDS.time():
+            buckets = await self.collection().find(
+                {"notifications.event_id": {"$in": event_ids}}, {"_id": 0, "notifications.event_id": 1}
+            ).to_list(length=None)
+        return {n["event_id"] for bucket in buckets for n in bucket["notifications"] if n["event_id"] in wanted}
+
+    def unread_counts_pipeline(self) -> list[dict]:
+        return [
+            {"$group": {
+                "_id": "$user_id",
+                "unread": {"$sum": {"$size": {"$filter": {
+                    "input": "$notifications", "cond": {"$eq": ["$$this.read", False]},
+                }}}},
+            }},
+        ]
+
+    async def _collect(self, query: dict, descending: bool, wanted: int, after: Optional[tuple]) -> List[dict]:
+        """
+        The first `wanted` notifications of the matching buckets in (timestamp, event_id)
+        order, strictly past `after`.
+
+        Buckets are read in order of their newest notification (oldest when ascending), a few
+        per round trip, until the next bucket cannot hold anything sorting before the
+        `wanted`-th notification collected so far.
+        """
+        collected: List[dict] = []
+        find_cursor = (
+            self.collection().find(query, {"_id": 0, "oldest": 1, "newest": 1, "notifications": 1})
+            .sort("newest" if descending else "oldest", -1 if descending else 1)
+            .batch_size(BUCKETS_PER_BATCH)
+        )
+        try:
+            with MONGO_FIND_SECONDS.time():
+                async for bucket in find_cursor:
+                    if len(collected) >= wanted:
+                        collected.sort(key=_sort_key, reverse=descending)
+                        del collected[wanted:]
+                        boundary = collected[-1]["timestamp"]
+                        if boundary > bucket["newest"] if descending else boundary < bucket["oldest"]:
+                            break
+                    for element in bucket["notifications"]:
+                        if after is None or (_sort_key(element) < after if descending else _sort_key(element) > after):
+                            collected.append(element)
+        finally:
+            await find_cursor.close()
+
+        collected.sort(key=_sort_key, reverse=descending)
+        return collected[:wanted]
+
+    @staticmethod
+    def _output(user_id: str, element: dict, fields: Optional[List[str]]) -> dict:
+        notification = {**element, "user_id": user_id}
+        if not fields:
+            return notification
+        # event_id and timestamp are always returned: they identify and paginate the notifications
+        kept = {*fields, "event_id", "timestamp"}
+        return {key: value for key, value in notification.items() if key in kept}
+
+    async def find_page(
+        self, user_id: str, limit: int, skip: int, cursor: Optional[str], fields: Optional[List[str]]
+    ) -> List[dict]:
+        check_fields(fields)
+        query: dict = {"user_id": user_id}
+        after = None
+        if cursor is not None:
+            timestamp, event_id = decode_cursor(cursor)
+            after = (utc_naive(timestamp), event_id)
+            query["oldest"] = {"$lte": after[0]}
+
+        page = (await self._collect(query, descending=True, wanted=skip + limit, after=after))[skip:]
+        return [self._output(user_id, element, fields) for element in page]
+
+    async def find_after(self, user_id: str, cursor: str, limit: int) -> List[dict]:
+        timestamp, event_id = decode_cursor(cursor)
+        after = (utc_naive(timestamp), event_id)
+        query = {"user_id": user_id, "newest": {"$gte": after[0]}}
+        return [self._output(user_id, element, None) for element in await self._collect(query, False, limit, after)]
+
+    async def mark_read(self, event_id: str, user_id: str, read_at: datetime) -> bool:
+        with MONGO_UPDATE_SECONDS.time():
+            result = await self.collection().update_one(
+                {"user_id": user_id, "notifications": {"$elemMatch": {"event_id": event_id, "read": False}}},
+                {"$set": {"notifications.$.read": True, "notifications.$.read_at": read_at}},
+            )
+        return result.modified_count > 0
+
+    async def mark_many_read(
+        self, user_id: str, event_ids: Optional[List[str]], before: Optional[datetime], read_at: datetime
+    ) -> int:
+        """
+        One update per bucket holding matching notifications (array filters), in a single
+        bulk write. The count comes from the buckets read just before, so a notification
+        marked read concurrently may be counted twice (`recompute_unread_counters` repairs it).
+        """
+        condition: dict = {"read": False}
+        query: dict = {"user_id": user_id}
+        if event_ids is not None:
+            condition["event_id"] = {"$in": event_ids}
+        if before is not None:
+            before = utc_naive(before)
+            condition["timestamp"] = {"$lt": before}
+            query["oldest"] = {"$lt": before}
+        query["notifications"] = {"$elemMatch": condition}
+
+        wanted = set(event_ids) if event_ids is not None else None
+        collection = self.collection()
+        with MONGO_FIND_SECONDS.time():
+            buckets = await collection.find(
+                query, {"notifications.event_id": 1, "notifications.read": 1, "notifications.timestamp": 1}
+            ).to_list(length=None)
+
+        requests = []
+        modified = 0
+        for bucket in buckets:
+            matching = sum(
+                1 for n in bucket["notifications"]
+                if not n["read"]
+                and (wanted is None or n["event_id"] in wanted)
+                and (before is None or n["timestamp"] < before)
+            )
+            if matching:
+                modified += matching
+                requests.append(UpdateOne(
+                    {"_id": bucket["_id"]},
+                    {"$set": {"notifications.$[n].read": True, "notifications.$[n].read_at": read_at}},
+                    array_filters=[{f"n.{field}": value for field, value in condition.items()}],
+                ))
+        if requests:
+            with MONGO_UPDATE_SECONDS.time():
+                await collection.bulk_write(requests, ordered=False)
+        return modified
+
+
+class BucketPacker:
+    """
+    Packs notification documents, read in (user_id, timestamp, event_id) order, into full
+    buckets with the same window and caps as BucketStore (migration from the document layout).
+    """
+
+    def __init__(self, store: BucketStore):
+        self.store = store
+        self._bucket: Optional[dict] = None
+
+    def add(self, document: dict) -> Optional[dict]:
+        """Add a notification; returns the previous bucket once it is complete."""
+        element = to_element(document)
+        size = len(bson.encode(element))
+        window = bucket_window(element["timestamp"], self.store.window_seconds)
+
+        completed = None
+        bucket = self._bucket
+        if (
+            bucket is None
+            or bucket["user_id"] != document["user_id"]
+            or bucket["window"] != window
+            or bucket["count"] >= self.store.max_notifications
+            or bucket["bytes"] + size > self.store.max_bytes
+        ):
+            completed = bucket
+            bucket = self._bucket = {
+                "user_id": document["user_id"],
+                "window": window,
+                "count": 0,
+                "bytes": 0,
+                "oldest": element["timestamp"],
+                "newest": element["timestamp"],
+                "notifications": [],
+            }
+
+        bucket["notifications"].append(element)
+        bucket["count"] += 1
+        bucket["bytes"] += size
+        bucket["oldest"] = min(bucket["oldest"], element["timestamp"])
+        bucket["newest"] = max(bucket["newest"], element["timestamp"])
+        return completed
+
+    def flush(self) -> Optional[dict]:
+        """The bucket being filled, if any."""
+        bucket, self._bucket = self._bucket, None
+        return bucket
@@ -0,0 +1,147 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from itertools import count
+from typing import Hashable, List, Optional
+
+import orjson
+
+
+class NotificationCache(ABC):
+    """
+    Cache of user notification pages.
+
+    Methods are async so a shared, out-of-process backend (e.g. Redis) can implement
+    the same interface later.
+    """
+
+    @abstractmethod
+    async def get(self, user_id: str, page: Hashable) -> Optional[List[dict]]:
+        ...
+
+    @abstractmethod
+    async def version(self, user_id: str) -> int:
+        """Token taken before reading from Mongo, handed back to `set` to detect concurrent writes."""
+
+    @abstractmethod
+    async def set(self, user_id: str, page: Hashable, notifications: List[dict], version: int) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate_user(self, user_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def mark_read(self, user_id: str, event_id: str, read_at: datetime) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class InMemoryNotificationCache(NotificationCache):
+    """In-process LRU + TTL cache keyed by (user_id, page), bounded in entries and bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # (user_id, page) -> (expires_at, size, notifications)
+        self._entries: OrderedDict[tuple, tuple[float, int, List[dict]]] = OrderedDict()
+        self._user_pages: dict[str, set] = {}
+        self._bytes = 0
+
+        # Last write version per user. Only users without cached pages are pruned, and
+        # `_floor` keeps the highest pruned version: a pruned user reports the floor, so a
+        # page read before the prune can never be cached as fresh.
+        self._clock = count(1)
+        self._versions: OrderedDict[str, int] = OrderedDict()
+        self._floor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, user_id: str, page: Hashable) -> Optional[List[dict]]:
+        key = (user_id, page)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    async def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, self._floor)
+
+    async def set(self, user_id: str, page: Hashable, notifications: List[dict], version: int) -> None:
+        # A write for this user happened while the page was being read: the result may be stale
+        if self._versions.get(user_id, self._floor) > version:
+            return
+
+        size = len(orjson.dumps(notifications))
+        if size > self.max_bytes:
+            return
+
+        key = (user_id, page)
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, size, notifications)
+        self._user_pages.setdefault(user_id, set()).add(key)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def invalidate_user(self, user_id: str) -> None:
+        self._bump(user_id)
+        for key in list(self._user_pages.get(user_id, ())):
+            self._remove(key)
+
+    async def mark_read(self, user_id: str, event_id: str, read_at: datetime) -> None:
+        # Patch the cached pages in place instead of dropping them; the bump still rejects
+        # pages being read concurrently, which may predate the write. Only the fields a page
+        # holds are patched, so pages read with a field selection keep their shape
+        self._bump(user_id)
+        patch = {"read": True, "read_at": read_at}
+        for key in self._user_pages.get(user_id, ()):
+            for notification in self._entries[key][2]:
+                if notification.get("event_id") == event_id:
+                    notification.update((field, value) for field, value in patch.items() if field in notification)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _bump(self, user_id: str) -> None:
+        self._versions[user_id] = next(self._clock)
+        self._versions.move_to_end(user_id)
+        if len(self._versions) > self.max_entries:
+            # Users with cached pages are at most max_entries, so one without pages exists
+            pruned = next(user for user in self._versions if user not in self._user_pages)
+            self._floor = max(self._floor, self._versions.pop(pruned))
+
+    def _remove(self, key: tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+        pages = self._user_pages.get(key[0])
+        if pages is not None:
+            pages.discard(key)
+            if not pages:
+                del self._user_pages[key[0]]
@@ -1,4 +1,5 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from typing import Optional
 from notification_service.config import logger, settings
 
@@ -6,10 +7,17 @@ from notification_service.config import logger, settings
 _client: Optional[AsyncIOMotorClient] = None
 _db = None
 _collection = None
+_counters_collection = None
+_archive_collection = None
+_buckets_collection = None
+
+SECONDS_PER_DAY = 24 * 60 * 60
+# IndexOptionsConflict / IndexKeySpecsConflict: the index exists with other options
+_INDEX_CONFLICT_CODES = (85, 86)
 
 
 async def init_database():
-    global _client, _db, _collection
+    global _client, _db, _collection, _counters_collection, _archive_collection, _buckets_collection
 
     logger.info("🔌 Connecting to MongoDB...")
 
@@ -17,15 +25,103 @@ async def init_database():
         _client = AsyncIOMotorClient(settings.mongodb_uri)
         _db = _client[settings.mongodb_database]
         _collection = _db[settings.mongodb_collection]
-
-    await _collection.create_index([("event_id", 1)], unique=True)
-    await _collection.create_index([("user_id", 1), ("timestamp", -1)])
+        _counters_collection = _db[settings.mongodb_counters_collection]
+        _archive_collection = _db[settings.mongodb_archive_collection]
+        _buckets_collection = _db[settings.mongodb_buckets_collection]
+
+    if settings.storage_layout == "bucket":
+        await ensure_bucket_indexes()
+    else:
+        await _collection.create_index([("event_id", 1)], unique=True)
+        # event_id breaks timestamp ties so cursor pagination is a pure index seek
+        await _collection.create_index([("user_id", 1), ("timestamp", -1), ("event_id", -1)])
+    await _ensure_retention_indexes()
 
     logger.info("✅ Database initialized successfully")
 
 
+async def ensure_bucket_indexes():
+    """
+    Indexes of the bucket layout. The unique multikey index on the embedded event_ids keeps
+    them unique across buckets (a bucket never holds the same event_id twice, see BucketStore).
+    """
+    await _buckets_collection.create_index([("notifications.event_id", 1)], unique=True)
+    # Bucket with room for a new notification of the user's time window
+    await _buckets_collection.create_index([("user_id", 1), ("window", 1)])
+    # Buckets newest first, for pagination
+    await _buckets_collection.create_index([("user_id", 1), ("newest", -1)])
+
+
+def _ttl_seconds(days: Optional[int]) -> Optional[int]:
+    if not days:
+        return None
+    if settings.retention_archive_enabled:
+        days += settings.retention_archive_grace_days
+    return days * SECONDS_PER_DAY
+
+
+async def _ensure_retention_indexes():
+    """
+    TTL indexes of the retention policy: read notifications expire after `retention_read_days`
+    counted from `read_at`, unread ones after `retention_unread_days` counted from `created_at`
+    (the partial filter drops a notification from that index once it is read).
+
+    Deletions by the TTL monitor bypass the unread counters: schedule
+    `jobs.repair_unread_counters`, or use the archival job, which keeps them in sync.
+
+    In the bucket layout a whole bucket expires once its newest notification is older than
+    the longest of the two periods (read state is per notification, expiry per document).
+    """
+    if settings.storage_layout == "bucket":
+        periods = [days for days in (settings.retention_read_days, settings.retention_unread_days) if days]
+        await _ensure_ttl_index(_buckets_collection, "ttl_bucket", [("newest", 1)], _ttl_seconds(max(periods, default=None)))
+        return
+
+    await _ensure_ttl_index(_collection, "ttl_read", [("read_at", 1)], _ttl_seconds(settings.retention_read_days))
+    await _ensure_ttl_index(
+        _collection,
+        "ttl_unread",
+        [("created_at", 1)],
+        _ttl_seconds(settings.retention_unread_days),
+        partialFilterExpression={"read": False},
+    )
+    await _ensure_archive_index()
+
+
+async def _ensure_archive_index():
+    """
+    Index of the archival job's expired query (services.retention.expired_filter): every
+    branch of its $or is an equality on `read` (and on `read_at` for legacy reads) followed
+    by a range, so each one is an index seek instead of a collection scan.
+    """
+    name = "retention_archive"
+    if settings.retention_archive_enabled and (settings.retention_read_days or settings.retention_unread_days):
+        await _collection.create_index([("read", 1), ("read_at", 1), ("created_at", 1)], name=name)
+    elif name in await _collection.index_information():
+        await _collection.drop_index(name)
+        logger.info(f"🗑️ Index {name} dropped")
+
+
+async def _ensure_ttl_index(collection, name: str, keys: list, expire_after_seconds: Optional[int], **options):
+    existing = await collection.index_information()
+    if expire_after_seconds is None:
+        if name in existing:
+            await collection.drop_index(name)
+            logger.info(f"🗑️ Retention index {name} dropped")
+        return
+
+    try:
+        await collection.create_index(keys, name=name, expireAfterSeconds=expire_after_seconds, **options)
+    except OperationFailure as e:
+        if e.code not in _INDEX_CONFLICT_CODES:
+            raise
+        # Retention period changed: update the TTL in place instead of rebuilding the index
+        await _db.command("collMod", collection.name, index={"name": name, "expireAfterSeconds": expire_after_seconds})
+    logger.info(f"✅ Retention index {name}: expire after {expire_after_seconds // SECONDS_PER_DAY} days")
+
+
 async def close_database():
-    global _client, _db, _collection
+    global _client, _db, _collection, _counters_collection, _archive_collection, _buckets_collection
 
     logger.info("🔌 Closing MongoDB connection...")
 
@@ -34,6 +130,9 @@ async def close_database():
         _client = None
         _db = None
         _collection = None
+        _counters_collection = None
+        _archive_collection = None
+        _buckets_collection = None
 
         logger.info("✅ Database connection closed successfully")
 
@@ -43,3 +142,20 @@ def get_collection():
         raise RuntimeError("Database connection not initialized. Initialize the database first.")
     return _collection
 
+
+def get_archive_collection():
+    if _archive_collection is None:
+        raise RuntimeError("Database connection not initialized. Initialize the database first.")
+    return _archive_collection
+
+
+def get_counters_collection():
+    if _counters_collection is None:
+        raise RuntimeError("Database connection not initialized. Initialize the database first.")
+    return _counters_collection
+
+
+def get_buckets_collection():
+    if _buckets_collection is None:
+        raise RuntimeError("Database connection not initialized. Initialize the database first.")
+    return _buckets_collection
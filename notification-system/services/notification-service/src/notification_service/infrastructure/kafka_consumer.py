@@ -1,7 +1,20 @@
-import json
 import asyncio
-from aiokafka import AIOKafkaConsumer
-from notification_service.config import settings, Logger
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener, TopicPartition
+from notification_service.config import HOT_PATH, settings, Logger
+from notification_service.infrastructure.codec import HEADER_SCHEMA_VERSION_KEY, codec_from_headers, schema_version_from_headers
+from notification_service.infrastructure.keyed_workers import KeyedWorkerPool, OffsetTracker
+from notification_service.infrastructure.metrics import (
+    BATCH_PROCESSING_SECONDS,
+    MESSAGES_PROCESSED,
+    MESSAGES_UNDECODABLE,
+    forget_lag,
+    record_lag,
+)
+from notification_service.infrastructure.retry_topics import failure_router, is_transient
+from notification_service.services.coalescing import digest_coalescer
 from notification_service.services.notification_service import notification_service
 
 
@@ -14,14 +27,18 @@ logger = LoggerKafkaConsumer().logger
 _consumer_task = None
 _should_stop = False
 
+# Pause of the consumers when MongoDB is unreachable, before trying the messages again
+TRANSIENT_ERROR_BACKOFF_SECONDS = 5.0
 
-async def start_consumer():
+
+async def start_consumer() -> asyncio.Task:
     global _consumer_task, _should_stop
     _should_stop = False
 
     # Create a task to consume events in background
     _consumer_task = asyncio.create_task(consume_events())
     logger.info(f"✅ Kafka Consumer task started for topic: {settings.kafka_topic} and group: {settings.kafka_group_id}")
+    return _consumer_task
 
 
 async def stop_consumer():
@@ -29,14 +46,58 @@ async def stop_consumer():
     _should_stop = True
 
     if _consumer_task:
-        _consumer_task.cancel()
-        try:
-            await _consumer_task
-        except asyncio.CancelledError:
-            pass
+        # Let the loop finish the messages in hand and commit, then cancel it if it takes too long
+        done, _ = await asyncio.wait({_consumer_task}, timeout=settings.consumer_shutdown_timeout_seconds)
+        if not done:
+            logger.warning(f"⚠️ Consumer did not stop within {settings.consumer_shutdown_timeout_seconds}s, cancelling it")
+            _consumer_task.cancel()
+            try:
+                await _consumer_task
+            except asyncio.CancelledError:
+                pass
     logger.info("🔌 Kafka Consumer stopped")
 
 
+class CommitOnRevoke(ConsumerRebalanceListener):
+    """
+    Commits what was processed before partitions move to another member of the group,
+    so the new owner does not process those messages again.
+
+    The running consume loop sets `commit_processed`, which commits its processed
+    offsets and forgets the state of the partitions given as argument.
+    """
+
+    def __init__(self):
+        self.commit_processed: Optional[Callable[[set[TopicPartition]], Awaitable[None]]] = None
+
+    async def on_partitions_revoked(self, revoked):
+        if not revoked or self.commit_processed is None:
+            return
+        try:
+            if digest_coalescer is not None:
+                await digest_coalescer.flush(force=True)
+            await self.commit_processed(set(revoked))
+            logger.info(f"✅ Committed processed offsets before revoking {len(revoked)} partitions")
+        except Exception as e:
+            # The messages are redelivered to the new owner (duplicates are absorbed by event_id)
+            logger.error(f"❌ Could not commit before revoking partitions: {e}", exc_info=True)
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"🔌 Assigned partitions: {sorted(tp.partition for tp in assigned)}")
+
+
+def decode_message(message) -> dict:
+    """Decode the record value with the codec named in its headers (mixed traffic during rollouts)."""
+    codec = codec_from_headers(message.headers, settings.kafka_default_codec)
+    event = codec.decode(message.value)
+    # The header is what the producer validated the payload against
+    schema_version = schema_version_from_headers(message.headers)
+    event[HEADER_SCHEMA_VERSION_KEY] = schema_version
+    if schema_version is not None:
+        event["schema_version"] = schema_version
+    return event
+
+
 async def consume_events():
     global _should_stop
 
@@ -44,18 +105,21 @@ async def consume_events():
     retry_delay = 3  # seconds
 
     consumer = None
+    listener = CommitOnRevoke()
 
     # Retry logic to connect to Kafka
     for attempt in range(max_retries):
+        if _should_stop:
+            return
         try:
             consumer = AIOKafkaConsumer(
-                settings.kafka_topic,
                 bootstrap_servers=settings.kafka_bootstrap_servers,
                 group_id=settings.kafka_group_id,
-                value_deserializer=lambda v: json.loads(v.decode('utf-8')),
                 auto_offset_reset='earliest',
-                enable_auto_commit=True
+                # Offsets are committed manually once events are persisted (at-least-once)
+                enable_auto_commit=False
             )
+            consumer.subscribe([settings.kafka_topic], listener=listener)
 
             await consumer.start()
             logger.info(f"✅ Kafka Consumer connected for topic: {settings.kafka_topic} and group: {settings.kafka_group_id}")
@@ -101,21 +165,48 @@ async def consume_events():
         return
 
     # Consumer connected successfully, start consuming events
+    retry_task = None
     try:
-        async for message in consumer:
-            if _should_stop:
-                break
-
-            event = message.value
-            logger.info(f"✅ Received event: {event.get('event_type')}: {event.get('event_id')}")
-            await notification_service.save_notification(event)
-            await consumer.commit()
+        if failure_router is not None:
+            await failure_router.start()
+            if failure_router.retry_topics:
+                retry_task = asyncio.create_task(_run_retry_consumer())
+        if digest_coalescer is not None:
+            digest_coalescer.start()
+        if settings.kafka_consumer_mode == "batch":
+            await _consume_batches(consumer, listener)
+        elif settings.kafka_consumer_mode == "concurrent":
+            await _consume_concurrently(consumer, listener)
+        else:
+            await _consume_single(consumer, listener)
 
     except asyncio.CancelledError:
         logger.info("🛑 Consumer task cancelled")
     except Exception as e:
         logger.error(f"❌ Error consuming events: {e}", exc_info=True)
     finally:
+        if retry_task is not None:
+            # A retry interrupted here is redelivered to the retry consumer (at-least-once)
+            retry_task.cancel()
+            await asyncio.gather(retry_task, return_exceptions=True)
+        if digest_coalescer is not None:
+            # Write the open digest windows before the consumer leaves the group; an offset
+            # left uncommitted only means its event is merged into the same digest again
+            try:
+                await digest_coalescer.stop()
+            except Exception as e:
+                logger.error(f"❌ Error writing pending digests: {e}", exc_info=True)
+        if consumer and listener.commit_processed is not None:
+            # Flush the offsets processed since the last commit before leaving the group
+            try:
+                await listener.commit_processed(set())
+            except Exception as e:
+                logger.error(f"❌ Error committing offsets on shutdown: {e}", exc_info=True)
+        if failure_router is not None:
+            try:
+                await failure_router.stop()
+            except Exception as e:
+                logger.error(f"❌ Error stopping the failure router: {e}", exc_info=True)
         if consumer:
             try:
                 await consumer.stop()
@@ -123,3 +214,406 @@ async def consume_events():
             except Exception as e:
                 logger.error(f"❌ Error stopping consumer: {e}", exc_info=True)
 
+
+async def _handle_failure(message, error: Exception) -> None:
+    """
+    Route a message that could not be processed to its retry topic or the dead letter topic.
+    Without routing, or when the failure is not the message's (MongoDB unreachable), the
+    error is raised: the consume loop rewinds and tries again after a transient failure
+    (see `_back_off`), and stops without committing otherwise.
+    """
+    if failure_router is None or is_transient(error):
+        raise error
+    await failure_router.route(message, error)
+
+
+async def _back_off(consumer: AIOKafkaConsumer, positions: dict[TopicPartition, int], error: Exception) -> None:
+    """
+    MongoDB is unreachable: rewind each partition to its first unprocessed message and wait
+    before consuming again. Nothing is committed, and the messages already stored are
+    skipped as duplicates when they come back.
+    """
+    logger.error(f"❌ Could not store events, trying again in {TRANSIENT_ERROR_BACKOFF_SECONDS}s: {error}")
+    assignment = consumer.assignment()
+    for tp, offset in positions.items():
+        if tp in assignment:
+            consumer.seek(tp, offset)
+    await asyncio.sleep(TRANSIENT_ERROR_BACKOFF_SECONDS)
+
+
+async def _dead_letter_undecodable(message, error: Exception) -> None:
+    logger.error(f"❌ Could not decode message at {message.topic}[{message.partition}]@{message.offset}: {error}")
+    MESSAGES_UNDECODABLE.inc()
+    if failure_router is not None:
+        await failure_router.route(message, error)
+
+
+def _absorb(event: dict, tp: TopicPartition, offset: int) -> bool:
+    """Hand the event to burst coalescing; True when it will be written as part of a digest."""
+    if digest_coalescer is None:
+        return False
+    if digest_coalescer.error is not None:
+        raise digest_coalescer.error
+    return digest_coalescer.absorb(event, tp, offset)
+
+
+async def _commit(consumer: AIOKafkaConsumer, consumed: dict[TopicPartition, int]) -> None:
+    """
+    Commit the processed offsets of the assigned partitions, holding each partition back
+    at its oldest event still waiting in a digest window.
+    """
+    assignment = consumer.assignment()
+    offsets = {}
+    for tp, next_offset in consumed.items():
+        if tp not in assignment:
+            continue
+        pending = digest_coalescer.earliest_pending(tp) if digest_coalescer is not None else None
+        offsets[tp] = next_offset if pending is None else min(next_offset, pending)
+    if offsets:
+        await consumer.commit(offsets)
+
+
+def _track_commits(consumer: AIOKafkaConsumer, listener: CommitOnRevoke, consumed: dict[TopicPartition, int]) -> None:
+    """Commit `consumed` before a rebalance and as soon as a digest is written."""
+
+    async def commit_processed(revoked):
+        await _commit(consumer, consumed)
+        for tp in revoked:
+            consumed.pop(tp, None)
+
+    listener.commit_processed = commit_processed
+    if digest_coalescer is not None:
+
+        async def commit_digest(positions):
+            await _commit(consumer, consumed)
+
+        digest_coalescer.on_flushed = commit_digest
+
+
+async def _consume_single(consumer: AIOKafkaConsumer, listener: CommitOnRevoke):
+    processing_seconds = BATCH_PROCESSING_SECONDS.labels("single")
+    consumed: dict[TopicPartition, int] = {}
+    _track_commits(consumer, listener, consumed)
+
+    while not _should_stop:
+        # Polled one record at a time with a timeout (rather than iterated) so a stop request
+        # is noticed while idle; records still come from the consumer's prefetch buffer
+        records = await consumer.getmany(timeout_ms=settings.kafka_batch_max_wait_ms, max_records=1)
+        for tp, messages in records.items():
+            record_lag(consumer, tp, messages[-1].offset)
+            for message in messages:
+                # The partition may have been revoked while the record was waiting
+                if tp not in consumer.assignment():
+                    break
+
+                try:
+                    event = decode_message(message)
+                except Exception as e:
+                    await _dead_letter_undecodable(message, e)
+                    consumed[tp] = message.offset + 1
+                    await _commit(consumer, consumed)
+                    continue
+
+                logger.info("✅ Received event: %s: %s", event.get("event_type"), event.get("event_id"), extra=HOT_PATH)
+                with processing_seconds.time():
+                    if not _absorb(event, tp, message.offset):
+                        try:
+                            await notification_service.save_notification(event)
+                        except Exception as e:
+                            if is_transient(e):
+                                await _back_off(consumer, {tp: message.offset}, e)
+                                break
+                            await _handle_failure(message, e)
+                    consumed[tp] = message.offset + 1
+                    await _commit(consumer, consumed)
+                MESSAGES_PROCESSED.inc()
+
+
+async def _collect_batch(consumer: AIOKafkaConsumer) -> list:
+    """Fetch messages until the batch is full or the max wait has elapsed."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.kafka_batch_max_wait_ms / 1000
+    messages = []
+
+    while len(messages) < settings.kafka_batch_max_size:
+        remaining_ms = int((deadline - loop.time()) * 1000)
+        if remaining_ms <= 0:
+            break
+        records = await consumer.getmany(
+            timeout_ms=remaining_ms,
+            max_records=settings.kafka_batch_max_size - len(messages),
+        )
+        for tp, partition_messages in records.items():
+            messages.extend(partition_messages)
+            record_lag(consumer, tp, partition_messages[-1].offset)
+
+    return messages
+
+
+async def _consume_batches(consumer: AIOKafkaConsumer, listener: CommitOnRevoke):
+    processing_seconds = BATCH_PROCESSING_SECONDS.labels("batch")
+    consumed: dict[TopicPartition, int] = {}
+    _track_commits(consumer, listener, consumed)
+
+    while not _should_stop:
+        messages = await _collect_batch(consumer)
+        if not messages:
+            continue
+
+        start = time.perf_counter()
+        events = []
+        # Message of each event, to route the ones that fail
+        sources = []
+        # Positions only count as processed once the batch is stored
+        positions: dict[TopicPartition, int] = {}
+        # First offset of each partition, to fetch the batch again after a transient failure
+        starts: dict[TopicPartition, int] = {}
+        for message in messages:
+            tp = TopicPartition(message.topic, message.partition)
+            positions[tp] = message.offset + 1
+            starts.setdefault(tp, message.offset)
+            try:
+                event = decode_message(message)
+            except Exception as e:
+                await _dead_letter_undecodable(message, e)
+                continue
+            if not _absorb(event, tp, message.offset):
+                events.append(event)
+                sources.append(message)
+
+        # Persist the whole batch before committing: a failure here leaves the offsets
+        # uncommitted so the batch is redelivered (duplicates are absorbed by event_id)
+        if events:
+            try:
+                await _save_batch(events, sources)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                await _back_off(consumer, starts, e)
+                continue
+        consumed.update(positions)
+        await _commit(consumer, consumed)
+        processing_seconds.observe(time.perf_counter() - start)
+        MESSAGES_PROCESSED.inc(len(messages))
+        logger.info("✅ Processed batch of %d messages", len(messages), extra=HOT_PATH)
+
+
+async def _save_batch(events: list[dict], sources: list) -> None:
+    """
+    Store a batch with one insert_many. Invalid events are routed to the dead letter topic;
+    when the insert itself fails, the events are stored one by one so that only the
+    failing ones are routed (those already stored are skipped as duplicates).
+    """
+    invalid: list[tuple[int, Exception]] = []
+    try:
+        await notification_service.save_notifications(events, on_invalid=lambda index, e: invalid.append((index, e)))
+    except Exception as e:
+        if failure_router is None or is_transient(e):
+            raise
+        logger.warning(f"⚠️ Batch insert failed, storing its {len(events)} events one by one: {e}")
+        for event, message in zip(events, sources):
+            try:
+                await notification_service.save_notification(event)
+            except Exception as error:
+                await _handle_failure(message, error)
+        return
+
+    if failure_router is not None and invalid:
+        await asyncio.gather(*(failure_router.route(sources[index], error) for index, error in invalid))
+
+
+async def _consume_concurrently(consumer: AIOKafkaConsumer, listener: CommitOnRevoke):
+    """
+    Dispatch messages to workers sharded by user_id: per-user order is kept while
+    different users are processed in parallel, each worker storing what is waiting in its
+    queue with one insert_many. Offsets are committed up to the lowest contiguous completed
+    offset of each partition, and a full worker queue pauses the partition of the message
+    that could not be queued until a worker frees room.
+    """
+    tracker = OffsetTracker()
+    # Messages waiting for room in a full worker queue, kept in partition order
+    held: dict[TopicPartition, deque] = {}
+
+    processing_seconds = BATCH_PROCESSING_SECONDS.labels("concurrent")
+
+    async def handle(items):
+        # The items of a worker's queue are stored with one insert_many, like a batch
+        with processing_seconds.time():
+            while True:
+                try:
+                    await _save_batch([event for _, _, event in items], [message for _, message, _ in items])
+                    break
+                except Exception as e:
+                    if not is_transient(e):
+                        raise
+                    # MongoDB unreachable: the items stay in flight (uncommitted) and are
+                    # tried again; the full queues pause the partitions meanwhile
+                    logger.error(f"❌ Could not store events, trying again in {TRANSIENT_ERROR_BACKOFF_SECONDS}s: {e}")
+                    await asyncio.sleep(TRANSIENT_ERROR_BACKOFF_SECONDS)
+        for tp, message, _ in items:
+            tracker.complete(tp, message.offset)
+        MESSAGES_PROCESSED.inc(len(items))
+
+    def dispatch_held():
+        for tp, items in list(held.items()):
+            while items and pool.try_dispatch(items[0][2].get("user_id") or "", items[0]):
+                items.popleft()
+            if not items:
+                del held[tp]
+                if tp in consumer.assignment():
+                    consumer.resume(tp)
+
+    pool = KeyedWorkerPool(
+        settings.kafka_consumer_workers, settings.kafka_worker_queue_size, handle, max_batch=settings.kafka_worker_batch_size
+    )
+    pool.start()
+
+    async def complete_digest(positions):
+        # Absorbed events complete when their digest is written
+        for tp, offset in positions:
+            tracker.complete(tp, offset)
+
+    if digest_coalescer is not None:
+        digest_coalescer.on_flushed = complete_digest
+
+    async def commit_processed(revoked):
+        offsets = {tp: offset for tp, offset in tracker.committable_offsets().items() if tp in consumer.assignment()}
+        if offsets:
+            await consumer.commit(offsets)
+        tracker.forget(revoked)
+        forget_lag(revoked)
+        for tp in revoked:
+            held.pop(tp, None)
+
+    listener.commit_processed = commit_processed
+
+    try:
+        while not _should_stop:
+            if pool.error is not None:
+                raise pool.error
+
+            # Forget partitions lost in a rebalance, their messages will be redelivered elsewhere
+            revoked = tracker.partitions() - consumer.assignment()
+            if revoked:
+                tracker.forget(revoked)
+                forget_lag(revoked)
+                for tp in revoked:
+                    held.pop(tp, None)
+
+            # Cleared before dispatching, so room freed from here on wakes the wait below
+            pool.space_available.clear()
+            dispatch_held()
+
+            records = await consumer.getmany(
+                # With held messages, only pick up what the other partitions already have
+                timeout_ms=0 if held else settings.kafka_batch_max_wait_ms,
+                max_records=settings.kafka_batch_max_size,
+            )
+            if held and not records:
+                # Nothing else to do: dispatch the held messages as soon as a worker frees room
+                try:
+                    await asyncio.wait_for(pool.space_available.wait(), settings.kafka_batch_max_wait_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            for tp, messages in records.items():
+                record_lag(consumer, tp, messages[-1].offset)
+                for message in messages:
+                    tracker.track(tp, message.offset)
+                    try:
+                        event = decode_message(message)
+                    except Exception as e:
+                        await _dead_letter_undecodable(message, e)
+                        tracker.complete(tp, message.offset)
+                        continue
+
+                    if _absorb(event, tp, message.offset):
+                        continue
+
+                    item = (tp, message, event)
+                    if tp in held:
+                        held[tp].append(item)
+                    elif not pool.try_dispatch(event.get("user_id") or "", item):
+                        held[tp] = deque([item])
+                        consumer.pause(tp)
+                        logger.warning("⚠️ Worker queue full, pausing partition %s[%d]", tp.topic, tp.partition, extra=HOT_PATH)
+
+            offsets = tracker.committable_offsets()
+            if offsets:
+                await consumer.commit(offsets)
+
+        # Stopping: let the workers finish their queues so those offsets get committed
+        await pool.drain()
+    finally:
+        await pool.stop()
+
+
+async def _run_retry_consumer() -> None:
+    """Reprocess the messages of the retry topics, in a consumer group of their own."""
+    consumer = AIOKafkaConsumer(
+        bootstrap_servers=settings.kafka_bootstrap_servers,
+        group_id=f"{settings.kafka_group_id}.retry",
+        auto_offset_reset='earliest',
+        enable_auto_commit=False
+    )
+    consumer.subscribe(failure_router.retry_topics)
+    try:
+        await consumer.start()
+        logger.info(f"✅ Retry consumer started for topics: {failure_router.retry_topics}")
+        await _consume_retries(consumer)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Failed messages wait in their retry topic until the consumer is restarted
+        logger.error(f"❌ Error consuming retry topics: {e}", exc_info=True)
+    finally:
+        await consumer.stop()
+
+
+async def _consume_retries(consumer: AIOKafkaConsumer):
+    """
+    Every message of a retry topic waits the same delay, so the messages of a partition
+    become due in order. A partition whose next message is not due yet is rewound to it
+    and paused until it is; the other partitions and the main topic keep flowing.
+    """
+    due_at: dict[TopicPartition, float] = {}
+
+    def hold(tp: TopicPartition, offset: int, until: float) -> None:
+        consumer.seek(tp, offset)
+        consumer.pause(tp)
+        due_at[tp] = until
+
+    while not _should_stop:
+        now = time.time()
+        for tp, until in list(due_at.items()):
+            if until <= now:
+                del due_at[tp]
+                if tp in consumer.assignment():
+                    consumer.resume(tp)
+
+        wait = min([settings.kafka_batch_max_wait_ms / 1000, *(until - now for until in due_at.values())])
+        records = await consumer.getmany(timeout_ms=max(int(wait * 1000), 1), max_records=settings.kafka_batch_max_size)
+        for tp, messages in records.items():
+            for message in messages:
+                # The partition may have been revoked while the record was waiting
+                if tp not in consumer.assignment():
+                    break
+
+                until = failure_router.due_at(message)
+                if until > time.time():
+                    hold(tp, message.offset, until)
+                    break
+
+                try:
+                    event = decode_message(message)
+                    await notification_service.save_notification(event)
+                    MESSAGES_PROCESSED.inc()
+                except Exception as e:
+                    if is_transient(e):
+                        logger.error(
+                            f"❌ Could not retry message {tp.topic}[{tp.partition}]@{message.offset}, "
+                            f"trying again in {TRANSIENT_ERROR_BACKOFF_SECONDS}s: {e}"
+                        )
+                        hold(tp, message.offset, time.time() + TRANSIENT_ERROR_BACKOFF_SECONDS)
+                        break
+                    await failure_router.route(message, e)
+                await consumer.commit({tp: message.offset + 1})
@@ -0,0 +1,115 @@
+import asyncio
+import zlib
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from aiokafka import TopicPartition
+
+
+class OffsetTracker:
+    """
+    Tracks in-flight offsets per partition and computes what can be safely committed.
+
+    Messages finish out of order when they are processed concurrently, so a partition
+    can only be committed up to its lowest contiguous completed offset.
+    """
+
+    def __init__(self):
+        self._dispatched: dict[TopicPartition, deque[int]] = {}
+        self._completed: dict[TopicPartition, set[int]] = {}
+        self._committable: dict[TopicPartition, int] = {}
+
+    def track(self, tp: TopicPartition, offset: int) -> None:
+        self._dispatched.setdefault(tp, deque()).append(offset)
+        self._completed.setdefault(tp, set())
+
+    def complete(self, tp: TopicPartition, offset: int) -> None:
+        completed = self._completed.get(tp)
+        if completed is not None:
+            completed.add(offset)
+
+    def committable_offsets(self) -> dict[TopicPartition, int]:
+        """Return {partition: next offset to consume} for partitions that advanced since the last call."""
+        advanced = {}
+        for tp, dispatched in self._dispatched.items():
+            completed = self._completed[tp]
+            last_done = None
+            while dispatched and dispatched[0] in completed:
+                last_done = dispatched.popleft()
+                completed.discard(last_done)
+            if last_done is not None and self._committable.get(tp) != last_done + 1:
+                self._committable[tp] = advanced[tp] = last_done + 1
+        return advanced
+
+    def partitions(self) -> set[TopicPartition]:
+        return set(self._dispatched)
+
+    def in_flight(self) -> int:
+        return sum(len(dispatched) for dispatched in self._dispatched.values())
+
+    def forget(self, partitions) -> None:
+        """Drop the state of partitions that are no longer assigned to this consumer."""
+        for tp in partitions:
+            self._dispatched.pop(tp, None)
+            self._completed.pop(tp, None)
+            self._committable.pop(tp, None)
+
+
+class KeyedWorkerPool:
+    """
+    Runs N asyncio workers with one bounded queue each.
+
+    Items are sharded by key, so items sharing a key are handled in order by the same
+    worker while different keys are processed in parallel. A worker hands the handler every
+    item waiting in its queue at once (up to `max_batch`), so a backlog is written in bulk.
+    """
+
+    def __init__(self, workers: int, queue_size: int, handler: Callable[[list], Awaitable[None]], max_batch: int = 1):
+        self._queues: list[asyncio.Queue] = [asyncio.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._handler = handler
+        self.max_batch = max_batch
+        self._tasks: list[asyncio.Task] = []
+        self.error: Optional[BaseException] = None
+        # Set each time a worker takes items, freeing room in its queue
+        self.space_available = asyncio.Event()
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(queue)) for queue in self._queues]
+
+    async def drain(self) -> None:
+        """Wait until every queued item has been handled."""
+        await asyncio.gather(*(queue.join() for queue in self._queues))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _queue_for(self, key: str) -> asyncio.Queue:
+        return self._queues[zlib.crc32(key.encode("utf-8")) % len(self._queues)]
+
+    def try_dispatch(self, key: str, item: Any) -> bool:
+        """Queue the item on its key's worker; returns False when that worker's queue is full."""
+        try:
+            self._queue_for(key).put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            items = [await queue.get()]
+            while len(items) < self.max_batch and not queue.empty():
+                items.append(queue.get_nowait())
+            self.space_available.set()
+            try:
+                await self._handler(items)
+            except Exception as e:
+                # Surface the failure to the dispatcher, which stops consuming without
+                # committing the failed offsets
+                if self.error is None:
+                    self.error = e
+            finally:
+                for _ in items:
+                    queue.task_done()
@@ -0,0 +1,167 @@
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    GC_COLLECTOR,
+    PLATFORM_COLLECTOR,
+    PROCESS_COLLECTOR,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from starlette.responses import Response
+
+from notification_service.logging_setup import dropped_records
+
+
+# Service-owned registry (with the default process/GC collectors) rather than the global one
+REGISTRY = CollectorRegistry()
+for collector in (PROCESS_COLLECTOR, PLATFORM_COLLECTOR, GC_COLLECTOR):
+    REGISTRY.register(collector)
+
+# Records dropped by the logging queue when full (see log_async); errors are never dropped
+LOG_RECORDS_DROPPED = Gauge(
+    "log_records_dropped",
+    "Log records below ERROR dropped because the logging queue was full",
+    registry=REGISTRY,
+)
+LOG_RECORDS_DROPPED.set_function(dropped_records)
+
+# Latency buckets (seconds) from sub-millisecond Mongo lookups up to multi-second batches
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP handler latency",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+BATCH_PROCESSING_SECONDS = Histogram(
+    "consumer_batch_processing_seconds",
+    "Time to process a batch of consumed messages (a single message in single and concurrent mode)",
+    ["mode"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+MESSAGES_TOTAL = Counter(
+    "consumer_messages_total",
+    "Consumed messages by outcome",
+    ["outcome"],
+    registry=REGISTRY,
+)
+MESSAGES_PROCESSED = MESSAGES_TOTAL.labels("processed")
+MESSAGES_UNDECODABLE = MESSAGES_TOTAL.labels("decode_error")
+MESSAGES_RETRIED = MESSAGES_TOTAL.labels("retried")
+MESSAGES_DEAD_LETTERED = MESSAGES_TOTAL.labels("dead_lettered")
+
+MONGO_OPERATION_SECONDS = Histogram(
+    "mongo_operation_seconds",
+    "MongoDB operation latency",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+# Children bound once: labels() lookups stay out of the hot path
+MONGO_INSERT_SECONDS = MONGO_OPERATION_SECONDS.labels("insert")
+MONGO_FIND_SECONDS = MONGO_OPERATION_SECONDS.labels("find")
+MONGO_UPDATE_SECONDS = MONGO_OPERATION_SECONDS.labels("update")
+
+DUPLICATE_NOTIFICATIONS = Counter(
+    "notifications_duplicates_total",
+    "Notifications skipped because their event_id was already stored",
+    registry=REGISTRY,
+)
+
+RECENT_ID_FILTER_TOTAL = Counter(
+    "consumer_recent_id_filter_total",
+    "Recent event_id filter hits: duplicates dropped before writing, and Bloom false positives caught by verification",
+    ["result"],
+    registry=REGISTRY,
+)
+RECENT_ID_SKIPPED = RECENT_ID_FILTER_TOTAL.labels("skipped")
+RECENT_ID_FALSE_POSITIVES = RECENT_ID_FILTER_TOTAL.labels("false_positive")
+
+DIGEST_EVENTS = Counter(
+    "consumer_digest_events_total",
+    "Events absorbed into digest notifications by burst coalescing",
+    registry=REGISTRY,
+)
+
+DIGEST_FLUSHES = Counter(
+    "consumer_digest_flushes_total",
+    "Digest upserts written by burst coalescing",
+    registry=REGISTRY,
+)
+
+CONSUMER_LAG = Gauge(
+    "consumer_lag",
+    "Messages between the last consumed offset and the partition high watermark",
+    ["topic", "partition"],
+    registry=REGISTRY,
+)
+
+
+def record_lag(consumer, tp, last_offset: int) -> None:
+    """Update the lag of a partition from the consumer's cached high watermark (no broker call)."""
+    highwater = consumer.highwater(tp)
+    if highwater is not None:
+        CONSUMER_LAG.labels(tp.topic, str(tp.partition)).set(max(highwater - last_offset - 1, 0))
+
+
+def forget_lag(partitions) -> None:
+    for tp in partitions:
+        try:
+            CONSUMER_LAG.remove(tp.topic, str(tp.partition))
+        except KeyError:
+            pass
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the route template (e.g. /notifications/{user_id}) rather
+    than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status_code: int) -> None:
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+        async def send_wrapper(message):
+            # Time to the response start, so long-lived streams do not skew the histogram
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not observed:
+                observe(500)
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Literal, Optional
+
+
+class Subscription:
+    """An open stream of one user: a bounded queue fed by the hub."""
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.dropped = 0
+
+
+class NotificationHub:
+    """
+    In-process fan-out of freshly stored notifications to the users' open streams.
+
+    Publishing never blocks the consumer: when a subscriber's queue is full the
+    notification is dropped for that subscriber ("drop") or the subscriber is
+    disconnected ("disconnect") and expected to reconnect with Last-Event-ID.
+    """
+
+    def __init__(self, queue_size: int, slow_client_policy: Literal["drop", "disconnect"]):
+        self.queue_size = queue_size
+        self.slow_client_policy = slow_client_policy
+        self._subscriptions: dict[str, set[Subscription]] = {}
+
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id: str, notification: dict) -> None:
+        subscriptions = self._subscriptions.get(user_id)
+        if not subscriptions:
+            return
+
+        for subscription in list(subscriptions):
+            if subscription.closed:
+                continue
+            try:
+                subscription.queue.put_nowait(notification)
+                self.published += 1
+            except asyncio.QueueFull:
+                if self.slow_client_policy == "disconnect":
+                    self._disconnect(subscription)
+                else:
+                    subscription.dropped += 1
+                    self.dropped += 1
+
+    def _disconnect(self, subscription: Subscription) -> None:
+        subscription.closed = True
+        self.disconnected += 1
+        self.unsubscribe(subscription)
+        # Wake up the stream so it notices it was closed
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    async def next(self, subscription: Subscription, timeout: float) -> Optional[dict]:
+        """Wait for the next notification; returns None on timeout or when the subscription was closed."""
+        try:
+            return await asyncio.wait_for(subscription.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscriptions),
+            "subscriptions": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+        }
@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from notification_service.domain.models import Notification
+from notification_service.infrastructure.database import get_collection
+from notification_service.infrastructure.metrics import MONGO_FIND_SECONDS, MONGO_INSERT_SECONDS, MONGO_UPDATE_SECONDS
+from notification_service.services.pagination import after_cursor_filter, cursor_filter
+
+
+def check_fields(fields: Optional[List[str]]) -> None:
+    """Raise ValueError for fields that are not notification fields (sparse field sets)."""
+    unknown = set(fields or ()) - set(Notification.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+
+def digest_update(notifications: List[Notification], max_payloads: int) -> tuple[Notification, list, list]:
+    """The latest notification of a burst, its event_ids and the payloads kept in its digest."""
+    latest = max(notifications, key=lambda n: n.timestamp)
+    event_ids = [n.event_id for n in notifications]
+    payloads = [{"event_id": n.event_id, "payload": n.payload} for n in notifications][-max_payloads:]
+    return latest, event_ids, payloads
+
+
+class NotificationStore(ABC):
+    """
+    Persistence of notifications behind NotificationService. Implementations choose the
+    document layout; all of them keep event_id unique (a duplicate raises DuplicateKeyError,
+    or BulkWriteError with code 11000 for batches) and return notifications as plain dicts
+    without `_id`.
+    """
+
+    @abstractmethod
+    def collection(self):
+        ...
+
+    @abstractmethod
+    async def insert(self, notification: Notification) -> None:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, notifications: List[Notification]) -> None:
+        """Unordered insert; write errors are raised as BulkWriteError indexed like `notifications`."""
+
+    @abstractmethod
+    async def upsert_digest(self, digest_id: str, notifications: List[Notification], max_payloads: int) -> Optional[dict]:
+        """Merge a burst into its digest; returns the digest's `read` state before the update (None when created)."""
+
+    @abstractmethod
+    async def stored_event_ids(self, event_ids: List[str]) -> set[str]:
+        ...
+
+    @abstractmethod
+    def unread_counts_pipeline(self) -> list[dict]:
+        """Aggregation stages producing {_id: user_id, unread: count} from `collection()`."""
+
+    @abstractmethod
+    async def find_page(
+        self, user_id: str, limit: int, skip: int, cursor: Optional[str], fields: Optional[List[str]]
+    ) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def find_after(self, user_id: str, cursor: str, limit: int) -> List[dict]:
+        ...
+
+    @abstractmethod
+    async def mark_read(self, event_id: str, user_id: str, read_at: datetime) -> bool:
+        ...
+
+    @abstractmethod
+    async def mark_many_read(
+        self, user_id: str, event_ids: Optional[List[str]], before: Optional[datetime], read_at: datetime
+    ) -> int:
+        ...
+
+
+class DocumentStore(NotificationStore):
+    """One document per notification, indexed on event_id (unique) and (user_id, timestamp, event_id)."""
+
+    def collection(self):
+        """Get the collection, ensuring the database has been initialized."""
+        return get_collection()
+
+    async def insert(self, notification: Notification) -> None:
+        with MONGO_INSERT_SECONDS.time():
+            await self.collection().insert_one(notification.model_dump())
+
+    async def insert_many(self, notifications: List[Notification]) -> None:
+        with MONGO_INSERT_SECONDS.time():
+            await self.collection().insert_many([n.model_dump() for n in notifications], ordered=False)
+
+    async def upsert_digest(self, digest_id: str, notifications: List[Notification], max_payloads: int) -> Optional[dict]:
+        latest, event_ids, payloads = digest_update(notifications, max_payloads)
+
+        # Aggregation pipeline update: values from the events are wrapped in $literal so
+        # payload strings starting with "$" are not read as field paths
+        update = [
+            {"$set": {
+                "event_id": {"$literal": digest_id},
+                "event_type": {"$literal": latest.event_type},
+                "user_id": {"$literal": latest.user_id},
+                "digest": True,
+                "read": False,
+                "read_at": None,
+                "created_at": {"$ifNull": ["$created_at", {"$literal": datetime.utcnow()}]},
+                "timestamp": {"$max": ["$timestamp", {"$literal": latest.timestamp}]},
+                "payload": {"$literal": latest.payload},
+                "event_ids": {"$setUnion": [{"$ifNull": ["$event_ids", []]}, {"$literal": event_ids}]},
+                "payloads": {"$slice": [
+                    {"$concatArrays": [
+                        {"$ifNull": ["$payloads", []]},
+                        {"$filter": {
+                            "input": {"$literal": payloads},
+                            "cond": {"$not": {"$in": ["$$this.event_id", {"$ifNull": ["$event_ids", []]}]}},
+                        }},
+                    ]},
+                    -max_payloads,
+                ]},
+            }},
+            {"$set": {"count": {"$size": "$event_ids"}}},
+        ]
+
+        collection = self.collection()
+        try:
+            with MONGO_UPDATE_SECONDS.time():
+                return await collection.find_one_and_update(
+                    {"event_id": digest_id},
+                    update,
+                    projection={"_id": 0, "read": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE,
+                )
+        except DuplicateKeyError:
+            # Two upserts raced to create the digest: the second one updates it
+            with MONGO_UPDATE_SECONDS.time():
+                return await collection.find_one_and_update(
+                    {"event_id": digest_id}, update, projection={"_id": 0, "read": 1}, return_document=ReturnDocument.BEFORE
+                )
+
+    async def stored_event_ids(self, event_ids: List[str]) -> set[str]:
+        with MONGO_FIND_SECONDS.time():
+            stored = await self.collection().find({"event_id": {"$in": event_ids}}, {"_id": 0, "event_id": 1}).to_list(length=None)
+        return {document["event_id"] for document in stored}
+
+    def unread_counts_pipeline(self) -> list[dict]:
+        return [
+            {"$group": {
+                "_id": "$user_id",
+                "unread": {"$sum": {"$cond": [{"$eq": ["$read", False]}, 1, 0]}},
+            }},
+        ]
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]]) -> dict:
+        """Server-side projection: drops _id and, for sparse field sets, everything not requested."""
+        if not fields:
+            return {"_id": 0}
+        check_fields(fields)
+        # event_id and timestamp are always returned: they identify and paginate the notifications
+        return {"_id": 0, **{field: 1 for field in {*fields, "event_id", "timestamp"}}}
+
+    async def find_page(
+        self, user_id: str, limit: int, skip: int, cursor: Optional[str], fields: Optional[List[str]]
+    ) -> List[dict]:
+        find_cursor = (
+            self.collection().find({"user_id": user_id, **cursor_filter(cursor)}, self._projection(fields))
+            .sort([("timestamp", -1), ("event_id", -1)])
+            .skip(skip)
+            .limit(limit)
+        )
+        with MONGO_FIND_SECONDS.time():
+            return await find_cursor.to_list(length=limit)
+
+    async def find_after(self, user_id: str, cursor: str, limit: int) -> List[dict]:
+        find_cursor = (
+            self.collection().find({"user_id": user_id, **after_cursor_filter(cursor)}, self._projection(None))
+            .sort([("timestamp", 1), ("event_id", 1)])
+            .limit(limit)
+        )
+        with MONGO_FIND_SECONDS.time():
+            return await find_cursor.to_list(length=limit)
+
+    async def mark_read(self, event_id: str, user_id: str, read_at: datetime) -> bool:
+        with MONGO_UPDATE_SECONDS.time():
+            result = await self.collection().update_one(
+                {"event_id": event_id, "user_id": user_id, "read": False},
+                {"$set": {"read": True, "read_at": read_at}}
+            )
+        return result.modified_count > 0
+
+    async def mark_many_read(
+        self, user_id: str, event_ids: Optional[List[str]], before: Optional[datetime], read_at: datetime
+    ) -> int:
+        query: dict = {"user_id": user_id, "read": False}
+        if event_ids is not None:
+            query["event_id"] = {"$in": event_ids}
+        if before is not None:
+            query["timestamp"] = {"$lt": before}
+
+        with MONGO_UPDATE_SECONDS.time():
+            result = await self.collection().update_many(query, {"$set": {"read": True, "read_at": read_at}})
+        return result.modified_count
@@ -0,0 +1,131 @@
+import hashlib
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable
+
+
+class RecentIdFilter(ABC):
+    """
+    Memory-bounded set of event_ids recently stored by this consumer.
+
+    Checked before writing so replayed messages (rebalances, restarts) are dropped
+    without a Mongo round trip. It is only a shortcut: the unique index on event_id
+    stays the source of truth.
+    """
+
+    # Whether a hit must be confirmed in Mongo before the event is dropped
+    needs_verification = False
+
+    @abstractmethod
+    def might_contain(self, event_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add(self, event_ids: Iterable[str]) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class LruRecentIds(RecentIdFilter):
+    """Exact LRU set of the last `max_entries` event_ids: no false positives, so hits are dropped directly."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._ids: OrderedDict[str, None] = OrderedDict()
+
+    def might_contain(self, event_id: str) -> bool:
+        if event_id in self._ids:
+            self._ids.move_to_end(event_id)
+            return True
+        return False
+
+    def add(self, event_ids: Iterable[str]) -> None:
+        for event_id in event_ids:
+            self._ids[event_id] = None
+            self._ids.move_to_end(event_id)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"type": "lru", "entries": len(self._ids), "max_entries": self.max_entries}
+
+
+class _BloomGeneration:
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+        self.created_at = time.monotonic()
+
+    def positions(self, event_id: str) -> list[int]:
+        # Double hashing (Kirsch-Mitzenmacher) over one 128-bit digest
+        digest = hashlib.blake2b(event_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def contains(self, positions: list[int]) -> bool:
+        array = self.array
+        return all(array[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, positions: list[int]) -> None:
+        array = self.array
+        for p in positions:
+            array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter(RecentIdFilter):
+    """
+    Two-generation Bloom filter: ids go into the current generation, lookups check both.
+
+    The current generation becomes the previous one (and the old previous is dropped)
+    once it holds `capacity` ids or is older than `rotate_seconds`, so memory stays
+    fixed at two filters sized for `capacity` ids at `error_rate`.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, rotate_seconds: float, verify_hits: bool = True):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotate_seconds = rotate_seconds
+        self.needs_verification = verify_hits
+
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._current = _BloomGeneration(self.bits, self.hashes)
+        self._previous = _BloomGeneration(self.bits, self.hashes)
+        self.rotations = 0
+
+    def might_contain(self, event_id: str) -> bool:
+        positions = self._current.positions(event_id)
+        return self._current.contains(positions) or self._previous.contains(positions)
+
+    def add(self, event_ids: Iterable[str]) -> None:
+        for event_id in event_ids:
+            self._rotate_if_needed()
+            self._current.add(self._current.positions(event_id))
+
+    def _rotate_if_needed(self) -> None:
+        current = self._current
+        if current.count >= self.capacity or time.monotonic() - current.created_at >= self.rotate_seconds:
+            self._previous = current
+            self._current = _BloomGeneration(self.bits, self.hashes)
+            self.rotations += 1
+
+    def stats(self) -> dict:
+        return {
+            "type": "bloom",
+            "capacity": self.capacity,
+            "error_rate": self.error_rate,
+            "bytes": len(self._current.array) + len(self._previous.array),
+            "current_entries": self._current.count,
+            "previous_entries": self._previous.count,
+            "rotations": self.rotations,
+            "verify_hits": self.needs_verification,
+        }
@@ -0,0 +1,171 @@
+from datetime import datetime
+from typing import Optional
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.admin import AIOKafkaAdminClient
+from pymongo.errors import ConnectionFailure
+
+from notification_service.config import HOT_PATH, Logger, settings
+from notification_service.infrastructure.metrics import MESSAGES_DEAD_LETTERED, MESSAGES_RETRIED
+
+
+class LoggerRetryTopics(Logger):
+    def __init__(self):
+        super().__init__("notification_service.infrastructure.retry_topics")
+
+
+logger = LoggerRetryTopics().logger
+
+# Kafka record headers describing why a message left the main topic
+RETRY_ATTEMPT_HEADER = "retry-attempt"
+ERROR_CLASS_HEADER = "error-class"
+ERROR_MESSAGE_HEADER = "error-message"
+FAILED_AT_HEADER = "failed-at"
+ORIGINAL_TOPIC_HEADER = "original-topic"
+ORIGINAL_PARTITION_HEADER = "original-partition"
+ORIGINAL_OFFSET_HEADER = "original-offset"
+FAILURE_HEADERS = frozenset({
+    RETRY_ATTEMPT_HEADER,
+    ERROR_CLASS_HEADER,
+    ERROR_MESSAGE_HEADER,
+    FAILED_AT_HEADER,
+    ORIGINAL_TOPIC_HEADER,
+    ORIGINAL_PARTITION_HEADER,
+    ORIGINAL_OFFSET_HEADER,
+})
+
+# Failures caused by the message itself (undecodable, invalid event): retrying cannot fix them
+INVALID_MESSAGE_ERRORS = (ValueError, TypeError, KeyError)
+ERROR_MESSAGE_MAX_LENGTH = 1000
+
+
+def header_value(headers, key: str) -> Optional[str]:
+    for header, value in headers or ():
+        if header == key:
+            return value.decode("utf-8")
+    return None
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Failures of the infrastructure rather than of the message (MongoDB unreachable): every
+    message would fail the same way, so they stop the consumer instead of being routed.
+    """
+    return isinstance(error, ConnectionFailure)
+
+
+def strip_failure_headers(headers) -> list[tuple[str, bytes]]:
+    return [(key, value) for key, value in headers or () if key not in FAILURE_HEADERS]
+
+
+class FailureRouter:
+    """
+    Sends messages that could not be processed to a retry topic per delay
+    (`<topic>.retry.<n>`, reprocessed by the retry consumer once the delay has elapsed),
+    then to the dead letter topic once the retries are exhausted. Invalid messages go
+    straight to the dead letter topic.
+
+    The record is forwarded as is (value, key, headers) with the failure described in
+    extra headers, so the main consumer commits and moves on.
+    """
+
+    def __init__(self, topic: str, retry_delays: list[float], dead_letter_topic: str):
+        self.topic = topic
+        self.retry_delays = retry_delays
+        self.retry_topics = [f"{topic}.retry.{attempt}" for attempt in range(1, len(retry_delays) + 1)]
+        self.dead_letter_topic = dead_letter_topic
+        self._delays = dict(zip(self.retry_topics, retry_delays))
+        self._producer: Optional[AIOKafkaProducer] = None
+
+    @property
+    def topics(self) -> list[str]:
+        return [*self.retry_topics, self.dead_letter_topic]
+
+    async def check_topics(self) -> None:
+        """Raise if a retry or dead letter topic does not exist: they are never auto-created."""
+        admin = AIOKafkaAdminClient(bootstrap_servers=settings.kafka_bootstrap_servers)
+        await admin.start()
+        try:
+            existing = set(await admin.list_topics())
+        finally:
+            await admin.close()
+        missing = [topic for topic in self.topics if topic not in existing]
+        if missing:
+            raise RuntimeError(
+                f"Failure routing topics missing: {', '.join(missing)}. Create them "
+                f"(the kafka-init service of docker-compose does) or disable KAFKA_FAILURE_ROUTING_ENABLED"
+            )
+
+    async def start(self) -> None:
+        await self.check_topics()
+        self._producer = AIOKafkaProducer(
+            bootstrap_servers=settings.kafka_bootstrap_servers,
+            # The failed message is committed right after being forwarded
+            acks="all",
+        )
+        await self._producer.start()
+        logger.info(f"✅ Failure routing ready: retries {self.retry_topics}, dead letters {self.dead_letter_topic}")
+
+    async def stop(self) -> None:
+        if self._producer is not None:
+            await self._producer.stop()
+            self._producer = None
+
+    def due_at(self, message) -> float:
+        """Time (epoch seconds) at which a message of a retry topic may be reprocessed."""
+        return message.timestamp / 1000 + self._delays.get(message.topic, 0.0)
+
+    async def route(self, message, error: BaseException) -> str:
+        """Forward a failed message to its next retry topic or to the dead letter topic; returns that topic."""
+        attempt = int(header_value(message.headers, RETRY_ATTEMPT_HEADER) or 0) + 1
+        if isinstance(error, INVALID_MESSAGE_ERRORS) or attempt > len(self.retry_topics):
+            topic = self.dead_letter_topic
+        else:
+            topic = self.retry_topics[attempt - 1]
+
+        await self._producer.send_and_wait(
+            topic,
+            message.value,
+            key=message.key,
+            headers=self.failure_headers(message, error, attempt),
+        )
+        if topic == self.dead_letter_topic:
+            MESSAGES_DEAD_LETTERED.inc()
+            logger.error(
+                f"❌ Message {message.topic}[{message.partition}]@{message.offset} sent to {topic} "
+                f"after {attempt} attempts: {type(error).__name__}: {error}"
+            )
+        else:
+            MESSAGES_RETRIED.inc()
+            logger.warning(
+                "⚠️ Message %s[%d]@%d sent to %s: %s: %s",
+                message.topic, message.partition, message.offset, topic, type(error).__name__, error,
+                extra=HOT_PATH,
+            )
+        return topic
+
+    @staticmethod
+    def failure_headers(message, error: BaseException, attempt: int) -> list[tuple[str, bytes]]:
+        headers = strip_failure_headers(message.headers)
+        # The original position is kept across retries
+        original = [
+            (key, value) for key, value in message.headers or ()
+            if key in (ORIGINAL_TOPIC_HEADER, ORIGINAL_PARTITION_HEADER, ORIGINAL_OFFSET_HEADER)
+        ] or [
+            (ORIGINAL_TOPIC_HEADER, message.topic.encode("utf-8")),
+            (ORIGINAL_PARTITION_HEADER, str(message.partition).encode("utf-8")),
+            (ORIGINAL_OFFSET_HEADER, str(message.offset).encode("utf-8")),
+        ]
+        return headers + original + [
+            (RETRY_ATTEMPT_HEADER, str(attempt).encode("utf-8")),
+            (ERROR_CLASS_HEADER, type(error).__name__.encode("utf-8")),
+            (ERROR_MESSAGE_HEADER, str(error)[:ERROR_MESSAGE_MAX_LENGTH].encode("utf-8")),
+            (FAILED_AT_HEADER, datetime.utcnow().isoformat().encode("utf-8")),
+        ]
+
+
+failure_router = FailureRouter(
+    settings.kafka_topic,
+    retry_delays=settings.kafka_retry_delays_seconds,
+    dead_letter_topic=settings.kafka_dead_letter_topic or f"{settings.kafka_topic}.dlq",
+) if settings.kafka_failure_routing_enabled else None
@@ -0,0 +1,46 @@
+"""
+Archive notifications past their retention period, then delete them.
+
+Usage:
+    python -m notification_service.jobs.archive_notifications
+
+Expired notifications (see `retention_read_days` / `retention_unread_days`) are copied
+in batches to the archive collection or to gzip-compressed NDJSON files
+(`retention_archive_target`), then deleted, throttled to
+`retention_archive_docs_per_second`. Run it periodically with `retention_archive_enabled`
+so the TTL indexes only remove what the job missed.
+
+Only the document layout is archived: buckets (`storage_layout = "bucket"`) expire as a
+whole through their TTL index.
+"""
+import asyncio
+
+from notification_service.config import logger, settings
+from notification_service.infrastructure.database import init_database, close_database
+from notification_service.services.notification_service import notification_service
+from notification_service.services.retention import archive_expired, build_archive
+
+
+async def main():
+    if settings.storage_layout != "document":
+        logger.warning(f"⚠️ Archival only supports the document layout, not {settings.storage_layout}: nothing archived")
+        return
+
+    await init_database()
+    archive = build_archive()
+    try:
+        logger.info(f"📦 Archiving expired notifications to {settings.retention_archive_target}...")
+        archived = await archive_expired(
+            archive,
+            batch_size=settings.retention_archive_batch_size,
+            docs_per_second=settings.retention_archive_docs_per_second,
+            on_deleted=notification_service.after_delete,
+        )
+        logger.info(f"✅ {archived} notifications archived")
+    finally:
+        await archive.close()
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,199 @@
+"""
+Inspect the dead letter topic and re-drive its messages to the main topic.
+
+Usage:
+    python -m notification_service.jobs.dead_letters inspect [--limit N] [--all]
+    python -m notification_service.jobs.dead_letters redrive [--dry-run]
+
+`inspect` summarizes the messages not re-driven yet (every message with --all) by error
+class and event type, and lists the last N of them with their failure headers.
+
+`redrive` sends the messages not re-driven yet back to their original topic, without the
+failure headers so they get the full retry sequence again, and commits its progress in
+the `<kafka_group_id>.dead-letters` consumer group: running it again only picks up the
+messages dead-lettered since. Re-driven events already stored are skipped as duplicates.
+"""
+import argparse
+import asyncio
+from collections import Counter, deque
+
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
+
+from notification_service.config import logger, settings
+from notification_service.infrastructure.codec import codec_from_headers
+from notification_service.infrastructure.retry_topics import (
+    ERROR_CLASS_HEADER,
+    ERROR_MESSAGE_HEADER,
+    FAILED_AT_HEADER,
+    ORIGINAL_OFFSET_HEADER,
+    ORIGINAL_PARTITION_HEADER,
+    ORIGINAL_TOPIC_HEADER,
+    RETRY_ATTEMPT_HEADER,
+    failure_router,
+    header_value,
+    strip_failure_headers,
+)
+
+# Re-driven messages are committed (and their sends awaited) every N messages
+REDRIVE_CHUNK_SIZE = 500
+
+
+def dead_letter_topic() -> str:
+    return failure_router.dead_letter_topic if failure_router is not None else (
+        settings.kafka_dead_letter_topic or f"{settings.kafka_topic}.dlq"
+    )
+
+
+async def read_dead_letters(consumer: AIOKafkaConsumer, from_beginning: bool):
+    """Yield the dead letters up to the end of the topic as it was when called, from the committed offsets."""
+    topic = dead_letter_topic()
+    # Refreshes the metadata so that the topic partitions are known
+    await consumer.topics()
+    partitions = [TopicPartition(topic, partition) for partition in sorted(consumer.partitions_for_topic(topic) or ())]
+    if not partitions:
+        logger.warning(f"⚠️ Topic {topic} does not exist, nothing was dead-lettered yet")
+        return
+
+    consumer.assign(partitions)
+    end_offsets = await consumer.end_offsets(partitions)
+    for tp in partitions:
+        committed = None if from_beginning else await consumer.committed(tp)
+        if committed is None:
+            await consumer.seek_to_beginning(tp)
+        else:
+            consumer.seek(tp, committed)
+
+    remaining = {tp for tp in partitions if await consumer.position(tp) < end_offsets[tp]}
+    while remaining:
+        records = await consumer.getmany(*remaining, timeout_ms=1000)
+        for tp, messages in records.items():
+            for message in messages:
+                if message.offset < end_offsets[tp]:
+                    yield tp, message
+        for tp in list(remaining):
+            if await consumer.position(tp) >= end_offsets[tp]:
+                remaining.discard(tp)
+
+
+def describe(message) -> dict:
+    try:
+        event = codec_from_headers(message.headers, settings.kafka_default_codec).decode(message.value)
+    except Exception:
+        event = {}
+    headers = message.headers
+    return {
+        "position": f"{message.topic}[{message.partition}]@{message.offset}",
+        "original": (
+            f"{header_value(headers, ORIGINAL_TOPIC_HEADER)}[{header_value(headers, ORIGINAL_PARTITION_HEADER)}]"
+            f"@{header_value(headers, ORIGINAL_OFFSET_HEADER)}"
+        ),
+        "event_id": event.get("event_id"),
+        "event_type": event.get("event_type"),
+        "attempts": header_value(headers, RETRY_ATTEMPT_HEADER),
+        "failed_at": header_value(headers, FAILED_AT_HEADER),
+        "error_class": header_value(headers, ERROR_CLASS_HEADER),
+        "error": header_value(headers, ERROR_MESSAGE_HEADER),
+    }
+
+
+def dead_letter_consumer() -> AIOKafkaConsumer:
+    # Partitions are assigned manually: the group only stores the re-drive progress
+    return AIOKafkaConsumer(
+        bootstrap_servers=settings.kafka_bootstrap_servers,
+        group_id=f"{settings.kafka_group_id}.dead-letters",
+        enable_auto_commit=False,
+    )
+
+
+async def inspect(limit: int, from_beginning: bool) -> None:
+    consumer = dead_letter_consumer()
+    await consumer.start()
+    try:
+        total = 0
+        by_error = Counter()
+        by_event_type = Counter()
+        last = deque(maxlen=limit)
+        async for _, message in read_dead_letters(consumer, from_beginning):
+            details = describe(message)
+            total += 1
+            by_error[details["error_class"]] += 1
+            by_event_type[details["event_type"]] += 1
+            last.append(details)
+    finally:
+        await consumer.stop()
+
+    print(f"{total} dead letters in {dead_letter_topic()}" + ("" if from_beginning else " not re-driven yet"))
+    for title, counts in (("By error class", by_error), ("By event type", by_event_type)):
+        if counts:
+            print(f"\n{title}:")
+            for name, count in counts.most_common():
+                print(f"  {count:>8}  {name}")
+    if last:
+        print(f"\nLast {len(last)}:")
+        for details in last:
+            print(
+                f"  {details['position']} (from {details['original']}, {details['attempts']} attempts, "
+                f"failed at {details['failed_at']}) {details['event_type']} {details['event_id']}: "
+                f"{details['error_class']}: {details['error']}"
+            )
+
+
+async def redrive(dry_run: bool) -> None:
+    consumer = dead_letter_consumer()
+    producer = AIOKafkaProducer(bootstrap_servers=settings.kafka_bootstrap_servers, acks="all")
+    await consumer.start()
+    await producer.start()
+    redriven = 0
+    try:
+        sends = []
+        positions: dict[TopicPartition, int] = {}
+
+        async def checkpoint():
+            await asyncio.gather(*sends)
+            sends.clear()
+            if positions and not dry_run:
+                await consumer.commit(dict(positions))
+
+        async for tp, message in read_dead_letters(consumer, from_beginning=False):
+            if not dry_run:
+                topic = header_value(message.headers, ORIGINAL_TOPIC_HEADER) or settings.kafka_topic
+                sends.append(await producer.send(
+                    topic,
+                    message.value,
+                    key=message.key,
+                    headers=strip_failure_headers(message.headers),
+                ))
+            positions[tp] = message.offset + 1
+            redriven += 1
+            if redriven % REDRIVE_CHUNK_SIZE == 0:
+                await checkpoint()
+                logger.info(f"📦 {redriven} dead letters re-driven so far")
+        await checkpoint()
+    finally:
+        await producer.stop()
+        await consumer.stop()
+
+    if dry_run:
+        logger.info(f"✅ {redriven} dead letters would be re-driven (dry run)")
+    else:
+        logger.info(f"✅ {redriven} dead letters re-driven")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and re-drive the dead letter topic")
+    commands = parser.add_subparsers(dest="command", required=True)
+    inspect_parser = commands.add_parser("inspect", help="Summarize the dead letters")
+    inspect_parser.add_argument("--limit", type=int, default=20, help="Number of dead letters listed")
+    inspect_parser.add_argument("--all", action="store_true", help="Include the dead letters already re-driven")
+    redrive_parser = commands.add_parser("redrive", help="Send the dead letters back to their original topic")
+    redrive_parser.add_argument("--dry-run", action="store_true", help="Count the dead letters without sending them")
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        asyncio.run(inspect(args.limit, args.all))
+    else:
+        asyncio.run(redrive(args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Copy the notifications of the document layout into buckets (see `storage_layout`).
+
+Usage:
+    python -m notification_service.jobs.migrate_to_buckets [--dry-run]
+
+The notifications collection is read in (user_id, timestamp, event_id) order and packed
+into full buckets with the configured window and caps, inserted in batches throttled to
+`bucket_migration_docs_per_second` notifications per second. The source collection is
+left untouched: drop it once the service runs with `storage_layout = "bucket"`.
+
+Run it while the consumer is stopped, then restart it with the bucket layout. A rerun
+after a crash is safe: buckets whose notifications were already copied are rejected by
+the unique index on their event_ids and skipped.
+"""
+import argparse
+import asyncio
+import time
+
+from pymongo.errors import BulkWriteError
+
+from notification_service.config import logger, settings
+from notification_service.infrastructure.bucket_store import BucketPacker, BucketStore
+from notification_service.infrastructure.database import (
+    close_database,
+    ensure_bucket_indexes,
+    get_buckets_collection,
+    get_collection,
+    init_database,
+)
+
+# Buckets inserted per round trip
+INSERT_BATCH_SIZE = 100
+
+
+async def insert_buckets(buckets: list[dict]) -> int:
+    """Insert buckets, skipping those already migrated; returns the number inserted."""
+    try:
+        await get_buckets_collection().insert_many(buckets, ordered=False)
+        return len(buckets)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return len(buckets) - len(errors)
+
+
+async def storage_size(collection) -> str:
+    stats = await collection.database.command("collStats", collection.name)
+    return (
+        f"{stats.get('count', 0)} documents, {stats.get('size', 0) / 1e6:.1f} MB of data, "
+        f"{stats.get('totalIndexSize', 0) / 1e6:.1f} MB of indexes"
+    )
+
+
+async def migrate(dry_run: bool) -> None:
+    packer = BucketPacker(BucketStore(
+        window_seconds=settings.storage_bucket_window_seconds,
+        max_notifications=settings.storage_bucket_max_notifications,
+        max_bytes=settings.storage_bucket_max_bytes,
+    ))
+    buckets: list[dict] = []
+    notifications = 0
+    inserted = 0
+    started = time.monotonic()
+
+    async def flush():
+        nonlocal inserted
+        if buckets and not dry_run:
+            inserted += await insert_buckets(buckets)
+        buckets.clear()
+        # Throttle: stay under the configured notifications per second
+        ahead = notifications / settings.bucket_migration_docs_per_second - (time.monotonic() - started)
+        if ahead > 0:
+            await asyncio.sleep(ahead)
+
+    source = get_collection().find({}, {"_id": 0}).sort([("user_id", 1), ("timestamp", 1), ("event_id", 1)])
+    async for document in source:
+        notifications += 1
+        completed = packer.add(document)
+        if completed is not None:
+            buckets.append(completed)
+            if len(buckets) >= INSERT_BATCH_SIZE:
+                await flush()
+                logger.info(f"📦 {notifications} notifications migrated so far")
+    last = packer.flush()
+    if last is not None:
+        buckets.append(last)
+    await flush()
+
+    if dry_run:
+        logger.info(f"✅ {notifications} notifications would be migrated (dry run)")
+        return
+
+    logger.info(f"✅ {notifications} notifications migrated into {inserted} new buckets")
+    copied = 0
+    async for bucket in get_buckets_collection().aggregate([{"$group": {"_id": None, "n": {"$sum": "$count"}}}]):
+        copied = bucket["n"]
+    if copied < notifications:
+        logger.warning(f"⚠️ The buckets hold {copied} notifications, {notifications} were read")
+    logger.info(f"📦 Documents: {await storage_size(get_collection())}")
+    logger.info(f"📦 Buckets: {await storage_size(get_buckets_collection())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy the notifications into the bucket layout")
+    parser.add_argument("--dry-run", action="store_true", help="Read and pack the notifications without writing them")
+    args = parser.parse_args()
+
+    async def run():
+        await init_database()
+        try:
+            await ensure_bucket_indexes()
+            await migrate(args.dry_run)
+        finally:
+            await close_database()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
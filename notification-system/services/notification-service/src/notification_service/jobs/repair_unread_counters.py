@@ -0,0 +1,27 @@
+"""
+Rebuild the per-user unread counters from the notifications collection.
+
+Usage:
+    python -m notification_service.jobs.repair_unread_counters
+
+Counters updated by the live service while the job runs may be overwritten with the
+value computed by the aggregation; run it during low traffic.
+"""
+import asyncio
+
+from notification_service.config import logger
+from notification_service.infrastructure.database import init_database, close_database
+from notification_service.services.notification_service import notification_service
+
+
+async def main():
+    await init_database()
+    try:
+        logger.info("🔧 Recomputing unread counters...")
+        await notification_service.recompute_unread_counters()
+    finally:
+        await close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
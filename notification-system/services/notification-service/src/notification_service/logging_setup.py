@@ -0,0 +1,134 @@
+"""
+Root log handler of the service, installed once by `configure_logging`.
+
+With `log_async` records go through a bounded queue to a background thread that formats
+and writes them, so the event loop never blocks on stdout. Hot-path messages (logged with
+`extra=HOT_PATH`) are sampled and rate limited per message template.
+"""
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+# Pass as `extra=HOT_PATH` on messages logged for every event: they are sampled and rate limited,
+# and should use %-style arguments so that dropped records are never formatted
+HOT_PATH = {"hot_path": True}
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class HotPathFilter(logging.Filter):
+    """
+    Samples hot-path records (keeps `sample_rate` of them), then keeps at most
+    `max_per_second` per message template. Records at ERROR and above always pass.
+    """
+
+    # Bound on tracked templates, in case a hot-path message is not a constant
+    MAX_TEMPLATES = 1000
+
+    def __init__(self, sample_rate: float, max_per_second: Optional[float]):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_per_second = max_per_second
+        # message template -> [records seen, window start, records kept in the window]
+        self._templates: dict[str, list] = {}
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or not getattr(record, "hot_path", False):
+            return True
+
+        state = self._templates.get(record.msg)
+        if state is None:
+            if len(self._templates) >= self.MAX_TEMPLATES:
+                self._templates.clear()
+            state = self._templates[record.msg] = [0, time.monotonic(), 0]
+        state[0] += 1
+
+        # Deterministic sampling: keep a record each time the kept share crosses an integer
+        if int(state[0] * self.sample_rate) == int((state[0] - 1) * self.sample_rate):
+            self.suppressed += 1
+            return False
+
+        if self.max_per_second is not None:
+            now = time.monotonic()
+            if now - state[1] >= 1.0:
+                state[1], state[2] = now, 0
+            if state[2] >= self.max_per_second:
+                self.suppressed += 1
+                return False
+            state[2] += 1
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the logging thread untouched: formatting, including the lazy %-style
+    arguments, happens on that thread. When the queue is full, records below ERROR are
+    dropped and counted, while errors are written synchronously by `fallback` (the handler
+    behind the queue): they are never lost.
+    """
+
+    def __init__(self, log_queue: queue.Queue, fallback: logging.Handler):
+        super().__init__(log_queue)
+        self.fallback = fallback
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.ERROR:
+                self.fallback.handle(record)
+            else:
+                self.dropped += 1
+
+
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the logging queue was full (never errors)."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def configure_logging(
+    level: str,
+    log_async: bool,
+    queue_size: int,
+    hot_path_sample_rate: float,
+    hot_path_max_per_second: Optional[float],
+    skip_record_context: bool = False,
+) -> None:
+    """Install the root handler, once (like logging.basicConfig, nothing happens if the root logger already has one)."""
+    global _queue_handler
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    root.setLevel(level.upper())
+    if skip_record_context:
+        # LOG_FORMAT uses none of the caller, thread or process fields. Process-wide: this
+        # also applies to the records of uvicorn and of the libraries
+        logging._srcfile = None
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler = stream_handler
+    if log_async:
+        handler = _queue_handler = NonBlockingQueueHandler(queue.Queue(queue_size), fallback=stream_handler)
+        listener = QueueListener(handler.queue, stream_handler)
+        listener.start()
+        # Write out what is still queued when the process exits
+        atexit.register(listener.stop)
+
+    handler.addFilter(HotPathFilter(hot_path_sample_rate, hot_path_max_per_second))
+    root.addHandler(handler)
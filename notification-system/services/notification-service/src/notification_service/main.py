@@ -7,17 +7,22 @@ from notification_service.config import settings, logger
 from notification_service.infrastructure.kafka_consumer import start_consumer, stop_consumer
 from notification_service.infrastructure.database import init_database, close_database
 from notification_service.api.routes import router as api_router
+from notification_service.infrastructure.metrics import PrometheusMiddleware, metrics_response
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting notification-service...")
     await init_database()
-    await start_consumer()
+    if settings.consumer_enabled:
+        await start_consumer()
+    else:
+        logger.info("⚠️ Kafka consumer disabled in this process (CONSUMER_ENABLED=false)")
     yield
 
     logger.info("Stopping notification-service...")
-    await stop_consumer()
+    if settings.consumer_enabled:
+        await stop_consumer()
     await close_database()
     logger.info("🔴 Notification-service stopped")
 
@@ -29,6 +34,7 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+app.add_middleware(PrometheusMiddleware)
 app.include_router(api_router)
 
 
@@ -40,6 +46,11 @@ async def health_check():
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+
 @app.get("/")
 def root():
     return JSONResponse(
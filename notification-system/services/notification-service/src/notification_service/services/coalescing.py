@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Awaitable, Callable, List, Optional
+
+from aiokafka import TopicPartition
+
+from notification_service.config import Logger, settings
+from notification_service.domain.models import Notification
+from notification_service.infrastructure.metrics import DIGEST_EVENTS, DIGEST_FLUSHES
+from notification_service.services.notification_service import NotificationService, notification_service
+
+
+class LoggerCoalescing(Logger):
+    def __init__(self):
+        super().__init__("notification_service.services.coalescing")
+
+
+logger = LoggerCoalescing().logger
+
+
+class _Window:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.notifications: List[Notification] = []
+        self.positions: list[tuple[TopicPartition, int]] = []
+
+
+class DigestCoalescer:
+    """
+    Buffers bursts of configured event types per (user, event type, time bucket) and
+    writes each burst as one digest upsert instead of one insert per event.
+
+    The bucket comes from the event timestamp, so a redelivered event lands in the same
+    digest. The offsets of absorbed events stay pending until their digest is written:
+    consumers hold commits back at `earliest_pending(tp)` and are called back through
+    `on_flushed` once a digest is written, so a crash before the flush only causes a
+    redelivery.
+    """
+
+    def __init__(
+        self,
+        service: NotificationService,
+        event_types: List[str],
+        window_seconds: float,
+        max_events: int,
+        max_payloads: int,
+    ):
+        self.service = service
+        self.event_types = set(event_types)
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+        self.max_payloads = max_payloads
+        self.on_flushed: Optional[Callable[[list[tuple[TopicPartition, int]]], Awaitable[None]]] = None
+
+        self._windows: dict[str, _Window] = {}
+        # Offsets of absorbed events not yet written, per partition in consumption order
+        self._pending: dict[TopicPartition, OrderedDict[int, None]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+
+    def digest_id(self, notification: Notification) -> str:
+        timestamp = notification.timestamp
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        bucket = int(timestamp.timestamp() // self.window_seconds)
+        return f"digest:{notification.event_type}:{notification.user_id}:{bucket}"
+
+    def absorb(self, event: dict, tp: TopicPartition, offset: int) -> bool:
+        """Take the event into its digest window; returns False when it must be stored normally."""
+        if event.get("event_type") not in self.event_types:
+            return False
+        try:
+            notification = self.service.build_notification(event)
+        except ValueError:
+            # Invalid event (ValidationError or bad timestamp): the normal path routes it
+            return False
+
+        window = self._windows.setdefault(self.digest_id(notification), _Window())
+        window.notifications.append(notification)
+        window.positions.append((tp, offset))
+        self._pending.setdefault(tp, OrderedDict())[offset] = None
+        DIGEST_EVENTS.inc()
+        return True
+
+    def earliest_pending(self, tp: TopicPartition) -> Optional[int]:
+        pending = self._pending.get(tp)
+        return next(iter(pending)) if pending else None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(offsets) for offsets in self._pending.values())
+
+    async def flush(self, force: bool = False) -> None:
+        """Write the windows that are old enough (or full, or all of them when forced)."""
+        async with self._lock:
+            now = time.monotonic()
+            due = [
+                digest_id for digest_id, window in self._windows.items()
+                if force or now - window.started >= self.window_seconds or len(window.notifications) >= self.max_events
+            ]
+            for digest_id in due:
+                # Detach the window first: events absorbed meanwhile open a new one
+                window = self._windows.pop(digest_id)
+                await self.service.save_digest(digest_id, window.notifications, self.max_payloads)
+                for tp, offset in window.positions:
+                    pending = self._pending.get(tp)
+                    if pending is not None:
+                        pending.pop(offset, None)
+                DIGEST_FLUSHES.inc()
+                if self.on_flushed is not None:
+                    await self.on_flushed(window.positions)
+
+    def start(self) -> None:
+        self.error = None
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write every open window."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush(force=True)
+
+    async def _run(self) -> None:
+        interval = min(self.window_seconds, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                # Surface the failure to the consumer loop, which stops without committing
+                logger.error(f"❌ Error writing digests: {e}", exc_info=True)
+                self.error = e
+                return
+
+
+digest_coalescer = DigestCoalescer(
+    notification_service,
+    event_types=settings.coalesce_event_types,
+    window_seconds=settings.coalesce_window_seconds,
+    max_events=settings.coalesce_max_events,
+    max_payloads=settings.coalesce_max_payloads,
+) if settings.coalesce_event_types else None
@@ -1,79 +1,369 @@
 from datetime import datetime
-from typing import List, Optional
-from pymongo.errors import DuplicateKeyError
+from typing import Callable, Iterable, List, Optional
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from notification_service.domain.models import Notification
-from notification_service.infrastructure.database import get_collection
-from notification_service.config import Logger
+from notification_service.infrastructure.bucket_store import BucketStore
+from notification_service.infrastructure.cache import InMemoryNotificationCache, NotificationCache
+from notification_service.infrastructure.codec import HEADER_SCHEMA_VERSION_KEY
+from notification_service.infrastructure.database import get_counters_collection
+from notification_service.infrastructure.metrics import (
+    DUPLICATE_NOTIFICATIONS,
+    MONGO_FIND_SECONDS,
+    MONGO_UPDATE_SECONDS,
+    RECENT_ID_FALSE_POSITIVES,
+    RECENT_ID_SKIPPED,
+)
+from notification_service.infrastructure.notification_hub import NotificationHub
+from notification_service.infrastructure.notification_store import DocumentStore, NotificationStore, check_fields
+from notification_service.infrastructure.recent_ids import LruRecentIds, RecentIdFilter, RotatingBloomFilter
+from notification_service.services.pagination import decode_cursor, encode_cursor
+from notification_service.config import HOT_PATH, Logger, settings
+
+
+# Payload schema versions whose events are built without a second validation
+TRUSTED_SCHEMA_VERSIONS = frozenset(settings.kafka_trusted_schema_versions)
 
 
 class NotificationService:
-    def __init__(self, logger_instance: Logger):
+    def __init__(
+        self,
+        logger_instance: Logger,
+        store: Optional[NotificationStore] = None,
+        cache: Optional[NotificationCache] = None,
+        hub: Optional[NotificationHub] = None,
+        recent_ids: Optional[RecentIdFilter] = None,
+    ):
         self.logger = logger_instance.logger
+        self.store = store if store is not None else DocumentStore()
+        self.cache = cache
+        self.hub = hub
+        self.recent_ids = recent_ids
 
-    def _get_collection(self):
-        """Get the collection, ensuring the database has been initialized."""
-        return get_collection()
+    def _get_counters_collection(self):
+        """Get the per-user counters collection, ensuring the database has been initialized."""
+        return get_counters_collection()
 
-    async def save_notification(self, event: dict) -> Optional[Notification]:
+    @staticmethod
+    def build_notification(event: dict) -> Notification:
+        """Notification of a decoded event (see infrastructure.kafka_consumer.decode_message), not yet stored."""
         timestamp = event.get("timestamp")
         if isinstance(timestamp, str):
             timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
 
+        schema_version = event.get("schema_version")
+        # Only the header's version was checked by the producer: a version found in the message
+        # body alone is stored but its payload is validated
+        trusted = (
+            event.get(HEADER_SCHEMA_VERSION_KEY) in TRUSTED_SCHEMA_VERSIONS
+            and isinstance(event.get("payload"), dict)
+        )
         notification = Notification(
             event_id=event.get("event_id"),
             event_type=event.get("event_type"),
             user_id=event.get("user_id"),
             timestamp=timestamp,
-            payload=event.get("payload", {}),
+            payload={} if trusted else event.get("payload", {}),
+            schema_version=schema_version,
             read=False,
             created_at=datetime.utcnow()
         )
+        if trusted:
+            # Fast path: the producer validated the payload against its schema, attach it as
+            # is instead of walking it again (that cost grows with the payload size)
+            notification.payload = event["payload"]
+        return notification
+
+    async def save_notification(self, event: dict) -> Optional[Notification]:
+        notification = self.build_notification(event)
+        if not await self._drop_recent([notification]):
+            self.logger.warning("⚠️ Notification already exists: %s (recent id filter)", notification.event_id, extra=HOT_PATH)
+            return None
 
         try:
-            collection = self._get_collection()
-            result = await collection.insert_one(notification.model_dump())
-            self.logger.info(f"✅ Notification saved successfully: {notification.event_id}: {notification.event_type}")
+            await self.store.insert(notification)
+            self.logger.info("✅ Notification saved successfully: %s: %s", notification.event_id, notification.event_type, extra=HOT_PATH)
+            await self._after_insert([notification])
             return notification
         except DuplicateKeyError:
             # Idempotency: If the notification already exists, it will not be saved again
-            self.logger.warning(f"⚠️ Notification already exists: {event.get('event_id')}")
+            DUPLICATE_NOTIFICATIONS.inc()
+            self._remember([notification])
+            self.logger.warning("⚠️ Notification already exists: %s", event.get("event_id"), extra=HOT_PATH)
             return None
 
-    async def get_user_notifications(self, user_id: str, limit: int = 50, skip: int = 0) -> List[dict]:
-        collection = self._get_collection()
-        cursor = collection.find({"user_id": user_id}).sort("timestamp", -1).skip(skip).limit(limit)
+    async def save_notifications(
+        self,
+        events: List[dict],
+        on_invalid: Optional[Callable[[int, ValidationError], None]] = None,
+    ) -> List[Notification]:
+        """
+        Persist a batch of events with a single unordered insert_many.
+
+        Duplicate event_ids are skipped per document (idempotency), so the rest of the
+        batch is still written. Any other write error is raised so the caller does not
+        commit the batch offsets. Invalid events are skipped and reported to `on_invalid`
+        with their index. Returns the notifications actually inserted.
+        """
+        notifications = []
+        for index, event in enumerate(events):
+            try:
+                notifications.append(self.build_notification(event))
+            except ValidationError as e:
+                self.logger.error(f"❌ Invalid event skipped: {event.get('event_id')}: {e}")
+                if on_invalid is not None:
+                    on_invalid(index, e)
+
+        received = len(notifications)
+        notifications = await self._drop_recent(notifications)
+        if len(notifications) < received:
+            self.logger.warning(
+                "⚠️ %d notifications already exist and were skipped (recent id filter)",
+                received - len(notifications),
+                extra=HOT_PATH,
+            )
+        if not notifications:
+            return []
+
+        try:
+            await self.store.insert_many(notifications)
+            self.logger.info("✅ %d notifications saved successfully", len(notifications), extra=HOT_PATH)
+            await self._after_insert(notifications)
+            return notifications
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            failed = {error["index"] for error in write_errors}
+            duplicated = {error["index"] for error in write_errors if error.get("code") == 11000}
+
+            # The insert is unordered: every document without a write error was stored
+            inserted = [n for index, n in enumerate(notifications) if index not in failed]
+            self.logger.info("✅ %d notifications saved successfully", len(inserted), extra=HOT_PATH)
+            if duplicated:
+                DUPLICATE_NOTIFICATIONS.inc(len(duplicated))
+                self._remember(notifications[index] for index in duplicated)
+                self.logger.warning("⚠️ %d notifications already exist and were skipped", len(duplicated), extra=HOT_PATH)
+            await self._after_insert(inserted)
+
+            if len(duplicated) < len(failed):
+                self.logger.error(f"❌ Error saving notifications batch: {write_errors}")
+                raise
+            return inserted
+
+    async def save_digest(self, digest_id: str, notifications: List[Notification], max_payloads: int) -> None:
+        """
+        Merge a burst of same-type notifications of one user into their digest (a single
+        upsert with the document layout).
+
+        The digest keeps the set of absorbed event_ids, so `count` stays exact when
+        events are redelivered, and the last `max_payloads` payloads. New events make the
+        digest unread again.
+        """
+        before = await self.store.upsert_digest(digest_id, notifications, max_payloads)
+        latest = max(notifications, key=lambda n: n.timestamp)
+
+        self.logger.info("✅ Digest %s absorbed %d notifications", digest_id, len(notifications), extra=HOT_PATH)
+        self._remember(notifications)
+        await self._invalidate_users(notifications)
+        # A new digest, or a digest that had been read, is one more unread notification
+        if before is None or before.get("read"):
+            await self._increment_unread({latest.user_id: 1})
+        if self.hub is not None:
+            self.hub.publish(latest.user_id, {
+                **latest.model_dump(),
+                "event_id": digest_id,
+                "digest": True,
+                "absorbed": len(notifications),
+            })
+
+    async def _drop_recent(self, notifications: List[Notification]) -> List[Notification]:
+        """
+        Drop notifications whose event_id the recent id filter has already seen stored.
+
+        Filters with false positives (Bloom) are confirmed against Mongo with a single
+        `$in` lookup unless configured to trust the filter.
+        """
+        if self.recent_ids is None:
+            return notifications
+        hits = {n.event_id for n in notifications if self.recent_ids.might_contain(n.event_id)}
+        if not hits:
+            return notifications
+
+        if self.recent_ids.needs_verification:
+            verified = await self.store.stored_event_ids(list(hits))
+            RECENT_ID_FALSE_POSITIVES.inc(len(hits) - len(verified))
+            hits = verified
+
+        RECENT_ID_SKIPPED.inc(len(hits))
+        return [n for n in notifications if n.event_id not in hits]
 
+    def _remember(self, notifications: Iterable[Notification]) -> None:
+        if self.recent_ids is not None:
+            self.recent_ids.add(n.event_id for n in notifications)
+
+    async def _after_insert(self, notifications: List[Notification]) -> None:
+        """Bring the read side up to date with new notifications: cache, unread counters and open streams."""
+        self._remember(notifications)
+        await self._invalidate_users(notifications)
+        await self._increment_unread(self._count_by_user(notifications))
+        if self.hub is not None:
+            for notification in notifications:
+                self.hub.publish(notification.user_id, notification.model_dump())
+
+    async def after_delete(self, documents: List[dict]) -> None:
+        """Bring the read side up to date with deleted notifications (retention): cache and unread counters."""
+        unread: dict[str, int] = {}
+        for document in documents:
+            if not document.get("read"):
+                unread[document["user_id"]] = unread.get(document["user_id"], 0) - 1
+        await self._increment_unread(unread)
+        if self.cache is not None:
+            for user_id in {document["user_id"] for document in documents}:
+                await self.cache.invalidate_user(user_id)
+
+    @staticmethod
+    def _count_by_user(notifications: List[Notification]) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for notification in notifications:
+            counts[notification.user_id] = counts.get(notification.user_id, 0) + 1
+        return counts
+
+    async def _increment_unread(self, counts: dict[str, int]) -> None:
+        """
+        Apply unread counter deltas per user in one round trip.
+
+        Counter failures are logged but not raised: the notifications are already stored
+        and `recompute_unread_counters` repairs any drift.
+        """
+        if not counts:
+            return
         try:
-            notifications = await cursor.to_list(length=limit)
+            counters = self._get_counters_collection()
+            with MONGO_UPDATE_SECONDS.time():
+                await counters.bulk_write(
+                    [UpdateOne({"_id": user_id}, {"$inc": {"unread": delta}}, upsert=True) for user_id, delta in counts.items()],
+                    ordered=False,
+                )
+        except Exception as e:
+            self.logger.error(f"❌ Error updating unread counters: {e}", exc_info=True)
+
+    async def get_unread_count(self, user_id: str) -> int:
+        counters = self._get_counters_collection()
+        with MONGO_FIND_SECONDS.time():
+            counter = await counters.find_one({"_id": user_id})
+        if counter is None:
+            return 0
+        return max(counter.get("unread", 0), 0)
 
-            # Convert the MongoDB documents to dictionaries and remove the _id field
-            for notif in notifications:
-                notif.pop("_id", None)
+    async def recompute_unread_counters(self) -> None:
+        """Rebuild every user's unread counter from the notifications collection (server-side aggregation)."""
+        pipeline = [
+            *self.store.unread_counts_pipeline(),
+            {"$merge": {
+                "into": self._get_counters_collection().name,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert",
+            }},
+        ]
+        await self.store.collection().aggregate(pipeline).to_list(length=None)
+        self.logger.info("✅ Unread counters recomputed")
+
+    async def _invalidate_users(self, notifications: List[Notification]) -> None:
+        if self.cache is None:
+            return
+        for user_id in {n.user_id for n in notifications}:
+            await self.cache.invalidate_user(user_id)
+
+    async def get_user_notifications(
+        self,
+        user_id: str,
+        limit: int = 50,
+        skip: int = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        """
+        Return a page of the user's notifications, newest first.
+
+        With a `cursor` (see `next_cursor`) the page starts right after the cursor position
+        using an index seek, and `skip` is ignored.
+        `fields` restricts the returned fields (sparse field set).
+        Raises ValueError for an invalid cursor or unknown fields.
+        """
+        check_fields(fields)
+        if cursor is not None:
+            decode_cursor(cursor)
+            skip = 0
+
+        page = (limit, skip, cursor, tuple(sorted(fields)) if fields else None)
+        version = 0
+        if self.cache is not None:
+            cached = await self.cache.get(user_id, page)
+            if cached is not None:
+                return cached
+            version = await self.cache.version(user_id)
+
+        try:
+            notifications = await self.store.find_page(user_id, limit, skip, cursor, fields)
 
+            if self.cache is not None:
+                await self.cache.set(user_id, page, notifications, version)
             return notifications
         except Exception as e:
             self.logger.error(f"❌ Error getting user notifications: {e}", exc_info=True)
             return []
 
+    async def get_notifications_after(self, user_id: str, cursor: str, limit: int) -> List[dict]:
+        """Notifications newer than the cursor, oldest first (stream resume with Last-Event-ID)."""
+        return await self.store.find_after(user_id, cursor, limit)
+
+    @staticmethod
+    def next_cursor(notifications: List[dict], limit: int) -> Optional[str]:
+        """Cursor for the page following `notifications`, or None when there are no more pages."""
+        if len(notifications) < limit:
+            return None
+        return encode_cursor(notifications[-1])
+
     async def mark_as_read(self, event_id: str, user_id: str) -> bool:
         try:
-            collection = self._get_collection()
-            result = await collection.update_one(
-                {"event_id": event_id, "user_id": user_id},
-                {"$set": {"read": True}}
-            )
-            if result.modified_count > 0:
-                self.logger.info(f"✅ Notification marked as read: {event_id}")
+            read_at = datetime.utcnow()
+            if await self.store.mark_read(event_id, user_id, read_at):
+                self.logger.info("✅ Notification marked as read: %s", event_id, extra=HOT_PATH)
+                if self.cache is not None:
+                    await self.cache.mark_read(user_id, event_id, read_at)
+                await self._increment_unread({user_id: -1})
                 return True
             else:
-                self.logger.warning(f"⚠️ Notification not found: {event_id}")
+                self.logger.warning("⚠️ Notification not found: %s", event_id, extra=HOT_PATH)
                 return False
         except Exception as e:
             self.logger.error(f"❌ Error marking notification as read: {e}", exc_info=True)
             return False
 
 
+    async def mark_many_as_read(
+        self, user_id: str, event_ids: Optional[List[str]] = None, before: Optional[datetime] = None
+    ) -> int:
+        """
+        Mark the user's unread notifications as read with a single write (update_many, or a
+        bulk write of one update per bucket with the bucket layout).
+
+        Filters combine: `event_ids` restricts to those notifications and `before` to
+        notifications older than that timestamp; with neither, everything is marked.
+        Returns the number of notifications modified.
+        """
+        modified = await self.store.mark_many_read(user_id, event_ids, before, datetime.utcnow())
+
+        if modified > 0:
+            self.logger.info("✅ %d notifications marked as read for user: %s", modified, user_id, extra=HOT_PATH)
+            if self.cache is not None:
+                await self.cache.invalidate_user(user_id)
+            await self._increment_unread({user_id: -modified})
+        return modified
+
+
 class LoggerNotificationService(Logger):
     def __init__(self):
         super().__init__("notification_service.services.notification_service")
@@ -81,5 +371,38 @@ class LoggerNotificationService(Logger):
 
 logger_instance = LoggerNotificationService()
 
-notification_service = NotificationService(logger_instance)
+# The cache is invalidated by the inserts of this process: with the consumer in another
+# process it would serve stale pages until the TTL, so reads go to MongoDB
+notification_cache = InMemoryNotificationCache(
+    max_entries=settings.cache_max_entries,
+    max_bytes=settings.cache_max_bytes,
+    ttl_seconds=settings.cache_ttl_seconds,
+) if settings.cache_enabled and settings.consumer_enabled else None
+
+notification_hub = NotificationHub(
+    queue_size=settings.sse_queue_size,
+    slow_client_policy=settings.sse_slow_client_policy,
+)
+
+if settings.dedup_filter == "lru":
+    recent_ids: Optional[RecentIdFilter] = LruRecentIds(max_entries=settings.dedup_max_entries)
+elif settings.dedup_filter == "bloom":
+    recent_ids = RotatingBloomFilter(
+        capacity=settings.dedup_max_entries,
+        error_rate=settings.dedup_bloom_error_rate,
+        rotate_seconds=settings.dedup_bloom_rotate_seconds,
+        verify_hits=settings.dedup_false_positive_policy == "verify",
+    )
+else:
+    recent_ids = None
+
+notification_store: NotificationStore = BucketStore(
+    window_seconds=settings.storage_bucket_window_seconds,
+    max_notifications=settings.storage_bucket_max_notifications,
+    max_bytes=settings.storage_bucket_max_bytes,
+) if settings.storage_layout == "bucket" else DocumentStore()
+
+notification_service = NotificationService(
+    logger_instance, store=notification_store, cache=notification_cache, hub=notification_hub, recent_ids=recent_ids
+)
 
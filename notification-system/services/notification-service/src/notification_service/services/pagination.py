@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+
+def encode_cursor(notification: dict) -> str:
+    """Build an opaque cursor pointing right after `notification` in (timestamp, event_id) order."""
+    timestamp = notification["timestamp"]
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    raw = json.dumps({"t": timestamp, "e": notification["event_id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """Return the (timestamp, event_id) encoded in the cursor. Raises ValueError for invalid cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["t"]), str(data["e"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def cursor_filter(cursor: Optional[str]) -> dict:
+    """Mongo filter selecting the notifications after the cursor in (timestamp desc, event_id desc) order."""
+    if cursor is None:
+        return {}
+    timestamp, event_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "event_id": {"$lt": event_id}},
+        ]
+    }
+
+
+def after_cursor_filter(cursor: str) -> dict:
+    """Mongo filter selecting the notifications newer than the cursor, in (timestamp asc, event_id asc) order."""
+    timestamp, event_id = decode_cursor(cursor)
+    return {
+        "$or": [
+            {"timestamp": {"$gt": timestamp}},
+            {"timestamp": timestamp, "event_id": {"$gt": event_id}},
+        ]
+    }
@@ -0,0 +1,144 @@
+import asyncio
+import gzip
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import orjson
+from pymongo import ReplaceOne
+
+from notification_service.config import Logger, settings
+from notification_service.infrastructure.database import get_archive_collection, get_collection
+
+
+class LoggerRetention(Logger):
+    def __init__(self):
+        super().__init__("notification_service.services.retention")
+
+
+logger = LoggerRetention().logger
+
+
+def expired_filter(now: datetime, read_days: Optional[int], unread_days: Optional[int]) -> Optional[dict]:
+    """Query matching notifications past their retention period (None when nothing expires)."""
+    clauses = []
+    if read_days:
+        read_cutoff = now - timedelta(days=read_days)
+        clauses.append({"read": True, "read_at": {"$lt": read_cutoff}})
+        # Read before read_at existed: fall back to the creation date
+        clauses.append({"read": True, "read_at": None, "created_at": {"$lt": read_cutoff}})
+    if unread_days:
+        clauses.append({"read": False, "created_at": {"$lt": now - timedelta(days=unread_days)}})
+    if not clauses:
+        return None
+    return {"$or": clauses}
+
+
+class Archive(ABC):
+    """Destination of archived notifications."""
+
+    @abstractmethod
+    async def write(self, documents: List[dict]) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class CollectionArchive(Archive):
+    """Copies notifications into the archive collection (upserted on _id, so a rerun after a crash is safe)."""
+
+    async def write(self, documents: List[dict]) -> None:
+        await get_archive_collection().bulk_write(
+            [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+            ordered=False,
+        )
+
+
+class NdjsonArchive(Archive):
+    """Appends notifications as gzip-compressed NDJSON, one file per run."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"notifications-{datetime.utcnow():%Y%m%dT%H%M%S}.ndjson.gz")
+        self._file = gzip.open(self.path, "ab")
+
+    async def write(self, documents: List[dict]) -> None:
+        lines = b"".join(orjson.dumps(document, default=str, option=orjson.OPT_NAIVE_UTC) + b"\n" for document in documents)
+        await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: bytes) -> None:
+        self._file.write(lines)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._file.close)
+
+
+def build_archive() -> Archive:
+    if settings.retention_archive_target == "ndjson":
+        return NdjsonArchive(settings.retention_archive_directory)
+    return CollectionArchive()
+
+
+async def archive_expired(
+    archive: Archive,
+    batch_size: int,
+    docs_per_second: float,
+    now: Optional[datetime] = None,
+    on_deleted=None,
+) -> int:
+    """
+    Move expired notifications to `archive` in batches: each batch is written to the
+    archive first and only then deleted, so a crash never loses a document.
+
+    Each batch is deleted with one delete_many, filtered on the expired query again: a
+    notification changed since it was read (e.g. marked as read, or a digest that became
+    unread) is deleted only if still expired (its archived copy is replaced on its next
+    expiry). When some are kept, the ids still present are read back, and `on_deleted` is
+    awaited with the documents actually deleted (user_id and read), so the unread counters
+    follow the actual state.
+
+    Throttled to `docs_per_second` to leave Mongo to live ingestion.
+    Returns the number of notifications archived.
+    """
+    query = expired_filter(now or datetime.utcnow(), settings.retention_read_days, settings.retention_unread_days)
+    if query is None:
+        logger.warning("⚠️ No retention period configured, nothing to archive")
+        return 0
+
+    collection = get_collection()
+    archived = 0
+    while True:
+        started = time.perf_counter()
+        # No sort: each branch of the $or is served by the retention_archive index, and the
+        # batch is deleted before the next one is read
+        documents = await collection.find(query).limit(batch_size).to_list(length=batch_size)
+        if not documents:
+            break
+
+        await archive.write(documents)
+        ids = [document["_id"] for document in documents]
+        result = await collection.delete_many({"_id": {"$in": ids}, **query})
+        if result.deleted_count < len(documents):
+            still_present = await collection.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(length=len(ids))
+            kept = {document["_id"] for document in still_present}
+            documents = [document for document in documents if document["_id"] not in kept]
+        deleted = [
+            {"_id": document["_id"], "user_id": document["user_id"], "read": document["read"]}
+            for document in documents
+        ]
+        if on_deleted is not None:
+            await on_deleted(deleted)
+
+        archived += len(deleted)
+        logger.info(f"📦 Archived {archived} notifications so far")
+
+        remaining = len(ids) / docs_per_second - (time.perf_counter() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    return archived
@@ -0,0 +1,126 @@
+"""
+Standalone Kafka consumer, decoupled from the HTTP API.
+
+Usage:
+    python -m notification_service.worker [--processes N]
+
+Starts N processes (default `consumer_processes`), each running the consumer as a member
+of `kafka_group_id`, so Kafka spreads the partitions across them. Run the API next to it
+with CONSUMER_ENABLED=false to scale ingestion and reads independently.
+
+SIGTERM / SIGINT stop the processes gracefully: each one finishes the messages in hand,
+writes its open digests and commits its offsets before leaving the group. A process that
+exits unexpectedly is restarted after `consumer_restart_delay_seconds`.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import time
+
+from prometheus_client import start_http_server
+
+from notification_service.config import Logger, settings
+from notification_service.infrastructure.database import init_database, close_database
+from notification_service.infrastructure.kafka_consumer import start_consumer, stop_consumer
+from notification_service.infrastructure.metrics import REGISTRY
+
+
+class LoggerWorker(Logger):
+    def __init__(self):
+        super().__init__("notification_service.worker")
+
+
+logger = LoggerWorker().logger
+
+
+async def run_consumer(index: int) -> bool:
+    """Consume until SIGTERM / SIGINT; returns False when the consumer stopped on its own."""
+    loop = asyncio.get_running_loop()
+    stop_requested = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop_requested.set)
+
+    if settings.consumer_metrics_port is not None:
+        start_http_server(settings.consumer_metrics_port + index, registry=REGISTRY)
+
+    await init_database()
+    try:
+        consumer_task = await start_consumer()
+        stop_task = asyncio.create_task(stop_requested.wait())
+        await asyncio.wait({consumer_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+
+        requested = stop_requested.is_set()
+        await stop_consumer()
+        return requested
+    finally:
+        await close_database()
+
+
+def _process_main(index: int) -> None:
+    if not asyncio.run(run_consumer(index)):
+        # Could not connect or failed while consuming: let the supervisor restart us
+        raise SystemExit(1)
+
+
+def supervise(processes: int) -> None:
+    """Run `processes` consumer processes, restarting the ones that exit, until SIGTERM / SIGINT."""
+    context = multiprocessing.get_context("spawn")
+    running: dict[int, multiprocessing.Process] = {}
+    restart_at: dict[int, float] = {}
+    stopping = False
+
+    def start(index: int) -> None:
+        process = context.Process(target=_process_main, args=(index,), name=f"notification-consumer-{index}")
+        process.start()
+        running[index] = process
+        logger.info(f"✅ Consumer process {index} started (pid {process.pid})")
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"🛑 Stopping {len(running)} consumer processes...")
+        restart_at.clear()
+        for process in running.values():
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    for index in range(processes):
+        start(index)
+
+    while running or restart_at:
+        time.sleep(0.5)
+        for index, process in list(running.items()):
+            if process.is_alive():
+                continue
+            del running[index]
+            if not stopping:
+                logger.warning(
+                    f"⚠️ Consumer process {index} exited with code {process.exitcode}, "
+                    f"restarting in {settings.consumer_restart_delay_seconds}s"
+                )
+                restart_at[index] = time.monotonic() + settings.consumer_restart_delay_seconds
+
+        for index, at in list(restart_at.items()):
+            if time.monotonic() >= at:
+                del restart_at[index]
+                start(index)
+
+    logger.info("🔴 All consumer processes stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the notification consumer outside the API")
+    parser.add_argument("--processes", type=int, default=settings.consumer_processes, help="Number of consumer processes")
+    args = parser.parse_args()
+    supervise(max(1, args.processes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from fakes import FakeCollection, matches
+from notification_service.domain.models import Notification
+from notification_service.infrastructure import database
+from notification_service.infrastructure.bucket_store import BucketPacker, BucketStore, to_element
+from notification_service.services.pagination import encode_cursor
+
+NOW = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    collection = FakeCollection("notification_buckets", unique_key=None)
+    monkeypatch.setattr(database, "_buckets_collection", collection)
+    return collection
+
+
+def make_store() -> BucketStore:
+    return BucketStore(window_seconds=60, max_notifications=4, max_bytes=16 * 1024)
+
+
+def notification(index: int, seconds: int, user_id: str = "user-1") -> Notification:
+    return Notification(
+        event_id=f"evt-{index:04d}",
+        event_type="notification.created",
+        user_id=user_id,
+        timestamp=NOW + timedelta(seconds=seconds),
+        payload={"index": index},
+    )
+
+
+def history(count: int) -> list[Notification]:
+    rng = random.Random(0)
+    # Several notifications share a timestamp, so the event_id tie-break matters
+    return [notification(index, rng.randrange(600)) for index in range(count)]
+
+
+def newest_first(notifications: list[Notification]) -> list[str]:
+    return [n.event_id for n in sorted(notifications, key=lambda n: (n.timestamp, n.event_id), reverse=True)]
+
+
+def test_cursor_pages_follow_the_notification_order(buckets):
+    store = make_store()
+    notifications = history(60)
+
+    async def run():
+        for n in notifications:
+            await store.insert(n)
+        pages, cursor = [], None
+        while True:
+            page = await store.find_page("user-1", limit=7, skip=0, cursor=cursor, fields=None)
+            if not page:
+                return pages
+            pages.append(page)
+            cursor = encode_cursor(page[-1])
+
+    pages = asyncio.run(run())
+    assert all(bucket["count"] <= 4 for bucket in buckets.documents)
+    assert [n["event_id"] for page in pages for n in page] == newest_first(notifications)
+    assert all(len(page) == 7 for page in pages[:-1])
+    assert {n["user_id"] for page in pages for n in page} == {"user-1"}
+
+
+def test_skip_pages_and_resume_after_a_cursor(buckets):
+    store = make_store()
+    notifications = history(30)
+    expected = newest_first(notifications)
+    packer = BucketPacker(store)
+    packed = [bucket for bucket in map(packer.add, sorted(
+        (n.model_dump() for n in notifications), key=lambda d: (d["timestamp"], d["event_id"])
+    )) if bucket is not None]
+    buckets.load([*packed, packer.flush()])
+
+    async def run():
+        page = await store.find_page("user-1", limit=5, skip=10, cursor=None, fields=["event_type"])
+        resumed = await store.find_after("user-1", encode_cursor(to_element(notifications[0].model_dump())), limit=100)
+        return page, resumed
+
+    page, resumed = asyncio.run(run())
+    assert [n["event_id"] for n in page] == expected[10:15]
+    assert set(page[0]) == {"event_id", "timestamp", "event_type"}
+    # Oldest first, strictly after the cursor
+    position = expected.index(notifications[0].event_id)
+    assert [n["event_id"] for n in resumed] == list(reversed(expected[:position]))
+
+
+def test_a_notification_is_never_pushed_twice_into_a_bucket(buckets):
+    store = make_store()
+    first = notification(1, 0)
+
+    async def run():
+        await store.insert(first)
+        await store.insert(notification(2, 1))
+        # Redelivered: the bucket holding it must not match
+        query, _ = store._push("user-1", to_element(first.model_dump()))
+        assert not matches(buckets.documents[0], query)
+        await store.insert(first)
+
+    asyncio.run(run())
+    [bucket, *others] = buckets.documents
+    assert [n["event_id"] for n in bucket["notifications"]] == ["evt-0001", "evt-0002"]
+    assert bucket["count"] == 2
+    # The upsert creates another bucket instead, which the unique index on
+    # notifications.event_id rejects in MongoDB
+    assert [b["notifications"][0]["event_id"] for b in others] == ["evt-0001"]
+
+
+def test_full_buckets_continue_in_a_new_one(buckets):
+    store = make_store()
+
+    async def run():
+        for index in range(10):
+            await store.insert(notification(index, index))
+
+    asyncio.run(run())
+    assert [bucket["count"] for bucket in buckets.documents] == [4, 4, 2]
+    assert len({bucket["window"] for bucket in buckets.documents}) == 1
+    assert buckets.documents[0]["oldest"] == NOW and buckets.documents[0]["newest"] == NOW + timedelta(seconds=3)
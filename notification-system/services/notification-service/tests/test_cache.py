@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+
+from notification_service.infrastructure.cache import InMemoryNotificationCache
+
+
+def make_cache(max_entries: int = 100) -> InMemoryNotificationCache:
+    return InMemoryNotificationCache(max_entries=max_entries, max_bytes=1 << 20, ttl_seconds=60)
+
+
+def test_a_page_read_before_a_write_is_not_cached():
+    cache = make_cache()
+
+    async def run():
+        version = await cache.version("user-1")
+        await cache.invalidate_user("user-1")
+        await cache.set("user-1", 0, [{"event_id": "evt-1"}], version)
+        return await cache.get("user-1", 0)
+
+    assert asyncio.run(run()) is None
+
+
+def test_pruned_versions_still_reject_older_pages():
+    cache = make_cache(max_entries=2)
+
+    async def run():
+        version = await cache.version("user-1")
+        # The write to user-1, then enough other writes to prune its version
+        for user_id in ("user-1", "user-2", "user-3", "user-4"):
+            await cache.invalidate_user(user_id)
+        await cache.set("user-1", 0, [{"event_id": "evt-1"}], version)
+        stale = await cache.get("user-1", 0)
+
+        version = await cache.version("user-1")
+        await cache.set("user-1", 0, [{"event_id": "evt-1"}], version)
+        return stale, await cache.get("user-1", 0)
+
+    stale, fresh = asyncio.run(run())
+    assert stale is None
+    assert fresh == [{"event_id": "evt-1"}]
+
+
+def test_mark_read_patches_cached_pages_and_rejects_concurrent_reads():
+    cache = make_cache()
+    read_at = datetime(2026, 1, 1)
+
+    async def run():
+        await cache.set("user-1", 0, [{"event_id": "evt-1", "read": False, "read_at": None}], await cache.version("user-1"))
+        in_flight = await cache.version("user-1")
+        await cache.mark_read("user-1", "evt-1", read_at)
+        await cache.set("user-1", 1, [{"event_id": "evt-1", "read": False, "read_at": None}], in_flight)
+        return await cache.get("user-1", 0), await cache.get("user-1", 1)
+
+    patched, stale = asyncio.run(run())
+    assert patched == [{"event_id": "evt-1", "read": True, "read_at": read_at}]
+    assert stale is None
+
+
+def test_mark_read_only_patches_the_fields_of_the_page():
+    cache = make_cache()
+    read_at = datetime(2026, 1, 1)
+    pages = [[{"event_id": "evt-1", "read": False}], [{"event_id": "evt-1", "read_at": None}], [{"event_id": "evt-1"}]]
+
+    async def run():
+        for page, notifications in enumerate(pages):
+            await cache.set("user-1", page, notifications, await cache.version("user-1"))
+        await cache.mark_read("user-1", "evt-1", read_at)
+        return [await cache.get("user-1", page) for page in range(len(pages))]
+
+    assert asyncio.run(run()) == [
+        [{"event_id": "evt-1", "read": True}],
+        [{"event_id": "evt-1", "read_at": read_at}],
+        [{"event_id": "evt-1"}],
+    ]
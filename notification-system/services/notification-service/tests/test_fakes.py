@@ -0,0 +1,64 @@
+"""The in-memory MongoDB of benchmarks/fakes.py, which the other tests run against, behaves like MongoDB."""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from fakes import FakeCollection, matches
+
+
+def test_array_paths_match_like_mongodb():
+    bucket = {"user_id": "u1", "notifications": [{"event_id": "a", "read": False}, {"event_id": "b", "read": True}]}
+
+    assert matches(bucket, {"notifications.event_id": "a"})
+    assert not matches(bucket, {"notifications.event_id": "c"})
+    assert matches(bucket, {"notifications.event_id": {"$in": ["c", "b"]}})
+    # $ne on an array: none of its values may be equal
+    assert not matches(bucket, {"notifications.event_id": {"$ne": "a"}})
+    assert matches(bucket, {"notifications.event_id": {"$ne": "c"}})
+    assert matches({"notifications": []}, {"notifications.event_id": {"$ne": "a"}})
+
+
+def test_keyset_walk_returns_what_a_scan_returns():
+    now = datetime(2026, 1, 1)
+    rng = random.Random(0)
+    collection = FakeCollection("notifications")
+    collection.load([
+        {"event_id": f"evt-{index:04d}", "user_id": "u1", "timestamp": now - timedelta(seconds=rng.randrange(50))}
+        for index in range(200)
+    ])
+    ordered = sorted(collection.documents, key=lambda d: (d["timestamp"], d["event_id"]), reverse=True)
+    last = ordered[49]
+    keyset = {"$or": [
+        {"timestamp": {"$lt": last["timestamp"]}},
+        {"timestamp": last["timestamp"], "event_id": {"$lt": last["event_id"]}},
+    ]}
+
+    async def page():
+        # Served by the sorted per-user index
+        return await (
+            collection.find({"user_id": "u1", **keyset}).sort([("timestamp", -1), ("event_id", -1)]).limit(50).to_list()
+        )
+
+    assert [d["event_id"] for d in asyncio.run(page())] == [d["event_id"] for d in ordered[50:100]]
+
+
+def test_update_operators_of_bucket_upserts():
+    collection = FakeCollection("notification_buckets", unique_key=None)
+
+    def update(timestamp: int) -> dict:
+        return {
+            "$push": {"notifications": {"timestamp": timestamp}},
+            "$inc": {"count": 1},
+            "$min": {"oldest": timestamp},
+            "$max": {"newest": timestamp},
+        }
+
+    async def run():
+        await collection.update_one({"user_id": "u1"}, update(5), upsert=True)
+        await collection.update_one({"user_id": "u1"}, update(3), upsert=True)
+        await collection.update_one({"user_id": "u1"}, update(9), upsert=True)
+
+    asyncio.run(run())
+    [bucket] = collection.documents
+    assert (bucket["count"], bucket["oldest"], bucket["newest"]) == (3, 3, 9)
+    assert [n["timestamp"] for n in bucket["notifications"]] == [5, 3, 9]
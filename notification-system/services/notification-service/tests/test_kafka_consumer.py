@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from fakes import FakeBroker, FakeKafkaConsumer
+from notification_service.config import settings
+from notification_service.infrastructure import kafka_consumer
+
+
+class FlakyNotificationService:
+    """Stores events by event_id, failing the first `failures` writes as if MongoDB were down."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.stored: dict[str, dict] = {}
+
+    def _write(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("mongodb unreachable")
+        for event in events:
+            self.stored.setdefault(event["event_id"], event)
+
+    async def save_notification(self, event):
+        self._write([event])
+
+    async def save_notifications(self, events, on_invalid=None):
+        self._write(events)
+
+
+@pytest.mark.parametrize("mode", ["single", "batch", "concurrent"])
+def test_a_transient_failure_rewinds_and_keeps_consuming(monkeypatch, mode):
+    broker = FakeBroker(partitions=2)
+    for index in range(20):
+        event = {"event_id": f"evt-{index}", "user_id": f"user-{index % 3}", "event_type": "notification.created"}
+        broker.append(settings.kafka_topic, json.dumps(event).encode(), event["user_id"].encode(), None, [])
+    service = FlakyNotificationService(failures=3)
+    monkeypatch.setattr(settings, "kafka_consumer_mode", mode)
+    monkeypatch.setattr(settings, "kafka_batch_max_wait_ms", 10)
+    monkeypatch.setattr(kafka_consumer, "notification_service", service)
+    monkeypatch.setattr(kafka_consumer, "failure_router", None)
+    monkeypatch.setattr(kafka_consumer, "digest_coalescer", None)
+    monkeypatch.setattr(kafka_consumer, "TRANSIENT_ERROR_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(kafka_consumer, "AIOKafkaConsumer", lambda **kwargs: FakeKafkaConsumer(broker, settings.kafka_topic))
+    monkeypatch.setattr(kafka_consumer, "_should_stop", False)
+
+    async def run():
+        task = asyncio.create_task(kafka_consumer.consume_events())
+        for _ in range(500):
+            if broker.committed_records(settings.kafka_topic) == 20 or task.done():
+                break
+            await asyncio.sleep(0.01)
+        stopped_early = task.done()
+        kafka_consumer._should_stop = True
+        await asyncio.wait_for(task, timeout=5)
+        return stopped_early
+
+    assert not asyncio.run(run())
+    assert service.failures == 0
+    assert sorted(service.stored) == sorted(f"evt-{index}" for index in range(20))
+    assert broker.committed_records(settings.kafka_topic) == 20
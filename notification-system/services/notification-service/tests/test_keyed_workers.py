@@ -0,0 +1,135 @@
+import asyncio
+
+from aiokafka import TopicPartition
+
+from notification_service.infrastructure.keyed_workers import KeyedWorkerPool, OffsetTracker
+
+TP = TopicPartition("notifications", 0)
+OTHER_TP = TopicPartition("notifications", 1)
+
+
+def test_commits_stop_at_the_lowest_unfinished_offset():
+    tracker = OffsetTracker()
+    for offset in range(5):
+        tracker.track(TP, offset)
+
+    tracker.complete(TP, 1)
+    tracker.complete(TP, 2)
+    assert tracker.committable_offsets() == {}
+
+    tracker.complete(TP, 0)
+    assert tracker.committable_offsets() == {TP: 3}
+    assert tracker.in_flight() == 2
+
+    tracker.complete(TP, 4)
+    assert tracker.committable_offsets() == {}
+    tracker.complete(TP, 3)
+    assert tracker.committable_offsets() == {TP: 5}
+    assert tracker.in_flight() == 0
+
+
+def test_only_partitions_that_advanced_are_returned():
+    tracker = OffsetTracker()
+    tracker.track(TP, 10)
+    tracker.track(OTHER_TP, 20)
+    tracker.complete(TP, 10)
+
+    assert tracker.committable_offsets() == {TP: 11}
+    assert tracker.committable_offsets() == {}
+
+    tracker.complete(OTHER_TP, 20)
+    assert tracker.committable_offsets() == {OTHER_TP: 21}
+
+
+def test_revoked_partitions_are_forgotten():
+    tracker = OffsetTracker()
+    tracker.track(TP, 0)
+    tracker.track(OTHER_TP, 0)
+    tracker.forget([TP])
+
+    # A late completion of a revoked partition must not be committed
+    tracker.complete(TP, 0)
+    tracker.complete(OTHER_TP, 0)
+    assert tracker.committable_offsets() == {OTHER_TP: 1}
+    assert tracker.partitions() == {OTHER_TP}
+
+
+def test_items_of_a_key_are_handled_in_order_and_committed_in_offset_order():
+    handled: dict[str, list[int]] = {}
+    tracker = OffsetTracker()
+
+    async def handler(items):
+        for key, offset in items:
+            # Later offsets of other keys finish first
+            await asyncio.sleep(0.001 * (offset % 3))
+            handled.setdefault(key, []).append(offset)
+            tracker.complete(TP, offset)
+
+    async def run():
+        pool = KeyedWorkerPool(workers=4, queue_size=100, handler=handler)
+        pool.start()
+        for offset in range(60):
+            key = f"user-{offset % 7}"
+            tracker.track(TP, offset)
+            assert pool.try_dispatch(key, (key, offset))
+        await pool.drain()
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert pool.error is None
+    for key, offsets in handled.items():
+        assert offsets == sorted(offsets), key
+    assert tracker.committable_offsets() == {TP: 60}
+
+
+def test_a_failed_item_is_never_committed():
+    tracker = OffsetTracker()
+
+    async def handler(items):
+        [offset] = items
+        if offset == 2:
+            raise ValueError("invalid event")
+        tracker.complete(TP, offset)
+
+    async def run():
+        pool = KeyedWorkerPool(workers=2, queue_size=10, handler=handler)
+        pool.start()
+        for offset in range(5):
+            tracker.track(TP, offset)
+            pool.try_dispatch(f"user-{offset}", offset)
+        await pool.drain()
+        await pool.stop()
+        return pool
+
+    pool = asyncio.run(run())
+    assert isinstance(pool.error, ValueError)
+    assert tracker.committable_offsets() == {TP: 2}
+
+
+def test_dispatch_fails_when_the_key_queue_is_full():
+    async def run():
+        pool = KeyedWorkerPool(workers=1, queue_size=2, handler=lambda items: asyncio.sleep(0))
+        # Not started: nothing drains the queue
+        return [pool.try_dispatch("user-1", index) for index in range(3)]
+
+    assert asyncio.run(run()) == [True, True, False]
+
+
+def test_workers_take_every_queued_item_at_once():
+    batches = []
+
+    async def handler(items):
+        batches.append(items)
+
+    async def run():
+        pool = KeyedWorkerPool(workers=1, queue_size=10, handler=handler, max_batch=4)
+        for offset in range(6):
+            pool.try_dispatch("user-1", offset)
+        pool.start()
+        await asyncio.wait_for(pool.space_available.wait(), 1)
+        await pool.drain()
+        await pool.stop()
+
+    asyncio.run(run())
+    assert batches == [[0, 1, 2, 3], [4, 5]]
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from fakes import FakeCollection, matches
+
+from notification_service.config import settings
+from notification_service.services import retention
+from notification_service.services.retention import Archive, archive_expired, expired_filter
+
+NOW = datetime(2026, 1, 1)
+
+
+def notification(index: int, read: bool, age_days: int, read_days_ago=None) -> dict:
+    return {
+        "_id": index,
+        "event_id": f"evt-{index}",
+        "user_id": f"user-{index % 2}",
+        "read": read,
+        "read_at": NOW - timedelta(days=read_days_ago) if read_days_ago is not None else None,
+        "created_at": NOW - timedelta(days=age_days),
+    }
+
+
+class ListArchive(Archive):
+    def __init__(self, before_delete=None):
+        self.documents = []
+        self.before_delete = before_delete
+
+    async def write(self, documents):
+        self.documents.extend(documents)
+        if self.before_delete is not None:
+            self.before_delete(documents)
+
+
+def test_an_archive_must_implement_write():
+    class Incomplete(Archive):
+        pass
+
+    with pytest.raises(TypeError, match="write"):
+        Incomplete()
+
+
+def test_expired_filter():
+    query = expired_filter(NOW, read_days=30, unread_days=90)
+
+    assert matches(notification(1, read=True, age_days=100, read_days_ago=31), query)
+    assert not matches(notification(2, read=True, age_days=100, read_days_ago=29), query)
+    # Read before read_at existed: the creation date counts
+    assert matches(notification(3, read=True, age_days=31), query)
+    assert matches(notification(4, read=False, age_days=91), query)
+    assert not matches(notification(5, read=False, age_days=89), query)
+
+    assert expired_filter(NOW, None, None) is None
+    assert not matches(notification(4, read=False, age_days=91), expired_filter(NOW, read_days=30, unread_days=None))
+
+
+def test_archive_reports_the_documents_actually_deleted(monkeypatch):
+    monkeypatch.setattr(settings, "retention_read_days", 30)
+    monkeypatch.setattr(settings, "retention_unread_days", 90)
+    collection = FakeCollection("notifications")
+    collection.load([
+        *(notification(index, read=True, age_days=100, read_days_ago=40) for index in range(4)),
+        *(notification(index, read=False, age_days=100) for index in range(4, 10)),
+        notification(10, read=False, age_days=10),
+    ])
+    monkeypatch.setattr(retention, "get_collection", lambda: collection)
+
+    def touch(documents):
+        # Between the read and the delete, an expired unread notification becomes recent
+        # again (e.g. a digest merging a new event): it must be kept
+        if any(document["_id"] == 4 for document in documents):
+            collection._by_id[4]["created_at"] = NOW
+
+    deleted = []
+
+    async def on_deleted(documents):
+        deleted.extend(documents)
+
+    archive = ListArchive(before_delete=touch)
+    archived = asyncio.run(archive_expired(archive, batch_size=4, docs_per_second=1e6, now=NOW, on_deleted=on_deleted))
+
+    assert archived == 9
+    assert 4 in {document["_id"] for document in archive.documents}
+    assert sorted(document["_id"] for document in collection.documents) == [4, 10]
+    assert sorted(document["_id"] for document in deleted) == [0, 1, 2, 3, 5, 6, 7, 8, 9]
+    # The unread counters are fixed for the deleted documents only
+    assert sum(not document["read"] for document in deleted) == 5
+    assert {frozenset(document) for document in deleted} == {frozenset({"_id", "user_id", "read"})}
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+from pymongo.errors import AutoReconnect
+
+from fakes import FakeBroker, FakeKafkaAdminClient, FakeKafkaProducer
+from notification_service.domain.models import Notification
+from notification_service.infrastructure import retry_topics
+from notification_service.infrastructure.retry_topics import (
+    ERROR_CLASS_HEADER,
+    ORIGINAL_OFFSET_HEADER,
+    RETRY_ATTEMPT_HEADER,
+    FailureRouter,
+    header_value,
+    is_transient,
+    strip_failure_headers,
+)
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = FakeBroker(partitions=1)
+    monkeypatch.setattr(retry_topics, "AIOKafkaProducer", lambda **kwargs: FakeKafkaProducer(broker, **kwargs))
+    monkeypatch.setattr(retry_topics, "AIOKafkaAdminClient", lambda **kwargs: FakeKafkaAdminClient(broker, **kwargs))
+    return broker
+
+
+def make_router() -> FailureRouter:
+    return FailureRouter("notifications", retry_delays=[5.0, 60.0], dead_letter_topic="notifications.dlq")
+
+
+def create_topics(broker: FakeBroker, router: FailureRouter) -> None:
+    for topic in router.topics:
+        broker.partitions_for(topic)
+
+
+def invalid_event_error() -> ValidationError:
+    try:
+        Notification.model_validate({"event_id": None})
+    except ValidationError as e:
+        return e
+
+
+def test_transient_failures_are_not_routed():
+    assert is_transient(AutoReconnect("mongodb unreachable"))
+    assert not is_transient(invalid_event_error())
+    assert not is_transient(RuntimeError("handler bug"))
+
+
+def test_failures_go_through_each_retry_topic_then_to_the_dead_letters(broker):
+    router = make_router()
+    create_topics(broker, router)
+
+    async def run():
+        await router.start()
+        broker.append("notifications", b"{}", b"user-1", 0, [("codec", b"json")])
+        message = broker.topics["notifications"][0][0]
+        route = []
+        for _ in range(3):
+            route.append(await router.route(message, RuntimeError("handler bug")))
+            message = broker.topics[route[-1]][0][-1]
+        await router.stop()
+        return route, message
+
+    route, message = asyncio.run(run())
+    assert route == ["notifications.retry.1", "notifications.retry.2", "notifications.dlq"]
+    assert header_value(message.headers, RETRY_ATTEMPT_HEADER) == "3"
+    assert header_value(message.headers, ERROR_CLASS_HEADER) == "RuntimeError"
+    # The original position survives the retries, the record's own headers are kept
+    assert header_value(message.headers, ORIGINAL_OFFSET_HEADER) == "0"
+    assert strip_failure_headers(message.headers) == [("codec", b"json")]
+
+
+def test_invalid_messages_go_straight_to_the_dead_letters(broker):
+    router = make_router()
+    create_topics(broker, router)
+
+    async def run():
+        await router.start()
+        broker.append("notifications", b"not json", b"user-1", 0, [])
+        topics = [
+            await router.route(broker.topics["notifications"][0][0], error)
+            for error in (invalid_event_error(), ValueError("undecodable"), KeyError("user_id"))
+        ]
+        await router.stop()
+        return topics
+
+    assert asyncio.run(run()) == ["notifications.dlq"] * 3
+
+
+def test_start_fails_when_a_topic_is_missing(broker):
+    router = make_router()
+    broker.partitions_for("notifications.retry.1")
+    broker.partitions_for("notifications.dlq")
+
+    with pytest.raises(RuntimeError, match="notifications.retry.2"):
+        asyncio.run(router.start())
+    assert "notifications.retry.2" not in broker.topics